@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AXIOM Lookup Micro-Benchmark
+
+Measures `AxiomIndex.search` latency as the corpus grows. Corpora beyond the
+bundled one are synthesized from random pseudo-words (each entry with a few
+aliases), and three query kinds are timed per size:
+
+    * exact:  an id or alias as stored ("kavoru_bias")
+    * alias:  a reformatted alias ("Kavoru Bias")
+    * fuzzy:  a misspelled alias that needs the n-gram index ("kavroubias")
+
+With ``--sessions N`` it also simulates N concurrent turns that each
+resolve ``--biases`` biases against a store with ``--store-latency-ms`` per
+round trip (a remote vector database), comparing one lookup per bias with
+the batched, coalescing, TTL-cached `main_agent.axiom_service`.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.axiom_lookup
+    $ python -m benchmarks.axiom_lookup --sizes 100 1000 10000 --queries 5000
+    $ python -m benchmarks.axiom_lookup --sizes 10 --sessions 200 --biases 3 --store-latency-ms 40
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from main_agent.axiom import AxiomEntry, AxiomIndex, default_index
+from main_agent.axiom_service import BiasImplicationService, LocalAxiomStore
+
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"] + ["ch", "st", "th", "ng"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_corpus(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    entries, seen = [], set()
+    while len(entries) < size:
+        name = f"{_word(rng)}_{_word(rng)}" if rng.random() < 0.5 else _word(rng)
+        if name in seen:
+            continue
+        seen.add(name)
+        aliases = tuple(f"{_word(rng)}_bias" for _ in range(rng.randint(1, 3)))
+        entries.append(AxiomEntry(id=f"{name}_bias", implication=f"Implication for {name}.", aliases=aliases))
+    return entries
+
+
+def _misspell(rng: random.Random, name: str) -> str:
+    letters = list(name.replace("_", ""))
+    i = rng.randrange(len(letters) - 1)
+    letters[i], letters[i + 1] = letters[i + 1], letters[i]
+    return "".join(letters)
+
+
+def time_queries(index: AxiomIndex, queries: list) -> tuple:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    mean_us = sum(samples) / len(samples) * 1e6
+    p99_us = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6
+    return mean_us, p99_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000, 10000])
+    parser.add_argument("--queries", type=int, default=2000, help="queries per kind and size")
+    parser.add_argument("--sessions", type=int, default=0, help="concurrent turns for the store simulation")
+    parser.add_argument("--biases", type=int, default=3, help="biases resolved per turn")
+    parser.add_argument("--store-latency-ms", type=float, default=40.0, help="store round-trip latency")
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    corpora = [("bundled", default_index().entries)] + [(str(n), synthetic_corpus(n)) for n in args.sizes]
+    print(f"{'corpus':>8} {'build_ms':>9} | {'exact µs (mean/p99)':>20} | {'alias µs':>16} | {'fuzzy µs':>16}")
+    for label, entries in corpora:
+        start = time.perf_counter()
+        index = AxiomIndex(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        picks = [rng.choice(entries) for _ in range(args.queries)]
+        exact = [entry.id for entry in picks]
+        alias = [(rng.choice(entry.aliases) if entry.aliases else entry.id).replace("_", " ").title() for entry in picks]
+        fuzzy = [_misspell(rng, entry.id) for entry in picks]
+
+        cells = [f"{m:7.1f} / {p:7.1f}" for m, p in (time_queries(index, q) for q in (exact, alias, fuzzy))]
+        print(f"{label:>8} {build_ms:9.1f} | {cells[0]:>20} | {cells[1]:>16} | {cells[2]:>16}")
+
+    if args.sessions:
+        print(f"\n{args.sessions} concurrent turns x {args.biases} biases, store round trip {args.store_latency_ms:.0f} ms")
+        print(f"{'variant':>14} {'round trips':>12} {'turn p50 ms':>12} {'wall ms':>9}")
+        for variant in ("per_bias", "batch", "batch_cached"):
+            trips, p50_ms, wall_ms = asyncio.run(
+                simulate_turns(variant, args.sessions, args.biases, args.store_latency_ms / 1000)
+            )
+            print(f"{variant:>14} {trips:>12} {p50_ms:>12.1f} {wall_ms:>9.1f}")
+
+
+class _CountingStore(LocalAxiomStore):
+    round_trips = 0
+
+    async def search_many(self, bias_types):
+        self.round_trips += 1
+        return await super().search_many(bias_types)
+
+
+async def simulate_turns(variant: str, sessions: int, biases: int, latency: float) -> tuple:
+    """
+    Runs ``sessions`` concurrent turns resolving ``biases`` bias names each.
+
+    ``per_bias`` looks up one name after the other (one tool round trip
+    each), ``batch`` all names of the turn at once; both without the TTL
+    cache, so only concurrent identical lookups are shared. ``batch_cached``
+    adds the TTL cache.
+    """
+    ids = [entry.id for entry in default_index().entries]
+    rng = random.Random(5)
+    turns = [rng.sample(ids, min(biases, len(ids))) for _ in range(sessions)]
+    store = _CountingStore(latency=latency)
+    service = BiasImplicationService(store, ttl_seconds=3600 if variant == "batch_cached" else 0)
+    durations = []
+
+    async def _turn(names: list) -> None:
+        start = time.perf_counter()
+        if variant == "per_bias":
+            for name in names:
+                await service.lookup([name])
+        else:
+            await service.lookup(names)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_turn(names) for names in turns))
+    durations.sort()
+    return store.round_trips, durations[len(durations) // 2], (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    main()
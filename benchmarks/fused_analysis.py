@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fused Analysis Benchmark
+
+Runs the same patient sessions through the "parallel" analysis layout
+(`symptom_mapper_agent` + `bias_analyzer_agent`) and the "fused" layout (one
+`analysis_agent` call, ``LUCIA_ANALYSIS_LAYOUT=fused``) and compares, per
+turn:
+
+    * analysis-layer input tokens and model calls (quota), read from the
+      ``usage_metadata`` of the analysis events,
+    * analysis-layer latency (until its last event) and turn latency,
+    * agreement of the fused results with the two-agent results after each
+      turn: Jaccard similarity of the reported symptom phrases and of the
+      bias names, and the share of turns where both sets are identical.
+
+The stand-in backend (default) answers both layouts from the same script, so
+its agreement is 1.0 by construction and only tokens, calls and latency are
+meaningful; its latency is ``--latency-ms`` per call plus
+``--token-latency-ms`` per output token. With ``--backend gemini`` the real
+models are called (credentials from ``.env``) and the agreement is measured;
+the parallel layout is then also compared with itself across sessions, since
+two runs of the same layout do not agree perfectly either.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.fused_analysis --sessions 20 --latency-ms 300 --token-latency-ms 8
+    $ python -m benchmarks.fused_analysis --backend gemini --sessions 5 --output bench_results/fused_gemini.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+import warnings
+from dataclasses import replace
+
+from benchmarks.common import SCENARIO_QUERIES, latency_summary, run_metadata
+
+LAYOUTS = ("parallel", "fused")
+ANALYSIS_AGENTS = {"symptom_mapper_agent", "bias_analyzer_agent", "analysis_agent"}
+
+
+async def run_layout(layout: str, sessions: int, turns: int) -> dict:
+    """Runs ``sessions`` concurrent sessions of ``turns`` scenario turns through ``layout``."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+    from main_agent.agent import build_root_agent
+    from main_agent.config import settings
+
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=build_root_agent(replace(settings, analysis_layout=layout, analysis_mode="cumulative")),
+        app_name="agents",
+        session_service=session_service,
+    )
+    results = {
+        "prompt_tokens": [], "output_tokens": [], "calls": [], "analysis_s": [], "turn_s": [],
+        "states": [[None] * turns for _ in range(sessions)],
+    }
+
+    async def _session(index: int) -> None:
+        user_id, session_id = "bench_user", f"{layout}-{index}"
+        await session_service.create_session(app_name="agents", user_id=user_id, session_id=session_id)
+        for turn in range(turns):
+            query = SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)]
+            prompt_tokens = output_tokens = calls = 0
+            analysis_end = 0.0
+            start = time.perf_counter()
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                if event.partial or event.author not in ANALYSIS_AGENTS:
+                    continue
+                analysis_end = time.perf_counter() - start
+                usage = event.usage_metadata
+                if usage and usage.prompt_token_count:
+                    calls += 1
+                    prompt_tokens += usage.prompt_token_count
+                    output_tokens += usage.candidates_token_count or 0
+            results["turn_s"].append(time.perf_counter() - start)
+            results["analysis_s"].append(analysis_end)
+            results["prompt_tokens"].append(prompt_tokens)
+            results["output_tokens"].append(output_tokens)
+            results["calls"].append(calls)
+            session = await session_service.get_session(app_name="agents", user_id=user_id, session_id=session_id)
+            results["states"][index][turn] = {
+                key: session.state.get(key) for key in ("symptom_analysis", "bias_analysis")
+            }
+
+    await asyncio.gather(*(_session(index) for index in range(sessions)))
+    return results
+
+
+def _analysis_sets(state: dict) -> tuple:
+    """(symptom phrases, bias names) of a state, normalized; empty sets for malformed outputs."""
+    from main_agent.axiom import normalize_bias_name
+    from main_agent.change_detection import normalize_text
+    from main_agent.report import ReportInputError, extract_bias_awareness, extract_symptom_mapping
+
+    try:
+        mapping = extract_symptom_mapping(state.get("symptom_analysis"))
+    except ReportInputError:
+        mapping = {}
+    try:
+        biases = extract_bias_awareness(state.get("bias_analysis"))
+    except ReportInputError:
+        biases = []
+    phrases = {normalize_text(item) for items in mapping.values() if isinstance(items, list) for item in items}
+    names = {normalize_bias_name(str(bias.get("bias", ""))) for bias in biases if isinstance(bias, dict)}
+    return phrases - {""}, names - {""}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return 1.0 if not a and not b else len(a & b) / len(a | b)
+
+
+def agreement(pairs: list) -> dict:
+    """Mean symptom/bias Jaccard and exact-match rate over (state, state) pairs."""
+    if not pairs:
+        return {"turns": 0}
+    symptoms, biases, exact = [], [], 0
+    for left, right in pairs:
+        (left_phrases, left_names), (right_phrases, right_names) = _analysis_sets(left), _analysis_sets(right)
+        symptoms.append(_jaccard(left_phrases, right_phrases))
+        biases.append(_jaccard(left_names, right_names))
+        exact += left_phrases == right_phrases and left_names == right_names
+    return {
+        "turns": len(pairs),
+        "symptom_jaccard": sum(symptoms) / len(symptoms),
+        "bias_jaccard": sum(biases) / len(biases),
+        "exact_match_rate": exact / len(pairs),
+    }
+
+
+def summarize(raw: dict) -> dict:
+    turns = len(raw["calls"])
+    return {
+        "turns": turns,
+        "prompt_tokens_per_turn": sum(raw["prompt_tokens"]) / turns,
+        "output_tokens_per_turn": sum(raw["output_tokens"]) / turns,
+        "calls_per_turn": sum(raw["calls"]) / turns,
+        "analysis_latency": latency_summary(raw["analysis_s"]),
+        "turn_latency": latency_summary(raw["turn_s"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions per layout")
+    parser.add_argument("--turns", type=int, default=len(SCENARIO_QUERIES), help="turns per session")
+    parser.add_argument("--backend", choices=["standin", "gemini"], default="standin")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="stand-in latency per model call")
+    parser.add_argument("--token-latency-ms", type=float, default=8.0, help="stand-in decode time per output token")
+    parser.add_argument("--output", default="bench_results/fused_analysis.json", help="JSON result file")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    from main_agent.models import stand_in_backend, use_model_backend
+
+    raw = {}
+    for layout in LAYOUTS:
+        if args.backend == "standin":
+            backend = use_model_backend(stand_in_backend(
+                latency=args.latency_ms / 1000, latency_per_token=args.token_latency_ms / 1000,
+            ))
+        else:
+            backend = contextlib.nullcontext()
+        with backend:
+            raw[layout] = asyncio.run(run_layout(layout, args.sessions, args.turns))
+
+    pairs = [
+        (parallel, fused)
+        for parallel_session, fused_session in zip(raw["parallel"]["states"], raw["fused"]["states"])
+        for parallel, fused in zip(parallel_session, fused_session)
+    ]
+    baseline = [
+        (left, right)
+        for left_session, right_session in zip(raw["parallel"]["states"], raw["parallel"]["states"][1:])
+        for left, right in zip(left_session, right_session)
+    ]
+    report = {
+        "benchmark": "fused_analysis",
+        "config": vars(args),
+        "metadata": run_metadata(),
+        "layouts": {layout: summarize(raw[layout]) for layout in LAYOUTS},
+        "agreement_fused_vs_parallel": agreement(pairs),
+        "agreement_parallel_vs_parallel": agreement(baseline),
+    }
+
+    print(f"{'layout':<9} {'in tok/turn':>11} {'out tok/turn':>12} {'calls/turn':>10} "
+          f"{'analysis p50':>12} {'p95':>8} {'turn p50':>9} {'p95':>8}")
+    for layout, summary in report["layouts"].items():
+        analysis, turn = summary["analysis_latency"], summary["turn_latency"]
+        print(f"{layout:<9} {summary['prompt_tokens_per_turn']:>11.0f} {summary['output_tokens_per_turn']:>12.0f} "
+              f"{summary['calls_per_turn']:>10.2f} {analysis['p50_ms']:>10.0f}ms {analysis['p95_ms']:>6.0f}ms "
+              f"{turn['p50_ms']:>7.0f}ms {turn['p95_ms']:>6.0f}ms")
+    for name in ("agreement_fused_vs_parallel", "agreement_parallel_vs_parallel"):
+        result = report[name]
+        if result["turns"]:
+            print(f"{name}: symptoms={result['symptom_jaccard']:.3f} biases={result['bias_jaccard']:.3f} "
+                  f"exact={result['exact_match_rate']:.2f} over {result['turns']} turns")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prompt-Size Benchmark
+
+Runs one long patient session through `root_agent` with the stand-in model
+and reports the prompt tokens of every agent per turn, read from the
+``usage_metadata`` of the events (the stand-in estimates ~4 characters per
+token). By default the session is run twice, with and without compact
+context (``LUCIA_COMPACT_CONTEXT``), to show how the downstream prompts stop
+growing with the conversation.
+
+``LUCIA_SKIP_UNCHANGED`` is switched off so that the advocacy generator runs
+on every turn.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.prompt_tokens --turns 20
+    $ python -m benchmarks.prompt_tokens --turns 20 --compact on
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import warnings
+
+from benchmarks.common import SCENARIO_QUERIES
+
+AGENTS = ["symptom_mapper_agent", "bias_analyzer_agent", "advocacy_generator_agent"]
+
+
+async def measure(turns: int) -> list:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+    from main_agent.agent import root_agent
+    from main_agent.models import stand_in_backend, use_model_backend
+
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="bench_user", session_id="long")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    per_turn = []
+    with use_model_backend(stand_in_backend()):
+        for turn in range(turns):
+            query = SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)]
+            tokens = dict.fromkeys(AGENTS, 0)
+            async for event in runner.run_async(
+                user_id="bench_user",
+                session_id="long",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                usage = event.usage_metadata
+                if not event.partial and usage and usage.prompt_token_count and event.author in tokens:
+                    tokens[event.author] += usage.prompt_token_count
+            per_turn.append(tokens)
+    return per_turn
+
+
+def run_variant(compact: str, turns: int) -> list:
+    """Runs `measure` in a subprocess so the settings are read with the variant's environment."""
+    env = {**os.environ, "LUCIA_COMPACT_CONTEXT": "1" if compact == "on" else "0", "LUCIA_SKIP_UNCHANGED": "0"}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.prompt_tokens", "--turns", str(turns), "--json"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=20, help="turns in the session")
+    parser.add_argument("--compact", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.json:
+        warnings.filterwarnings("ignore")
+        logging.disable(logging.WARNING)
+        print(json.dumps(asyncio.run(measure(args.turns))))
+        return
+
+    variants = ["off", "on"] if args.compact == "both" else [args.compact]
+    results = {variant: run_variant(variant, args.turns) for variant in variants}
+    header = "turn " + " ".join(f"{agent.split('_')[0]:>10}[{variant}]" for variant in variants for agent in AGENTS)
+    print(header)
+    for turn in range(args.turns):
+        row = " ".join(f"{results[variant][turn][agent]:>15}" for variant in variants for agent in AGENTS)
+        print(f"{turn + 1:>4} {row}")
+    for variant in variants:
+        totals = {agent: sum(turn[agent] for turn in results[variant]) for agent in AGENTS}
+        print(f"total [{variant}]: " + ", ".join(f"{agent}={count}" for agent, count in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
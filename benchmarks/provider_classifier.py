@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Provider-Mention Pre-Classifier Evaluation
+
+Reports precision/recall of `main_agent.preclassifier.mentions_provider` on
+the labeled fixture (``tests/fixtures/provider_mentions.jsonl`` by default)
+and its per-message latency, together with the share of messages that would
+skip the bias model call.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.provider_classifier
+    $ python -m benchmarks.provider_classifier --fixture my_labeled_messages.jsonl
+"""
+import argparse
+import json
+import time
+
+from main_agent.preclassifier import evaluate, mentions_provider
+
+DEFAULT_FIXTURE = "tests/fixtures/provider_mentions.jsonl"
+
+
+def load_samples(path: str) -> list:
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="JSONL of {text, provider} records")
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the fixture")
+    args = parser.parse_args()
+
+    samples = load_samples(args.fixture)
+    scores = evaluate(samples)
+    print(f"{len(samples)} labeled messages")
+    print(f"precision={scores['precision']:.3f} recall={scores['recall']:.3f} "
+          f"(tp={scores['tp']} fp={scores['fp']} tn={scores['tn']} fn={scores['fn']})")
+    skipped = scores["tn"] + scores["fn"]
+    print(f"messages classified as provider-free: {skipped}/{len(samples)}")
+    for label in ("false_negatives", "false_positives"):
+        for text in scores[label]:
+            print(f"  {label[:-1]}: {text}")
+
+    texts = [sample["text"] for sample in samples]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            mentions_provider(text)
+    elapsed = time.perf_counter() - start
+    print(f"classification: {elapsed / (args.repeat * len(texts)) * 1e6:.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Report Formatter Latency Benchmark
+
+Compares the deterministic `render_report` path against the LLM report
+formatter it replaces, using the README demo analysis as input.
+
+The LLM path needs a valid `GOOGLE_API_KEY` (read from `.env`) and is only
+measured when ``--llm`` is passed; the deterministic path runs offline.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.report_formatter
+    $ python -m benchmarks.report_formatter --iterations 20000 --llm --llm-iterations 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+SYMPTOM_ANALYSIS = json.dumps({
+    "symptomMapping": {
+        "pain_cluster": ["stiff joints in my hands and feet"],
+        "fatigue_cluster": ["fatigue is so bad I have to nap in my car at lunch"],
+        "musculoskeletal_cluster": ["swollen joints in my hands and feet"],
+    }
+})
+BIAS_ANALYSIS = json.dumps({
+    "biasAwareness": [
+        {
+            "bias": "ageism_bias",
+            "reason": "Doctor attributed joint swelling, stiffness, and fatigue to perimenopause at age 48 without ordering tests.",
+            "implication": "Dismissing a patient's medical concerns as a normal or inevitable part of aging.",
+        },
+        {
+            "bias": "gender_bias",
+            "reason": "Doctor attributed symptoms to anxiety because 'women get so anxious at this stage of life'.",
+            "implication": "Often results in women's pain being taken less seriously or misdiagnosed.",
+        },
+    ]
+})
+ADVOCACY_ANALYSIS = json.dumps({
+    "structuredAdvocacy": [
+        "What further evaluations could help understand my stiff and swollen joints?",
+        "Are there additional causes for my fatigue we should consider?",
+        "Could we explore explanations for my symptoms beyond age-related changes?",
+    ]
+})
+
+
+def summarize(label: str, samples: list) -> dict:
+    """Prints and returns latency percentiles (milliseconds) for a sample set."""
+    ordered = sorted(samples)
+    result = {
+        "path": label,
+        "runs": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+    print(
+        f"{label:<14} runs={result['runs']:<6} mean={result['mean_ms']:.4f}ms "
+        f"p50={result['p50_ms']:.4f}ms p95={result['p95_ms']:.4f}ms"
+    )
+    return result
+
+
+def bench_deterministic(iterations: int) -> dict:
+    from main_agent.report import render_report
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render_report(SYMPTOM_ANALYSIS, BIAS_ANALYSIS, ADVOCACY_ANALYSIS)
+        samples.append(time.perf_counter() - start)
+    return summarize("deterministic", samples)
+
+
+async def bench_llm(iterations: int) -> dict:
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from google.adk.agents import LlmAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+    from main_agent.agent import professional_report_instruction
+
+    agent = LlmAgent(
+        name="llm_report_formatter_agent",
+        model="gemini-2.5-flash-lite",
+        instruction=professional_report_instruction,
+        output_key="report",
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    context = "\n".join([SYMPTOM_ANALYSIS, BIAS_ANALYSIS, ADVOCACY_ANALYSIS])
+
+    samples = []
+    for _ in range(iterations):
+        session_id = str(uuid.uuid4())
+        await session_service.create_session(app_name="agents", user_id="bench", session_id=session_id)
+        start = time.perf_counter()
+        async for _event in runner.run_async(
+            user_id="bench",
+            session_id=session_id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=context)]),
+        ):
+            pass
+        samples.append(time.perf_counter() - start)
+    return summarize("llm", samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=10000, help="deterministic renders to time")
+    parser.add_argument("--llm", action="store_true", help="also time the LLM formatter (needs GOOGLE_API_KEY)")
+    parser.add_argument("--llm-iterations", type=int, default=3, help="LLM formatter calls to time")
+    args = parser.parse_args()
+
+    deterministic = bench_deterministic(args.iterations)
+    if args.llm:
+        llm = asyncio.run(bench_llm(args.llm_iterations))
+        print(f"speed-up (p50): {llm['p50_ms'] / deterministic['p50_ms']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
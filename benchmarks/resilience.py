@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model-Call Resilience Benchmark
+
+Drives `root_agent` with concurrent patient sessions against a stand-in
+model that injects latency spikes and 429/503 errors (`StandInLlm`
+``spike_rate`` / ``error_rate``) and compares the turn latency tail under
+three `main_agent.resilience` policies:
+
+    * ``none``: no retries, no hedging; an injected error fails the turn,
+    * ``retry``: jittered exponential backoff honoring the retry-after hint,
+    * ``retry+hedge``: retries plus a hedge request after the agent's
+      observed p95 latency.
+
+Every policy uses the same per-stage deadline and concurrency budget. A
+warm-up round (not measured) first fills the latency samples the hedge delay
+is derived from, as in a long-running server.
+
+Reported per policy: turn latency p50/p95/p99, failed turns, backend
+requests sent (hedges and retries included) and the resilience counters.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.resilience --sessions 200 --turns 3 --latency-ms 200 --spike-rate 0.03 --error-rate 0.02
+    $ python -m benchmarks.resilience --policies retry+hedge --concurrency 64 --output bench_results/resilience.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import warnings
+
+from benchmarks.common import SCENARIO_QUERIES, latency_summary, run_metadata
+
+POLICIES = ("none", "retry", "retry+hedge")
+
+
+async def run_sessions(sessions: int, turns: int, prefix: str = "bench", config=None, think: float = 0.0) -> dict:
+    """
+    Runs ``sessions`` concurrent sessions of ``turns`` turns, ``think``
+    seconds apart; returns turn latencies and failures.
+    """
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+    from main_agent.agent import build_root_agent
+    from main_agent.config import settings
+
+    session_service = InMemorySessionService()
+    runner = Runner(agent=build_root_agent(config or settings), app_name="agents", session_service=session_service)
+    results = {"turns": [], "failed": 0}
+
+    async def _session(index: int) -> None:
+        user_id, session_id = "bench_user", f"{prefix}-{index}"
+        await session_service.create_session(app_name="agents", user_id=user_id, session_id=session_id)
+        for turn in range(turns):
+            if turn and think:
+                await asyncio.sleep(think)
+            query = SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)]
+            start = time.perf_counter()
+            try:
+                async for _ in runner.run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+                ):
+                    pass
+            except Exception:
+                results["failed"] += 1
+                continue
+            results["turns"].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_session(index) for index in range(sessions)))
+    results["wall_time_s"] = time.perf_counter() - started
+    results["session_service"] = session_service
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent patient sessions")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stand-in latency per model call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--spike-rate", type=float, default=0.03, help="share of calls with a latency spike")
+    parser.add_argument("--spike-ms", type=float, default=3000.0, help="latency added by a spike")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of calls failing with --error-code")
+    parser.add_argument("--error-code", type=int, default=429, help="HTTP code of injected errors")
+    parser.add_argument("--retry-after-ms", type=float, default=100.0, help="retry-after hint of injected errors")
+    parser.add_argument("--warmup-sessions", type=int, default=20, help="unmeasured sessions run before each policy")
+    parser.add_argument("--deadline-s", type=float, default=30.0, help="per-stage deadline")
+    parser.add_argument("--concurrency", type=int, default=0, help="global budget of in-flight requests (0: unlimited)")
+    parser.add_argument("--policies", default=",".join(POLICIES), help="comma-separated subset of " + ", ".join(POLICIES))
+    parser.add_argument("--seed", type=int, default=7, help="seed of the injected faults")
+    parser.add_argument("--output", default="bench_results/resilience.json", help="JSON result file")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    from main_agent import metrics
+    from main_agent.models import stand_in_backend, use_model_backend
+    from main_agent.resilience import ModelResilience, ResiliencePolicy, use_resilience
+
+    report = {"benchmark": "resilience", "config": vars(args), "metadata": run_metadata(), "policies": {}}
+    for name in args.policies.split(","):
+        policy = ResiliencePolicy(
+            deadline=args.deadline_s,
+            max_retries=0 if name == "none" else 3,
+            backoff_base=0.05,
+            hedge=name == "retry+hedge",
+            concurrency=args.concurrency,
+        )
+        backend = stand_in_backend(
+            latency=args.latency_ms / 1000,
+            latency_jitter=args.jitter_ms / 1000,
+            spike_rate=args.spike_rate,
+            spike_latency=args.spike_ms / 1000,
+            error_rate=args.error_rate,
+            error_code=args.error_code,
+            error_retry_after=args.retry_after_ms / 1000 if args.retry_after_ms else None,
+        )
+        random.seed(args.seed)
+        with use_model_backend(backend), use_resilience(ModelResilience(policy)):
+            if args.warmup_sessions:
+                asyncio.run(run_sessions(args.warmup_sessions, args.turns, prefix="warmup"))
+            warmup_requests = sum(llm.calls for llm in backend.instances.values())
+            metrics.reset()
+            raw = asyncio.run(run_sessions(args.sessions, args.turns))
+        counters = metrics.counters("resilience.")
+        report["policies"][name] = {
+            "turn_latency": latency_summary(raw["turns"]),
+            "failed_turns": raw["failed"],
+            "wall_time_s": raw["wall_time_s"],
+            "backend_requests": sum(llm.calls for llm in backend.instances.values()) - warmup_requests,
+            "retries": sum(value for key, value in counters.items() if key.startswith("resilience.retries.")),
+            "hedges": sum(value for key, value in counters.items() if key.startswith("resilience.hedges.")),
+            "hedge_wins": sum(value for key, value in counters.items() if key.startswith("resilience.hedge_wins.")),
+            "counters": counters,
+        }
+
+    print(f"{'policy':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'failed':>7} {'requests':>9} {'retries':>8} {'hedges':>7}")
+    for name, result in report["policies"].items():
+        latency = result["turn_latency"]
+        if not latency["count"]:
+            print(f"{name:<12} no completed turns, {result['failed_turns']} failed")
+            continue
+        print(f"{name:<12} {latency['p50_ms']:>6.0f}ms {latency['p95_ms']:>6.0f}ms {latency['p99_ms']:>6.0f}ms "
+              f"{result['failed_turns']:>7} {result['backend_requests']:>9} {result['retries']:>8} {result['hedges']:>7}")
+    baseline = report["policies"].get("none", {}).get("turn_latency", {})
+    for name, result in report["policies"].items():
+        if name != "none" and baseline.get("count") and result["turn_latency"]["count"]:
+            improvement = 1 - result["turn_latency"]["p99_ms"] / baseline["p99_ms"]
+            print(f"p99 reduction, {name} vs none: {improvement:.0%}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serving Benchmark
+
+Load-tests the HTTP service (`main_agent.server`) end to end. For every
+``--workers`` value the benchmark starts ``python -m main_agent.server``
+on the offline stand-in model (``LUCIA_MODEL_BACKEND=standin``, latency
+``--latency-ms``), then runs ``--users`` virtual users against it. Each
+user creates a session and sends ``--turns`` messages of the
+"Perimenopause Dismissal" scenario, pausing ``--think-ms`` between them,
+over SSE (``--mode sse``, default) or plain JSON. A shed message (429) is
+retried after its ``Retry-After`` (at most ``--max-retries`` times).
+
+Reported per run: turn latency p50/p95/p99/max, time to the first SSE
+event, completed turns per second, status code counts (429s included) and
+the server's counters. With ``--url`` an already running service is
+measured instead (``--workers`` is ignored).
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.serving --users 64 --turns 3 --latency-ms 200 --workers 1,4
+    $ python -m benchmarks.serving --mode json --concurrency 8 --queue 8 --output bench_results/serving_shed.json
+    $ python -m benchmarks.serving --url http://127.0.0.1:8080 --users 16
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import SCENARIO_QUERIES, latency_summary, run_metadata
+
+
+async def _turn(client: httpx.AsyncClient, session_id: str, text: str, sse: bool) -> tuple:
+    """(status, seconds, seconds to the first event or None) of one message."""
+    started = time.perf_counter()
+    first = None
+    if not sse:
+        response = await client.post(f"/sessions/{session_id}/messages", json={"text": text})
+        return response, time.perf_counter() - started, None
+    async with client.stream("POST", f"/sessions/{session_id}/messages", json={"text": text},
+                             headers={"Accept": "text/event-stream"}) as response:
+        outcome = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                first = first or time.perf_counter() - started
+                outcome = line[len("event: "):]
+    if response.status_code == 200 and outcome != "done":
+        response.status_code = 599  # the stream ended with an error event
+    return response, time.perf_counter() - started, first
+
+
+async def _user(client: httpx.AsyncClient, index: int, args, results: dict) -> None:
+    await asyncio.sleep(index * args.ramp_ms / 1000 / max(1, args.users))
+    response = await client.post("/sessions", json={})
+    results["statuses"][f"create {response.status_code}"] += 1
+    if response.status_code != 201:
+        return
+    session_id = response.json()["session_id"]
+    for turn in range(args.turns):
+        text = SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)]
+        for _ in range(args.max_retries + 1):
+            response, seconds, first = await _turn(client, session_id, text, args.mode == "sse")
+            results["statuses"][str(response.status_code)] += 1
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(min(float(response.headers.get("Retry-After", "1")), args.max_backoff_s))
+        if response.status_code == 200:
+            results["turns"].append(seconds)
+            if first is not None:
+                results["first_event"].append(first)
+        else:
+            results["failed"] += 1
+        await asyncio.sleep(args.think_ms / 1000)
+
+
+async def _load(url: str, args) -> dict:
+    results = {"turns": [], "first_event": [], "failed": 0, "statuses": collections.Counter()}
+    limits = httpx.Limits(max_connections=args.users + 8, max_keepalive_connections=args.users + 8)
+    async with httpx.AsyncClient(base_url=url, timeout=httpx.Timeout(args.timeout_s), limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(_user(client, index, args, results) for index in range(args.users)))
+        elapsed = time.perf_counter() - started
+        health = (await client.get("/healthz")).json()
+    return {
+        "turn_latency": latency_summary(results["turns"]),
+        "first_event": latency_summary(results["first_event"]),
+        "turns_per_s": len(results["turns"]) / elapsed,
+        "failed_turns": results["failed"],
+        "statuses": dict(results["statuses"]),
+        "elapsed_s": elapsed,
+        "server": health,
+    }
+
+
+def _start_server(args, workers: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               LUCIA_MODEL_BACKEND="standin",
+               LUCIA_STANDIN_LATENCY_MS=str(args.latency_ms),
+               LUCIA_SERVER_CONCURRENCY=str(args.concurrency),
+               LUCIA_SERVER_QUEUE=str(args.queue),
+               LUCIA_WARMUP="1")
+    return subprocess.Popen(
+        [sys.executable, "-m", "main_agent.server", "--port", str(args.port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(url: str, server: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            if httpx.get(f"{url}/healthz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start within {timeout:.0f}s")
+
+
+def _stop_server(server: subprocess.Popen) -> float:
+    """Sends SIGTERM and returns the seconds the server took to drain and exit."""
+    started = time.perf_counter()
+    server.terminate()
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=64, help="concurrent virtual users (one session each)")
+    parser.add_argument("--turns", type=int, default=3, help="messages per user")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="pause between a user's messages")
+    parser.add_argument("--ramp-ms", type=float, default=1000.0, help="spread of the users' start times")
+    parser.add_argument("--mode", choices=("sse", "json"), default="sse", help="response mode of the messages")
+    parser.add_argument("--workers", default="1,4", help="comma-separated worker counts to compare")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stand-in latency per model call")
+    parser.add_argument("--concurrency", type=int, default=32, help="LUCIA_SERVER_CONCURRENCY per worker")
+    parser.add_argument("--queue", type=int, default=64, help="LUCIA_SERVER_QUEUE per worker")
+    parser.add_argument("--max-retries", type=int, default=3, help="retries of a shed (429) message")
+    parser.add_argument("--max-backoff-s", type=float, default=2.0, help="cap on the Retry-After honored")
+    parser.add_argument("--timeout-s", type=float, default=120.0, help="client timeout per request")
+    parser.add_argument("--port", type=int, default=18080, help="port of the started server")
+    parser.add_argument("--url", default="", help="measure a running service instead of starting one")
+    parser.add_argument("--output", default="bench_results/serving.json", help="JSON result file")
+    args = parser.parse_args()
+
+    report = {"benchmark": "serving", "config": vars(args), "metadata": run_metadata(), "runs": {}}
+    if args.url:
+        report["runs"]["external"] = asyncio.run(_load(args.url.rstrip("/"), args))
+    for workers in ([] if args.url else [int(value) for value in args.workers.split(",")]):
+        url = f"http://127.0.0.1:{args.port}"
+        server = _start_server(args, workers)
+        try:
+            _wait_ready(url, server)
+            result = asyncio.run(_load(url, args))
+        finally:
+            shutdown = _stop_server(server)
+        result["shutdown_s"] = shutdown
+        report["runs"][f"{workers} worker{'s' if workers > 1 else ''}"] = result
+
+    print(f"{'run':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'first':>8} {'turns/s':>8} {'429s':>6} {'failed':>7}")
+    for name, result in report["runs"].items():
+        latency, first = result["turn_latency"], result["first_event"]
+        print(f"{name:<12} {latency.get('p50_ms', 0):>6.0f}ms {latency.get('p95_ms', 0):>6.0f}ms "
+              f"{latency.get('p99_ms', 0):>6.0f}ms {first.get('p50_ms', 0):>6.0f}ms {result['turns_per_s']:>8.1f} "
+              f"{result['statuses'].get('429', 0):>6} {result['failed_turns']:>7}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session-Store Memory Benchmark
+
+Runs many patient sessions through `root_agent` (stand-in model) and samples
+the process RSS as sessions accumulate, once with `InMemorySessionService`
+and once with `PersistentSessionService` on a temporary SQLite file. With the
+in-memory service RSS grows with every session ever seen; with the persistent
+service it levels off at the size of the hot-session LRU.
+
+Each backend runs in its own subprocess so the numbers do not share a heap.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.session_store --sessions 10000
+    $ python -m benchmarks.session_store --sessions 2000 --backend sqlite --hot 128
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from benchmarks.common import SCENARIO_QUERIES, current_rss_mb, run_metadata
+
+
+async def measure(backend: str, sessions: int, turns: int, concurrency: int, hot: int, samples: int) -> dict:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+    from main_agent.agent import root_agent
+    from main_agent.models import stand_in_backend, use_model_backend
+    from main_agent.sessions import PersistentSessionService, SQLiteSessionStore
+
+    workdir = tempfile.mkdtemp(prefix="lucia-sessions-")
+    if backend == "sqlite":
+        session_service = PersistentSessionService(SQLiteSessionStore(os.path.join(workdir, "sessions.db")), hot_sessions=hot)
+    else:
+        session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    gate = asyncio.Semaphore(concurrency)
+    done = 0
+    step = max(1, sessions // samples)
+    rss = []
+
+    async def _session(index: int) -> None:
+        nonlocal done
+        async with gate:
+            session_id = f"bench-{index}"
+            await session_service.create_session(app_name="agents", user_id="bench_user", session_id=session_id)
+            for turn in range(turns):
+                async for _ in runner.run_async(
+                    user_id="bench_user",
+                    session_id=session_id,
+                    new_message=genai_types.Content(
+                        role="user", parts=[genai_types.Part.from_text(text=SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)])]
+                    ),
+                ):
+                    pass
+            done += 1
+            if done % step == 0:
+                rss.append([done, round(current_rss_mb(), 1)])
+
+    start = time.perf_counter()
+    with use_model_backend(stand_in_backend()):
+        await asyncio.gather(*(_session(i) for i in range(sessions)))
+    await session_service.flush()
+    db_path = os.path.join(workdir, "sessions.db")
+    return {
+        "backend": backend,
+        "wall_time_s": time.perf_counter() - start,
+        "rss_mb": rss,
+        "db_mb": os.path.getsize(db_path) / (1024 * 1024) if os.path.exists(db_path) else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=1, help="turns per session")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--hot", type=int, default=256, help="hot-session LRU size of the persistent service")
+    parser.add_argument("--samples", type=int, default=10, help="RSS samples per run")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "both"], default="both")
+    parser.add_argument("--output", default="bench_results/session_store.json", help="JSON result file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        warnings.filterwarnings("ignore")
+        logging.disable(logging.WARNING)
+        result = asyncio.run(measure(args.backend, args.sessions, args.turns, args.concurrency, args.hot, args.samples))
+        print(json.dumps(result))
+        return
+
+    backends = ["memory", "sqlite"] if args.backend == "both" else [args.backend]
+    runs = []
+    for backend in backends:
+        command = [sys.executable, "-m", "benchmarks.session_store", "--child", "--backend", backend,
+                   "--sessions", str(args.sessions), "--turns", str(args.turns),
+                   "--concurrency", str(args.concurrency), "--hot", str(args.hot), "--samples", str(args.samples)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"{backend}: {args.sessions} sessions in {run['wall_time_s']:.1f}s, db {run['db_mb']:.1f} MiB")
+        print("  sessions -> RSS MiB: " + ", ".join(f"{count}:{rss}" for count, rss in run["rss_mb"]))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump({"benchmark": "session_store", "config": vars(args), "metadata": run_metadata(), "runs": runs},
+                  handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
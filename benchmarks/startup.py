@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup-Time Benchmark
+
+Measures import-to-ready time of the two entry points in fresh interpreters:
+
+    * ``main_agent``: ``from main_agent.agent import root_agent`` (what
+        ``adk web``/``adk run`` and the test runners import).
+    * ``lucia_deploy``: ``import lucia_deploy.agent`` (what Agent Engine
+        loads; it warms itself up at import when ``LUCIA_WARMUP`` is on).
+
+Both are measured with and without the start-up warm-up
+(`main_agent.warmup`, ``--warmup on|off|both``).
+
+Each run is a new subprocess and reports, in milliseconds:
+
+    * ``import``: importing the entry point (ADK, the pipeline modules and
+        building the default agent graph), without the warm-up,
+    * ``build``: one more `build_root_agent` call (the graph alone),
+    * ``warm_up``: the synthetic warm-up turn (0 with ``LUCIA_WARMUP=0``),
+    * ``first_turn``: the first real turn through a `Runner` with the
+        stand-in model (``LUCIA_STANDIN_LATENCY_MS=0``), i.e. what the first
+        request waits for,
+    * ``ready``: interpreter start until the first turn has completed.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.startup --runs 5
+    $ python -m benchmarks.startup --runs 5 --entry lucia_deploy --warmup both --output bench_results/startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import run_metadata
+
+ENTRY_POINTS = {
+    "main_agent": "from main_agent.agent import root_agent",
+    "lucia_deploy": "from lucia_deploy.agent import root_agent",
+}
+PHASES = ["import", "build", "warm_up", "first_turn", "ready"]
+WARMUP = {"on": "1", "off": "0"}
+
+
+def measure(entry: str, started: float) -> dict:
+    """Runs inside the child interpreter; ``started`` is the parent's launch timestamp."""
+    import asyncio
+    import logging
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    timings = {}
+
+    begin = time.perf_counter()
+    namespace = {}
+    exec(ENTRY_POINTS[entry], namespace)
+    root_agent = namespace["root_agent"]
+    timings["import"] = (time.perf_counter() - begin) * 1000
+
+    from main_agent import warmup
+    from main_agent.config import settings
+
+    timings["warm_up"] = 0.0
+    if entry == "lucia_deploy":
+        # Warmed up during the import; reported separately.
+        timings["warm_up"] = warmup.last_warmup.get("total_ms", 0.0)
+        timings["import"] -= timings["warm_up"]
+    elif settings.warmup:
+        timings["warm_up"] = warmup.warm_up(root_agent)["total_ms"]
+
+    from main_agent.agent import build_root_agent
+
+    begin = time.perf_counter()
+    build_root_agent()
+    timings["build"] = (time.perf_counter() - begin) * 1000
+
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types as genai_types
+
+    async def first_turn() -> None:
+        session_service = InMemorySessionService()
+        await session_service.create_session(app_name="agents", user_id="bench_user", session_id="s1")
+        runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+        async for _ in runner.run_async(
+            user_id="bench_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="My joints ache.")]),
+        ):
+            pass
+
+    begin = time.perf_counter()
+    asyncio.run(first_turn())
+    timings["first_turn"] = (time.perf_counter() - begin) * 1000
+    timings["ready"] = (time.time() - started) * 1000
+    return timings
+
+
+def run_child(entry: str, warmup: str) -> dict:
+    env = {
+        **os.environ,
+        "LUCIA_WARMUP": WARMUP[warmup],
+        "LUCIA_MODEL_BACKEND": "standin",
+        "LUCIA_STANDIN_LATENCY_MS": "0",
+        # The deployment entry point initializes Vertex AI (needs the vertexai SDK).
+        "GOOGLE_CLOUD_PROJECT": os.environ.get("GOOGLE_CLOUD_PROJECT", "lucia-bench"),
+        "GOOGLE_CLOUD_LOCATION": os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"),
+    }
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", entry, "--started", repr(time.time())],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point")
+    parser.add_argument("--entry", choices=[*ENTRY_POINTS, "both"], default="both")
+    parser.add_argument("--warmup", choices=[*WARMUP, "both"], default="both", help="LUCIA_WARMUP variant")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--started", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.started)))
+        return
+
+    entries = list(ENTRY_POINTS) if args.entry == "both" else [args.entry]
+    variants = list(WARMUP) if args.warmup == "both" else [args.warmup]
+    results = {"metadata": run_metadata(), "runs": args.runs, "entries": {}}
+    print(f"{'entry':<14}{'warmup':<8}" + "".join(f"{phase + ' ms':>17}" for phase in PHASES) + "   (median of runs, min in brackets)")
+    for entry in entries:
+        for variant in variants:
+            label = f"{entry}[warmup={variant}]"
+            try:
+                samples = [run_child(entry, variant) for _ in range(args.runs)]
+            except subprocess.CalledProcessError as exc:
+                print(f"{entry:<14}{variant:<8}failed: {exc.stderr.strip().splitlines()[-1] if exc.stderr else exc}")
+                continue
+            summary = {}
+            for phase in PHASES:
+                values = sorted(sample[phase] for sample in samples)
+                summary[phase] = {"median_ms": values[len(values) // 2], "min_ms": values[0]}
+            results["entries"][label] = {"summary": summary, "samples": samples}
+            print(f"{entry:<14}{variant:<8}" + "".join(
+                f"{summary[phase]['median_ms']:>8.1f} [{summary[phase]['min_ms']:>6.1f}]" for phase in PHASES
+            ))
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
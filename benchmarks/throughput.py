@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent-Session Throughput Benchmark
+
+Drives `root_agent` with N concurrent patient sessions x M turns through the
+same `Runner` + `InMemorySessionService` pattern as `tests/test_agent.py`,
+using the local stand-in model (`main_agent.models`) so the numbers reflect
+orchestration capacity rather than Gemini.
+
+Reported:
+    * turn latency p50/p95/p99 and turns/sec
+    * with ``--stream``: time-to-first-useful-byte, i.e. until the first
+      partial report section of `streaming_root_agent` (SSE mode)
+    * per-stage time: parallel analysis, advocacy, formatting (measured from
+      the arrival of each stage's last event); with ``--fanout`` the
+      questions are asked inside the parallel stage (`main_agent.fanout`)
+      and the advocacy stage is only the merge
+    * peak RSS of the process
+    * pipeline counters from `main_agent.metrics` (e.g. skipped calls)
+    * with ``--trace FILE``: the OpenTelemetry spans of the run, written to
+      FILE and summarized per stage (see `benchmarks.trace_summary`)
+
+Results are printed and written as JSON (with commit hash and versions) so
+runs can be compared across commits.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.throughput --sessions 50 --turns 3
+    $ python -m benchmarks.throughput --sessions 200 --turns 5 --latency-ms 300 --output bench_results/base.json
+    $ python -m benchmarks.throughput --sessions 50 --turns 3 --latency-ms 300 --stream
+    $ python -m benchmarks.throughput --sessions 50 --turns 3 --latency-ms 300 --token-latency-ms 8 --fanout
+    $ python -m benchmarks.throughput --sessions 50 --turns 3 --latency-ms 300 --jitter-ms 200 --trace bench_results/spans.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import warnings
+from dataclasses import replace
+
+from benchmarks.common import SCENARIO_QUERIES, latency_summary, peak_rss_mb, run_metadata
+
+STAGES = {
+    "symptom_mapper_agent": "parallel_analysis",
+    "bias_analyzer_agent": "parallel_analysis",
+    "analysis_agent": "parallel_analysis",
+    "symptom_question_agent": "parallel_analysis",
+    "bias_question_agent": "parallel_analysis",
+    "advocacy_generator_agent": "advocacy",
+    "advocacy_merge_agent": "advocacy",
+    "report_formatter_agent": "formatting",
+    "llm_report_formatter_agent": "formatting",
+    "analysis_change_gate": "formatting",
+}
+STAGE_ORDER = ["parallel_analysis", "advocacy", "formatting"]
+
+
+async def run_session(runner, session_service, session_index: int, turns: int, results: dict, run_config=None) -> None:
+    from google.genai import types as genai_types
+
+    user_id, session_id = "bench_user", f"bench-{session_index}"
+    await session_service.create_session(app_name="agents", user_id=user_id, session_id=session_id)
+    for turn in range(turns):
+        query = SCENARIO_QUERIES[turn % len(SCENARIO_QUERIES)]
+        stage_end = {}
+        first_byte = None
+        start = time.perf_counter()
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            run_config=run_config,
+        ):
+            if first_byte is None and event.partial and (event.custom_metadata or {}).get("section"):
+                first_byte = time.perf_counter() - start
+            stage = STAGES.get(event.author)
+            if stage:
+                stage_end[stage] = time.perf_counter() - start
+        results["turns"].append(time.perf_counter() - start)
+        if first_byte is not None:
+            results["first_byte"].append(first_byte)
+
+        previous = 0.0
+        for stage in STAGE_ORDER:
+            if stage in stage_end:
+                results["stages"][stage].append(stage_end[stage] - previous)
+                previous = stage_end[stage]
+
+
+async def run_benchmark(
+    sessions: int, turns: int, concurrency: int, stream: bool = False, fanout: bool = False
+) -> dict:
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from main_agent.agent import analysis_workflow_agent, build_analysis_workflow, make_streaming_agent, streaming_root_agent
+    from main_agent.config import settings
+
+    session_service = InMemorySessionService()
+    if fanout:
+        workflow = build_analysis_workflow(replace(settings, advocacy_fanout=True))
+        agent = make_streaming_agent(workflow) if stream else workflow
+    else:
+        agent = streaming_root_agent if stream else analysis_workflow_agent
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if stream else None
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    results = {"turns": [], "first_byte": [], "stages": {stage: [] for stage in STAGE_ORDER}}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def _bounded(index: int) -> None:
+        async with gate:
+            await run_session(runner, session_service, index, turns, results, run_config)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_bounded(i) for i in range(sessions)))
+    results["wall_time_s"] = time.perf_counter() - start
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=50, help="number of patient sessions (N)")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session (M)")
+    parser.add_argument("--concurrency", type=int, default=0, help="max sessions in flight (default: all)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stand-in latency per model call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--token-latency-ms", type=float, default=0.0, help="stand-in decode time per output token")
+    parser.add_argument("--stream", action="store_true", help="stream the report (SSE) and measure time-to-first-byte")
+    parser.add_argument("--fanout", action="store_true", help="ask advocacy questions per analysis branch")
+    parser.add_argument("--output", default="bench_results/throughput.json", help="JSON result file")
+    parser.add_argument("--trace", default="", help="write OpenTelemetry spans to this JSONL file")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    from main_agent import metrics
+    from main_agent.models import stand_in_backend, use_model_backend
+    from main_agent.telemetry import configure_tracing
+
+    if args.trace:
+        os.makedirs(os.path.dirname(args.trace) or ".", exist_ok=True)
+        open(args.trace, "w").close()
+    span_processor = configure_tracing("json", args.trace) if args.trace else None
+    backend = stand_in_backend(
+        latency=args.latency_ms / 1000,
+        latency_jitter=args.jitter_ms / 1000,
+        latency_per_token=args.token_latency_ms / 1000,
+    )
+    with use_model_backend(backend):
+        raw = asyncio.run(run_benchmark(args.sessions, args.turns, args.concurrency or args.sessions, args.stream, args.fanout))
+
+    total_turns = len(raw["turns"])
+    report = {
+        "benchmark": "throughput",
+        "config": vars(args),
+        "metadata": run_metadata(),
+        "turns": total_turns,
+        "wall_time_s": raw["wall_time_s"],
+        "turns_per_sec": total_turns / raw["wall_time_s"],
+        "turn_latency": latency_summary(raw["turns"]),
+        "time_to_first_byte": latency_summary(raw["first_byte"]),
+        "stage_latency": {stage: latency_summary(samples) for stage, samples in raw["stages"].items()},
+        "model_calls": sum(llm.calls for llm in backend.instances.values()),
+        "peak_rss_mb": peak_rss_mb(),
+        "counters": metrics.counters(),
+    }
+
+    latency = report["turn_latency"]
+    print(f"{total_turns} turns in {report['wall_time_s']:.2f}s -> {report['turns_per_sec']:.1f} turns/s")
+    print(f"turn latency  p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms p99={latency['p99_ms']:.1f}ms")
+    first_byte = report["time_to_first_byte"]
+    if first_byte["count"]:
+        print(f"first byte    p50={first_byte['p50_ms']:.1f}ms p95={first_byte['p95_ms']:.1f}ms")
+    for stage, summary in report["stage_latency"].items():
+        if summary["count"]:
+            print(f"  {stage:<18} p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms")
+    print(f"peak RSS {report['peak_rss_mb']:.1f} MiB, {report['model_calls']} model calls")
+    for name, value in sorted(report["counters"].items()):
+        print(f"  {name} = {value}")
+
+    if span_processor is not None:
+        from benchmarks.trace_summary import print_summary, summarize
+
+        span_processor.force_flush()
+        print(f"spans written to {args.trace}")
+        print_summary(summarize(args.trace))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
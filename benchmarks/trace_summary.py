@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-Stage Latency from Trace Files
+
+Reads the JSONL spans written with ``LUCIA_TRACE=json`` (or
+``python -m benchmarks.throughput --trace``) and prints one row per stage,
+ordered by p99 latency, to show which stage dominates the tail:
+
+    * ``invoke_agent <agent>``: wall time of each agent, workflow step and
+        the parallel analysis step;
+    * ``model <agent>``: individual model calls, with prompt/completion
+        tokens, cache hits and schema retries;
+    * ``execute_tool <tool>``: tool calls such as `get_bias_implications`.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.trace_summary lucia_traces.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+
+from benchmarks.common import latency_summary
+
+
+def stage_name(record: dict) -> str:
+    name, attributes = record["name"], record["attributes"]
+    if name.startswith("generate_content"):
+        return f"model {attributes.get('lucia.agent') or attributes.get('gen_ai.agent.name', '?')}"
+    return name
+
+
+def summarize(path: str) -> list:
+    """One summary dict per stage, slowest p99 first."""
+    durations = defaultdict(list)
+    totals = defaultdict(lambda: defaultdict(int))
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            if record["name"] in ("invocation", "call_llm"):
+                continue
+            stage, attributes = stage_name(record), record["attributes"]
+            durations[stage].append(record["duration_ms"] / 1000)
+            totals[stage]["input_tokens"] += attributes.get("gen_ai.usage.input_tokens", 0)
+            totals[stage]["output_tokens"] += attributes.get("gen_ai.usage.output_tokens", 0)
+            totals[stage]["cache_hits"] += attributes.get("lucia.cache") == "hit"
+            totals[stage]["retries"] += attributes.get("lucia.schema.retries", 0)
+    rows = [{"stage": stage, **latency_summary(samples), **totals[stage]} for stage, samples in durations.items()]
+    return sorted(rows, key=lambda row: row["p99_ms"], reverse=True)
+
+
+def print_summary(rows: list) -> None:
+    print(f"{'stage':<42} {'count':>6} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'in_tok':>9} {'out_tok':>8} "
+          f"{'cache':>6} {'retry':>6}")
+    for row in rows:
+        print(f"{row['stage']:<42} {row['count']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['input_tokens']:>9} {row['output_tokens']:>8} {row['cache_hits']:>6} {row['retries']:>6}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="JSONL trace file")
+    args = parser.parse_args()
+    print_summary(summarize(args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Turn Budget Benchmark
+
+Drives `root_agent` with concurrent patient sessions against a stand-in
+model with latency spikes and compares turn latency without and with a
+per-turn time budget (``LUCIA_TURN_BUDGET``, `main_agent.budget`). Under a
+budget, a turn whose stage overruns its share ends with a partial report
+and the rest of its work finishes in the background.
+
+Sessions pause ``--think-ms`` between turns, like a patient typing; with no
+pause, a turn can wait for the previous turn's background work.
+Reported per run: turn latency p50/p95/p99/max, turns answered with a
+partial report (per overrunning stage), background completions, and
+whether every session ended with a complete report once the background
+work had drained.
+
+Usage:
+    Run from the project root:
+    $ python -m benchmarks.turn_budget --sessions 40 --turns 5 --latency-ms 200 --spike-rate 0.05 --budget-s 1.5
+    $ python -m benchmarks.turn_budget --think-ms 0 --output bench_results/turn_budget_no_think.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import warnings
+from dataclasses import replace
+
+from benchmarks.common import latency_summary, run_metadata
+from benchmarks.resilience import run_sessions
+
+
+async def _run(args, config) -> dict:
+    from main_agent.budget import wait_for_background
+    from main_agent.report import render_report
+
+    raw = await run_sessions(args.sessions, args.turns, config=config, think=args.think_ms / 1000)
+    drained = await wait_for_background(timeout=60)
+    complete = 0
+    for index in range(args.sessions):
+        session = await raw["session_service"].get_session(
+            app_name="agents", user_id="bench_user", session_id=f"bench-{index}")
+        state = session.state
+        complete += state.get("report") == render_report(
+            state.get("symptom_analysis"), state.get("bias_analysis"), state.get("advocacy_analysis"))
+    return {"raw": raw, "drained": drained, "complete_sessions": complete}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=40, help="concurrent patient sessions")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stand-in latency per model call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--spike-rate", type=float, default=0.05, help="share of calls with a latency spike")
+    parser.add_argument("--spike-ms", type=float, default=3000.0, help="latency added by a spike")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="pause between a session's turns")
+    parser.add_argument("--budget-s", type=float, default=1.5, help="turn budget of the budgeted run")
+    parser.add_argument("--split", default="analysis=0.7,advocacy=0.3", help="LUCIA_TURN_BUDGET_SPLIT")
+    parser.add_argument("--seed", type=int, default=7, help="seed of the injected spikes")
+    parser.add_argument("--output", default="bench_results/turn_budget.json", help="JSON result file")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+    from main_agent import metrics
+    from main_agent.config import settings
+    from main_agent.models import stand_in_backend, use_model_backend
+
+    report = {"benchmark": "turn_budget", "config": vars(args), "metadata": run_metadata(), "runs": {}}
+    for name, budget in (("no budget", 0.0), (f"budget {args.budget_s:g}s", args.budget_s)):
+        backend = stand_in_backend(
+            latency=args.latency_ms / 1000,
+            latency_jitter=args.jitter_ms / 1000,
+            spike_rate=args.spike_rate,
+            spike_latency=args.spike_ms / 1000,
+        )
+        random.seed(args.seed)
+        metrics.reset()
+        with use_model_backend(backend):
+            result = asyncio.run(_run(args, replace(settings, turn_budget=budget, turn_budget_split=args.split)))
+        latencies = result["raw"]["turns"]
+        report["runs"][name] = {
+            "turn_budget_s": budget,
+            "turn_latency": latency_summary(latencies),
+            "max_ms": max(latencies) * 1000 if latencies else None,
+            "failed_turns": result["raw"]["failed"],
+            "background_drained": result["drained"],
+            "complete_sessions": result["complete_sessions"],
+            "counters": metrics.counters("turn_budget."),
+        }
+
+    print(f"{'run':<14} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'partial':>8} {'complete':>9}")
+    for name, result in report["runs"].items():
+        latency = result["turn_latency"]
+        partial = sum(value for key, value in result["counters"].items() if key.startswith("turn_budget.degraded."))
+        print(f"{name:<14} {latency['p50_ms']:>6.0f}ms {latency['p95_ms']:>6.0f}ms {latency['p99_ms']:>6.0f}ms "
+              f"{result['max_ms']:>6.0f}ms {partial:>8} {result['complete_sessions']:>4}/{args.sessions}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,10 @@
-from .agent import root_agent
 __all__ = ["root_agent"]
+
+
+def __getattr__(name):
+    # Built on first access, so importing a submodule (e.g. `main_agent.routing`)
+    # does not import ADK's agent classes and build the whole graph.
+    if name == "root_agent":
+        from .agent import root_agent
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
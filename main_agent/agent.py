@@ -12,47 +12,136 @@ Architecture Overview:
     The pipeline utilizes a "Map-Reduce" style architecture combining Parallel 
     and Sequential execution patterns:
 
-    1.  **Input:** Raw patient text (narrative).
+    1.  **Input:** Raw patient text (narrative). Once the session history is
+        long, `history_compactor` first collapses older turns into a digest
+        of the current analysis and the abridged patient messages
+        (``LUCIA_HISTORY_MAX_EVENTS``, ``LUCIA_HISTORY_TOKEN_BUDGET``).
     2.  **Parallel Processing (Analysis Layer):**
         * `symptom_mapper_agent`: Extracts patient-reported symptoms, strictly filtering
             out doctor-imposed labels/diagnoses.
-        * `bias_analyzer_agent`: Detects provider bias using a Mock RAG tool 
+        * `bias_analyzer_agent`: Detects provider bias using a RAG tool 
             (`get_bias_implications`) to ground insights in clinical literature.
+            Until a message mentions a clinician interaction it returns an
+            empty result without a model call (``LUCIA_BIAS_PRECLASSIFIER``).
     3.  **Sequential Processing (Synthesis Layer):**
         * `advocacy_generator_agent`: Synthesizes the outputs from the analysis layer
             to generate medically neutral questions for the patient.
-        * `report_formatter_agent`: Aggregates all JSON outputs into a final, 
-            human-readable text report.
+        * `report_formatter_agent`: Renders all JSON outputs into the final,
+            human-readable text report deterministically (no model call).
+            The LLM formatter is kept as an opt-in fallback for malformed
+            inputs (``LUCIA_REPORT_LLM_FALLBACK``).
+        Both run inside `analysis_change_gate`, which reuses the previous
+        turn's questions and report when the analysis did not change
+        (``LUCIA_SKIP_UNCHANGED``).
+        With ``LUCIA_ADVOCACY_FANOUT`` the questions are asked inside the
+        parallel layer instead: `symptom_question_agent` runs right after the
+        symptom mapper and `bias_question_agent` right after the bias
+        analyzer, and `advocacy_merge_agent` merges them in code.
+        With ``LUCIA_ANALYSIS_LAYOUT=fused`` one `analysis_agent` call
+        replaces both workers of the analysis layer and writes both of their
+        outputs (`main_agent.fused`), with the implications looked up in code
+        instead of by a tool call; the question agents then run in
+        parallel after it.
+    4.  **Streaming (optional):** `streaming_root_agent` wraps the workflow and
+        emits the report as partial events while it is produced
+        (``LUCIA_STREAM_REPORT``).
+    5.  **Turn Budget (optional):** With ``LUCIA_TURN_BUDGET`` the workflow
+        is a `BudgetedWorkflowAgent` (`main_agent.budget`): a stage that
+        overruns its share of the budget ends the turn with a partial report
+        and finishes in the background for the next turn.
+
+Analysis Modes (``LUCIA_ANALYSIS_MODE``):
+    * ``cumulative`` (default): the worker agents re-read the full conversation
+        every turn and regenerate the complete symptom map / bias list.
+    * ``incremental``: the worker agents see only the newest message plus the
+        previous structured state and return add/remove deltas that are merged
+        in code, so per-turn prompt size stays flat as the conversation grows.
+
+Model Routing (``LUCIA_ROUTING_POLICY``):
+    Each `LlmAgent` is built with its default model from `main_agent.routing`
+    and re-routed per call by `route_model`, e.g. to run short follow-up
+    turns on flash-lite and long narratives on flash.
 
 Key Components:
-    * **Mock RAG Interface:** `get_bias_implications` simulates a vector database retrieval 
-        to ensure the agent relies on "Ground Truth" rather than hallucination. 
+    * **RAG Interface:** `get_bias_implications` retrieves from the local AXIOM index
+        (`main_agent.axiom`) to ensure the agent relies on "Ground Truth" rather than hallucination. 
+        `get_bias_implications_batch` resolves all biases of a turn in one call
+        through the cached, coalescing `main_agent.axiom_service` (``LUCIA_AXIOM_BATCH``).
             * **Root Agent:** The `analysis_workflow_agent` which serves as the entry point 
         for the `Runner`.
+    * **Factory:** `build_root_agent(config)` builds the whole graph from a
+        `LuciaSettings`; `root_agent` and the Agent Engine entry point
+        (``lucia_deploy/agent.py``) are both built by it.
 
 Usage:
     Import `root_agent` into your runner script:
     >>> from main_agent.agent import root_agent
     >>> runner = Runner(agent=root_agent, ...)
 
+    Or build a graph for other settings (every entry point uses this factory):
+    >>> from dataclasses import replace
+    >>> from main_agent.agent import build_root_agent
+    >>> agent = build_root_agent(replace(settings, analysis_mode="incremental"))
+
 Dependencies:
     - google.adk.agents (LlmAgent, SequentialAgent, ParallelAgent)
+    - main_agent.report (ReportFormatterAgent)
+    - main_agent.axiom / main_agent.axiom_service (AXIOM index and batched lookups)
+    - main_agent.change_detection (AnalysisChangeGate)
+    - main_agent.preclassifier (provider-mention fast path for the bias stage)
+    - main_agent.streaming (ReportStreamingAgent)
+    - main_agent.incremental (delta merging for ``LUCIA_ANALYSIS_MODE=incremental``)
+    - main_agent.models (model factory; ``LUCIA_MODEL_BACKEND=standin`` runs offline)
+    - main_agent.routing (per-call model tier selection, ``LUCIA_ROUTING_POLICY``)
+    - main_agent.schemas (typed worker outputs, repair parser, canonical JSON)
+    - main_agent.context (compact downstream context, prompt-token logging)
+    - main_agent.compaction (HistoryCompactor)
+    - main_agent.fanout (per-branch advocacy questions, ``LUCIA_ADVOCACY_FANOUT``)
+    - main_agent.fused (single-call analysis, ``LUCIA_ANALYSIS_LAYOUT=fused``)
+    - main_agent.budget (per-turn time budget, ``LUCIA_TURN_BUDGET``)
+    - main_agent.telemetry (local OpenTelemetry export, ``LUCIA_TRACE``)
 
 Original Author: inna campo
 Created: Sun Nov 16 14:21:28 2025
 """
-from google.adk.agents import  LlmAgent, SequentialAgent, ParallelAgent
+import re
+from typing import Callable, Optional
+
+from google.adk.agents import  BaseAgent, LlmAgent, SequentialAgent, ParallelAgent
+
+from .axiom import NO_AXIOM_INFORMATION, default_index
+from .axiom_service import implication_service
+from .budget import BudgetedWorkflowAgent, parse_budget_split
+from .change_detection import AnalysisChangeGate
+from .compaction import HistoryCompactor
+from .config import LuciaSettings, settings
+from .context import log_prompt_tokens, state_context
+from .fanout import AdvocacyMergeAgent, question_call_guard
+from .fused import split_fused_analysis
+from .incremental import merge_bias_delta, merge_delta_callback, merge_symptom_delta
+from .models import model_for
+from .preclassifier import skip_bias_without_provider
+from .report import ReportFormatterAgent
+from .routing import default_model, route_model
+from .schemas import AdvocacyAnalysis, BiasAnalysis, BiasDelta, FusedAnalysis, SymptomAnalysis, SymptomDelta
+from .streaming import ReportStreamingAgent
+from .telemetry import annotate, configure_tracing
+
+# Export the pipeline's OpenTelemetry spans locally when LUCIA_TRACE is set.
+configure_tracing()
 
 def get_bias_implications(bias_type: str) -> str:
     """
-    [AXIOM ENGINE INTERFACE - MOCK IMPLEMENTATION]
+    [AXIOM ENGINE INTERFACE - LOCAL INDEX]
     
     Acts as the query layer for the AXIOM Clinical Knowledge Base.
     
     In the production architecture, this function would query a vector database
-    managed by the AXIOM Research Agents. For this prototype, it
-    retrieves from a static, validated dictionary to simulate the retrieval
-    of evidence-based clinical context.
+    managed by the AXIOM Research Agents. For this prototype, it searches the
+    local AXIOM index (`main_agent.axiom`), which is loaded once per process
+    from the on-disk corpus of validated mappings from current women's health
+    literature. Alias normalization and character n-gram similarity resolve
+    names the model invents (e.g., "ageism" or "age_bias") to the documented bias.
 
     Parameters
     ----------
@@ -67,22 +156,41 @@ def get_bias_implications(bias_type: str) -> str:
 
     Architectural Note
     ------------------
-    This function mocks the "Retrieve" step of the RAG (Retrieval-Augmented Generation) 
+    This function implements the "Retrieve" step of the RAG (Retrieval-Augmented Generation) 
     pipeline. It ensures the Bias Analyzer Agent bases its insights on 
     external facts (the AXIOM library) rather than its own internal training data.
     """
+    match = default_index().search(bias_type)
+    annotate({"lucia.axiom.bias_type": bias_type, "lucia.axiom.matched": match is not None})
+    return match.entry.implication if match else NO_AXIOM_INFORMATION
 
-    # MOCK DATABASE: validated mappings from current women's health literature.
-    axiom_knowledge_base = {
-        "psychologizing_bias": "This can lead to delayed diagnosis for underlying physical conditions, as symptoms are incorrectly attributed to mental stress.",
-        "gender_bias": "Often results in women's pain being taken less seriously or misdiagnosed, particularly in cardiovascular and autoimmune diseases.",
-        "weight_bias": "The tendency to attribute a wide range of symptoms to a patient's weight without a full workup. This can cause clinicians to miss underlying metabolic, orthopedic, or endocrine disorders.",
-        "ageism_bias": "Dismissing a patient's medical concerns as a normal or inevitable part of aging. This can prevent the timely diagnosis and treatment of serious conditions like heart disease, cancer, or neurological issues.",
-        "confirmation_bias": "The tendency for a clinician to focus on evidence that supports their initial hypothesis while ignoring evidence that contradicts it. This can lead to a premature or incorrect diagnosis.",
-        "racial_or_ethnic_bias": "Occurs when clinical judgments are influenced by stereotypes. This can lead to the undertreatment of pain and misdiagnosis of conditions that present differently across populations, such as dermatological or cardiac symptoms."
-    }
-    
-    return axiom_knowledge_base.get(bias_type, "No specific information found for this bias type in the AXIOM library.")
+
+async def get_bias_implications_batch(bias_types: list[str]) -> dict:
+    """
+    [AXIOM ENGINE INTERFACE - BATCH]
+
+    Resolves the clinical implications of several biases in one call, so the
+    Bias Analyzer needs a single tool round trip per turn however many biases
+    it documents. Lookups go through `main_agent.axiom_service`, which caches
+    them and coalesces identical concurrent lookups across sessions, and can
+    sit on a remote vector database instead of the local index.
+
+    Parameters
+    ----------
+    bias_types : list[str]
+        The identifiers of the diagnostic biases (e.g., ["gender_bias", "ageism_bias"]).
+
+    Returns
+    -------
+    dict
+        The 'Clinical Implication' string per requested identifier.
+    """
+    implications = await implication_service().lookup(bias_types)
+    annotate({
+        "lucia.axiom.batch_size": len(implications),
+        "lucia.axiom.unmatched": sum(1 for text in implications.values() if text == NO_AXIOM_INFORMATION),
+    })
+    return implications
 
 # --- Worker Agent 1: Symptom Analysis ---
 # ARCHITECTURAL NOTE: 
@@ -146,13 +254,86 @@ Output: { "symptomMapping": {} }
 (Note: "depressed" is EXCLUDED because it is a label applied by the doctor, not a feeling reported by the patient.)
 """
 
-symptom_mapper_agent = LlmAgent(
-    model='gemini-2.5-flash',
-    name='symptom_mapper_agent',
-    description='Analyzes the full conversation history to extract ONLY patient-reported experiences, ignoring doctor advice/labels.',
-    instruction=symptom_mapper_instruction,
-    output_key="symptom_analysis" 
-)
+# INCREMENTAL MODE: the model sees only the newest message plus the previous state
+# and returns a delta, which `merge_symptom_delta` folds back into the full map.
+symptom_mapper_delta_instruction = """Act as an INCREMENTAL Clinical NLP specialist.
+You will receive ONLY the patient's newest message. The symptoms already
+recorded from earlier messages are:
+
+{symptom_analysis?}
+
+Your task is to report what CHANGES in that record because of the newest message.
+
+Your output MUST follow these rules:
+
+1. Output ONLY a single JSON object with the keys "add" and "remove".
+2. "add" maps snake_case cluster names to lists of NEW patient-reported phrases.
+3. "remove" maps snake_case cluster names to lists of recorded phrases the patient now DENIES.
+4. Do NOT repeat phrases that are already recorded.
+5. You MUST NOT paraphrase.
+
+---------------------------------------------------------
+PATIENT-CENTERED FILTERING (CRITICAL)
+---------------------------------------------------------
+1. INCLUDE: Physical sensations or experiences reported by the patient.
+   - "I feel dizzy" -> INCLUDE
+2. EXCLUDE: Diagnoses, assumptions, or advice given by the doctor.
+   - "He said I am anxious" -> EXCLUDE (This is a label, not a reported sensation)
+   - "He told me to lose weight" -> EXCLUDE (This is advice, not a symptom)
+*EXCEPTION:* If the patient AGREES or restates it as their own experience, include it.
+
+---------------------------------------------------------
+CLUSTERING GUIDELINES
+---------------------------------------------------------
+Reuse the recorded cluster names where they fit. Otherwise use thematic clusters
+such as pain_cluster, fatigue_cluster, gastrointestinal_cluster,
+respiratory_cluster, neurological_cluster, skin_cluster, menstrual_cluster.
+
+---------------------------------------------------------
+EXAMPLES
+---------------------------------------------------------
+Input: "My back hurts. The doctor said it's just obesity and told me to diet."
+Output: { "add": { "pain_cluster": ["back hurts"] }, "remove": {} }
+
+Input: "Actually my back doesn't hurt anymore."
+Output: { "add": {}, "remove": { "pain_cluster": ["back hurts"] } }
+
+Input: "He said I was depressed."
+Output: { "add": {}, "remove": {} }
+"""
+
+
+def make_symptom_mapper_agent(mode: str = settings.analysis_mode) -> LlmAgent:
+    """Builds the symptom mapper for the "cumulative" or "incremental" analysis mode."""
+    if mode == "incremental":
+        return LlmAgent(
+            model=model_for(
+                'symptom_mapper_agent', default_model('symptom_mapper_agent'),
+                cache_instruction=symptom_mapper_delta_instruction,
+                output_schema=SymptomDelta,
+            ),
+            name='symptom_mapper_agent',
+            description='Updates the recorded patient-reported symptoms from the newest message, ignoring doctor advice/labels.',
+            instruction=symptom_mapper_delta_instruction,
+            include_contents='none',
+            before_model_callback=route_model,
+            after_model_callback=[log_prompt_tokens, merge_delta_callback("symptom_analysis", merge_symptom_delta)],
+            output_key="symptom_analysis"
+        )
+    return LlmAgent(
+        model=model_for(
+            'symptom_mapper_agent', default_model('symptom_mapper_agent'),
+            cache_instruction=symptom_mapper_instruction,
+            output_schema=SymptomAnalysis,
+        ),
+        name='symptom_mapper_agent',
+        description='Analyzes the full conversation history to extract ONLY patient-reported experiences, ignoring doctor advice/labels.',
+        instruction=symptom_mapper_instruction,
+        before_model_callback=route_model,
+        after_model_callback=log_prompt_tokens,
+        output_key="symptom_analysis" 
+    )
+
 
 # --- Worker Agent 2: Bias Analysis ---
 bias_analyzer_instruction = """Act as a CUMULATIVE Strict Clinical Bias Auditor.
@@ -229,14 +410,222 @@ Output:
 }
 """
 
-bias_analyzer_agent = LlmAgent(
-    model='gemini-2.5-flash-lite',
-    name='bias_analyzer_agent',
-    tools=[get_bias_implications],
-    description='Analyzes conversation for PROVEN provider bias. Returns empty list if no provider interaction exists.',
-    instruction=bias_analyzer_instruction,
-    output_key="bias_analysis"
-)
+bias_analyzer_delta_instruction = """Act as an INCREMENTAL Strict Clinical Bias Auditor.
+You will receive ONLY the patient's newest message. The biases already
+documented from earlier messages are:
+
+{bias_analysis?}
+
+Your goal is to report what CHANGES in that record because of the newest message,
+based ONLY on specific negative actions by a provider.
+
+Your output MUST follow these rules:
+1. Output ONLY a single JSON object with the keys "add" and "remove".
+2. "add" must be a LIST of NEW bias objects with "bias", "reason" and "implication".
+3. "remove" must be a LIST of recorded bias names the patient now RETRACTS
+   (e.g., "The doctor didn't say that").
+4. Do NOT repeat biases that are already documented unless the new message
+   changes their reason.
+
+---------------------------------------------------------
+THE "NO DOCTOR, NO BIAS" RULE (PRIMARY FILTER)
+---------------------------------------------------------
+* IF the newest message ONLY describes symptoms AND DOES NOT mention a doctor's reaction...
+    -> YOU MUST RETURN: { "add": [], "remove": [] }
+* NEVER add a bias whose reason describes a lack of evidence or a hypothetical.
+
+---------------------------------------------------------
+TOOL USAGE RULES
+---------------------------------------------------------
+For every bias you add, you MUST call the `get_bias_implications` tool to get its
+implication. Your tool call must be a direct function call, e.g.
+get_bias_implications(bias_type="ageism_bias")
+
+---------------------------------------------------------
+EXAMPLES
+---------------------------------------------------------
+Input: "I have swollen joints and I'm tired."
+Output: { "add": [], "remove": [] }
+
+Input: "My doctor told me the swelling is just because I'm getting old."
+Output:
+{
+  "add": [
+    {
+      "bias": "ageism_bias",
+      "reason": "Doctor attributed swelling to aging without testing.",
+      "implication": "..."
+    }
+  ],
+  "remove": []
+}
+"""
+
+
+# BATCH TOOL (LUCIA_AXIOM_BATCH): the tool rules of both bias instructions are
+# replaced so that every bias of a turn is resolved with one tool call.
+batch_tool_rules = """TOOL USAGE RULES
+---------------------------------------------------------
+Once you know which biases to report, get ALL their clinical implications with
+ONE call to the `get_bias_implications_batch` tool, passing every bias name in a
+single list. Do NOT call a tool once per bias.
+Your tool call must be a direct function call, without any other Python code like 'print()'.
+
+VALID Example:
+get_bias_implications_batch(bias_types=["ageism_bias", "gender_bias"])
+
+INVALID Examples:
+get_bias_implications(bias_type="ageism_bias")
+print(get_bias_implications_batch(bias_types=["ageism_bias"]))
+
+The tool returns an object mapping each name you passed to its implication.
+"""
+
+_TOOL_RULES_SECTION = re.compile(r"TOOL USAGE RULES\n-+\n.*?(?=\n-+\nEXAMPLES)", re.S)
+
+
+def batch_tool_instruction(instruction: str) -> str:
+    """``instruction`` with its tool rules rewritten for `get_bias_implications_batch`."""
+    return _TOOL_RULES_SECTION.sub(lambda _: batch_tool_rules, instruction, count=1)
+
+
+def make_bias_analyzer_agent(
+    mode: str = settings.analysis_mode,
+    preclassify: bool = settings.bias_preclassifier,
+    batch: bool = settings.axiom_batch,
+) -> LlmAgent:
+    """
+    Builds the bias analyzer for the "cumulative" or "incremental" analysis mode.
+
+    With ``preclassify`` the model is only called once the session mentions a
+    clinician interaction (`main_agent.preclassifier`). With ``batch`` it is
+    instructed to resolve all biases with one `get_bias_implications_batch`
+    call; `get_bias_implications` stays available to the model either way.
+    """
+    before_model_callback = [skip_bias_without_provider, route_model] if preclassify else route_model
+    tools = [get_bias_implications_batch, get_bias_implications] if batch else [get_bias_implications]
+    instruction = bias_analyzer_delta_instruction if mode == "incremental" else bias_analyzer_instruction
+    if batch:
+        instruction = batch_tool_instruction(instruction)
+    if mode == "incremental":
+        return LlmAgent(
+            model=model_for(
+                'bias_analyzer_agent', default_model('bias_analyzer_agent'),
+                cache_instruction=instruction,
+                output_schema=BiasDelta,
+            ),
+            name='bias_analyzer_agent',
+            tools=tools,
+            description='Updates the documented provider biases from the newest message.',
+            instruction=instruction,
+            include_contents='none',
+            before_model_callback=before_model_callback,
+            after_model_callback=[log_prompt_tokens, merge_delta_callback("bias_analysis", merge_bias_delta)],
+            output_key="bias_analysis"
+        )
+    return LlmAgent(
+        model=model_for(
+            'bias_analyzer_agent', default_model('bias_analyzer_agent'),
+            cache_instruction=instruction,
+            output_schema=BiasAnalysis,
+        ),
+        name='bias_analyzer_agent',
+        tools=tools,
+        description='Analyzes conversation for PROVEN provider bias. Returns empty list if no provider interaction exists.',
+        instruction=instruction,
+        before_model_callback=before_model_callback,
+        after_model_callback=log_prompt_tokens,
+        output_key="bias_analysis"
+    )
+
+
+# --- Fused Analysis (LUCIA_ANALYSIS_LAYOUT=fused) ---
+# One agent does the work of both workers above in a single call. Its rules are
+# assembled from the sections of the two cumulative instructions, so the
+# filtering rules cannot drift apart between the layouts.
+_RULE = "-" * 57
+_SECTION = r"-+\n{title}\n-+\n(.*?)(?=\n-+\n[^\n]+\n-+\n|\Z)"
+
+
+def _section(instruction: str, title: str) -> str:
+    """The body of the ``title`` section of ``instruction``."""
+    return re.search(_SECTION.format(title=re.escape(title)), instruction, re.S).group(1).strip()
+
+
+def _sections(*sections: tuple) -> str:
+    return "\n\n".join(f"{_RULE}\n{title}\n{_RULE}\n{body}" for title, body in sections)
+
+
+fused_analysis_examples = """Input: "I have swollen joints and I'm tired."
+Output: { "symptomMapping": { "pain_cluster": ["swollen joints"], "fatigue_cluster": ["tired"] }, "biasAwareness": [] }
+(Reason: No doctor mentioned -> No bias possible.)
+
+Input: "My back hurts. The doctor said it's just because I'm getting old and told me to diet."
+Output:
+{
+  "symptomMapping": { "pain_cluster": ["back hurts"] },
+  "biasAwareness": [
+    {
+      "bias": "ageism_bias",
+      "reason": "Doctor attributed back pain to aging without testing.",
+      "implication": ""
+    }
+  ]
+}
+(Note: "getting old" and "diet" are EXCLUDED from the symptoms because they are the doctor's words/advice.)"""
+
+fused_analysis_instruction = """Act as a CUMULATIVE Clinical NLP specialist AND a Strict Clinical Bias Auditor.
+You will receive a conversation history containing patient narratives. In ONE response
+you maintain two records:
+  A. a COMPREHENSIVE LIST of strictly PATIENT-REPORTED symptoms, and
+  B. a list of documented biases based ONLY on specific negative actions by a provider.
+
+Your output MUST follow these rules:
+1. Output ONLY a single JSON object with exactly the keys "symptomMapping" and "biasAwareness".
+2. "symptomMapping" must use snake_case keys and lists of phrases. You MUST NOT paraphrase.
+3. "biasAwareness" must be a LIST of objects with "bias", "reason" and "implication".
+4. The A rules apply ONLY to "symptomMapping" and the B rules ONLY to "biasAwareness".
+   When a rule says to return an empty record, leave only that key empty; ALWAYS output both keys.
+
+""" + _sections(
+    ("A. SYMPTOMS: PATIENT-CENTERED FILTERING (CRITICAL)",
+     _section(symptom_mapper_instruction, "PATIENT-CENTERED FILTERING (CRITICAL)")),
+    ("A. SYMPTOMS: CONTEXT & MEMORY RULES", _section(symptom_mapper_instruction, "CONTEXT & MEMORY RULES")),
+    ("A. SYMPTOMS: CLUSTERING GUIDELINES", _section(symptom_mapper_instruction, "CLUSTERING GUIDELINES")),
+    ('B. BIASES: THE "NO DOCTOR, NO BIAS" RULE (PRIMARY FILTER)',
+     _section(bias_analyzer_instruction, 'THE "NO DOCTOR, NO BIAS" RULE (PRIMARY FILTER)')),
+    ("B. BIASES: STRICT FILTERING RULES (ELIMINATE FALSE POSITIVES)",
+     _section(bias_analyzer_instruction, "STRICT FILTERING RULES (ELIMINATE FALSE POSITIVES)")),
+    ("B. BIASES: CONTEXT & MEMORY RULES", _section(bias_analyzer_instruction, "CONTEXT & MEMORY RULES")),
+    ("B. BIASES: IMPLICATIONS",
+     'Leave every "implication" as an empty string. It is filled in from the AXIOM clinical\n'
+     'literature index after your response, so you do not need any tool.'),
+    ("EXAMPLES", fused_analysis_examples),
+) + "\n"
+
+
+def make_fused_analysis_agent() -> LlmAgent:
+    """
+    Builds `analysis_agent`, which maps symptoms and audits bias in one call.
+
+    `split_fused_analysis` writes its response to ``symptom_analysis`` and
+    ``bias_analysis``, the keys of the two workers it replaces, and fills in
+    the bias implications from `main_agent.axiom_service`, so the agent needs
+    no tool round trip.
+    """
+    return LlmAgent(
+        model=model_for(
+            'analysis_agent', default_model('analysis_agent'),
+            cache_instruction=fused_analysis_instruction,
+            output_schema=FusedAnalysis,
+        ),
+        name='analysis_agent',
+        description='Extracts patient-reported symptoms and documented provider bias from the conversation in one call.',
+        instruction=fused_analysis_instruction,
+        before_model_callback=route_model,
+        after_model_callback=[log_prompt_tokens, split_fused_analysis],
+    )
+
 
 # --- Worker Agent 3: Advocacy Generation ---
 advocacy_generator_instruction = """Act as a patient advocacy specialist. You will receive a context object that
@@ -298,17 +687,129 @@ EXAMPLE OUTPUT
 }
 """
 
-advocacy_generator_agent = LlmAgent(
-    model='gemini-2.5-flash-lite',
-    name='advocacy_generator_agent',
-    description='Generates patient advocacy questions based on symptom and bias analysis.',
-    instruction=advocacy_generator_instruction,
-    output_key="advocacy_analysis",
-)
+
+
+def make_advocacy_generator_agent(compact: bool = settings.compact_context) -> LlmAgent:
+    """
+    Builds the advocacy generator.
+
+    With ``compact`` context it sees only ``symptom_analysis`` and
+    ``bias_analysis`` (injected into the instruction) instead of the whole
+    conversation and every intermediate event.
+    """
+    instruction = advocacy_generator_instruction
+    if compact:
+        instruction += state_context("symptom_analysis", "bias_analysis")
+    return LlmAgent(
+        model=model_for(
+            'advocacy_generator_agent', default_model('advocacy_generator_agent'),
+            cache_instruction=instruction,
+            output_schema=AdvocacyAnalysis,
+        ),
+        name='advocacy_generator_agent',
+        description='Generates patient advocacy questions based on symptom and bias analysis.',
+        instruction=instruction,
+        include_contents='none' if compact else 'default',
+        before_model_callback=route_model,
+        after_model_callback=log_prompt_tokens,
+        output_key="advocacy_analysis",
+    )
+
+
+
+# --- Worker Agent 3 (fan-out): Per-Branch Advocacy Questions ---
+# With LUCIA_ADVOCACY_FANOUT the advocacy rules above are split by input, so each
+# analysis branch asks its own questions as soon as its worker finishes.
+symptom_question_instruction = """Act as a patient advocacy specialist. You will receive
+symptom_analysis.symptomMapping (symptom clusters reported by the patient).
+
+Your task is to generate clear, respectful, medically neutral questions a
+patient may ask their clinician about these symptoms. These questions must be
+based ONLY on the information provided.
+
+Your output MUST follow these rules:
+
+1. Output ONLY one JSON object with exactly one top-level key: "structuredAdvocacy".
+2. "structuredAdvocacy" must be a LIST of strings.
+3. For EACH symptom cluster, generate 1–2 clarification or exploration questions.
+   Examples:
+   - “What further evaluations could help understand my [symptom]?”
+   - “Are there additional causes we should consider for my [symptom]?”
+4. DO NOT provide diagnoses, suggest treatments, speculate, add emotional or
+   judgmental language, or introduce information not found in the context.
+
+If no questions can be generated, return: { "structuredAdvocacy": [] }
+""" + state_context("symptom_analysis")
+
+bias_question_instruction = """Act as a patient advocacy specialist. You will receive
+bias_analysis.biasAwareness (a list of documented provider biases).
+
+Your task is to generate clear, respectful, medically neutral questions that
+open a dialogue with the clinician about these observations. These questions
+must be based ONLY on the information provided.
+
+Your output MUST follow these rules:
+
+1. Output ONLY one JSON object with exactly one top-level key: "structuredAdvocacy".
+2. "structuredAdvocacy" must be a LIST of strings.
+3. For EACH detected bias, generate 1 question that opens dialogue.
+   Examples:
+   - “Can we consider alternative explanations beyond [bias reason]?”
+   - “What steps can we take to ensure my symptoms are evaluated thoroughly?”
+4. DO NOT provide diagnoses, suggest treatments, speculate, add emotional or
+   judgmental language, or introduce information not found in the context.
+
+If no questions can be generated, return: { "structuredAdvocacy": [] }
+""" + state_context("bias_analysis")
+
+
+def _make_question_agent(
+    name: str, instruction: str, input_key: str, output_key: str, description: str, skip_unchanged: bool
+) -> LlmAgent:
+    return LlmAgent(
+        model=model_for(
+            name, default_model(name),
+            cache_instruction=instruction,
+            output_schema=AdvocacyAnalysis,
+        ),
+        name=name,
+        description=description,
+        instruction=instruction,
+        include_contents='none',
+        before_model_callback=[question_call_guard(input_key, output_key, skip_unchanged), route_model],
+        after_model_callback=log_prompt_tokens,
+        output_key=output_key,
+    )
+
+
+def make_symptom_question_agent(skip_unchanged: bool = settings.skip_unchanged) -> LlmAgent:
+    """Builds the fan-out agent asking 1-2 questions per symptom cluster (``symptom_questions``)."""
+    return _make_question_agent(
+        'symptom_question_agent', symptom_question_instruction, "symptom_analysis", "symptom_questions",
+        'Generates patient advocacy questions for each reported symptom cluster.', skip_unchanged,
+    )
+
+
+def make_bias_question_agent(skip_unchanged: bool = settings.skip_unchanged) -> LlmAgent:
+    """Builds the fan-out agent asking one question per documented bias (``bias_questions``)."""
+    return _make_question_agent(
+        'bias_question_agent', bias_question_instruction, "bias_analysis", "bias_questions",
+        'Generates a patient advocacy question for each documented provider bias.', skip_unchanged,
+    )
+
+
+def make_advocacy_merge_agent() -> AdvocacyMergeAgent:
+    """Builds the step that merges the per-branch questions into ``advocacy_analysis``."""
+    return AdvocacyMergeAgent(
+        name='advocacy_merge_agent',
+        description='Merges the symptom and bias questions into the advocacy analysis without a model call.',
+    )
 
 
 # --- Worker Agent 4: Final Report Formatting  ---
-# This agent takes all previous outputs and formats them into a professional report.
+# The report is rendered in code by `ReportFormatterAgent`. The instruction below
+# drives the LLM formatter, which only runs as an opt-in fallback when one of the
+# analysis outputs cannot be parsed.
 professional_report_instruction = """Your sole job is to synthesize the outputs from the previous agents into a
 professional, patient-facing report. You will receive a context object that
 contains:
@@ -383,36 +884,197 @@ FORMATTING RULES
 • NEVER output JSON or additional explanations.  
 """
 
-report_formatter_agent = LlmAgent(
-    name="report_formatter_agent",
-    model="gemini-2.5-flash-lite",
-    instruction=professional_report_instruction,
-    output_key = "report"
-)
+def make_llm_report_formatter_agent() -> LlmAgent:
+    """Builds the LLM report formatter (the fallback for malformed analysis outputs)."""
+    return LlmAgent(
+        name="llm_report_formatter_agent",
+        model=model_for("llm_report_formatter_agent", default_model("llm_report_formatter_agent")),
+        before_model_callback=route_model,
+        instruction=professional_report_instruction
+        + state_context("symptom_analysis", "bias_analysis", "advocacy_analysis"),
+        include_contents='none',
+        after_model_callback=log_prompt_tokens,
+        output_key = "report"
+    )
+
+
+def make_report_formatter_agent(llm_fallback: bool = settings.report_llm_fallback) -> ReportFormatterAgent:
+    """Builds the deterministic report formatter, with the LLM formatter as fallback if ``llm_fallback``."""
+    return ReportFormatterAgent(
+        name="report_formatter_agent",
+        description="Renders the analysis outputs into the patient-facing report without a model call.",
+        output_key="report",
+        sub_agents=[make_llm_report_formatter_agent()] if llm_fallback else [],
+    )
+
+
+def make_history_compactor(config: LuciaSettings = settings) -> HistoryCompactor:
+    """Builds the history compactor with the ``LUCIA_HISTORY_*`` limits of ``config``."""
+    return HistoryCompactor(
+        name='history_compactor',
+        description='Replaces older turns with a digest of the current analysis and the patient messages.',
+        max_events=config.history_max_events,
+        token_budget=config.history_token_budget,
+        keep_turns=config.history_keep_turns,
+    )
+
+
+# The agent graph is built by the factories below, so that every entry point
+# (the local runners importing `root_agent`, ``lucia_deploy/agent.py`` for
+# Agent Engine) runs the same pipeline.
+def build_analysis_workflow(config: LuciaSettings = settings) -> BaseAgent:
+    """
+    Builds the analysis workflow described in the module docstring.
 
-"""
-This file defines the main `root_agent` as a sequence.
-"""
-# --- Define the Orchestrator Steps ---
-
-# STEP 1: Run symptom and bias analysis in parallel
-parallel_analysis_step = ParallelAgent(
-    name='parallel_analysis_step',
-    sub_agents=[
-        symptom_mapper_agent,
-        bias_analyzer_agent,
-    ],
-)
-
-# STEP 2: Run all the steps in order, ending with the formatting agent.
-analysis_workflow_agent = SequentialAgent(
-    name='analysis_workflow_agent',
-    sub_agents=[
-        parallel_analysis_step,
-        advocacy_generator_agent,
-        report_formatter_agent
-    ],
-    description='A workflow that analyzes a patient narrative and generates a formatted text report.',
-)
-
-root_agent = analysis_workflow_agent
+    Parameters
+    ----------
+    config : LuciaSettings
+        Pipeline switches (analysis mode and layout, pre-classifier, compact
+        context, advocacy fan-out, change gate, history compaction, LLM report
+        fallback, turn budget). Model routing, the model backend, the response
+        cache and tracing are process-wide and follow
+        `main_agent.config.settings`.
+
+    Returns
+    -------
+    BaseAgent
+        A new ``analysis_workflow_agent`` (a `SequentialAgent`, or a
+        `BudgetedWorkflowAgent` under a turn budget); every call builds fresh
+        agents.
+    """
+    if config.analysis_layout == "fused":
+        # STEP 1: One call writes both the symptom and the bias analysis.
+        analysis_step = make_fused_analysis_agent()
+        if config.advocacy_fanout:
+            advocacy_steps = [
+                ParallelAgent(
+                    name='advocacy_question_step',
+                    sub_agents=[
+                        make_symptom_question_agent(config.skip_unchanged),
+                        make_bias_question_agent(config.skip_unchanged),
+                    ],
+                ),
+                make_advocacy_merge_agent(),
+            ]
+        else:
+            advocacy_steps = [make_advocacy_generator_agent(config.compact_context)]
+    else:
+        symptom_mapper = make_symptom_mapper_agent(config.analysis_mode)
+        bias_analyzer = make_bias_analyzer_agent(config.analysis_mode, config.bias_preclassifier, config.axiom_batch)
+        if config.advocacy_fanout:
+            # Each branch asks its own questions as soon as its analysis is done;
+            # the merge afterwards is deterministic.
+            analysis_branches = [
+                SequentialAgent(
+                    name='symptom_branch',
+                    sub_agents=[symptom_mapper, make_symptom_question_agent(config.skip_unchanged)],
+                ),
+                SequentialAgent(
+                    name='bias_branch',
+                    sub_agents=[bias_analyzer, make_bias_question_agent(config.skip_unchanged)],
+                ),
+            ]
+            advocacy_steps = [make_advocacy_merge_agent()]
+        else:
+            analysis_branches = [symptom_mapper, bias_analyzer]
+            advocacy_steps = [make_advocacy_generator_agent(config.compact_context)]
+
+        # STEP 1: Run symptom and bias analysis in parallel
+        analysis_step = ParallelAgent(
+            name='parallel_analysis_step',
+            sub_agents=analysis_branches,
+        )
+
+    # STEP 2: Generate advocacy questions and the report, skipping both when the
+    # analysis did not change since the previous turn.
+    downstream_steps = [
+        *advocacy_steps,
+        make_report_formatter_agent(config.report_llm_fallback),
+    ]
+    if config.skip_unchanged:
+        downstream_steps = [
+            AnalysisChangeGate(
+                name='analysis_change_gate',
+                description='Reuses the stored advocacy questions and report when the analysis is unchanged.',
+                sub_agents=downstream_steps,
+            )
+        ]
+
+    # STEP 0: Collapse old turns into a digest once the history is too long.
+    workflow_steps = [analysis_step, *downstream_steps]
+    stages = ['analysis'] + ['advocacy'] * len(downstream_steps)
+    if config.history_max_events or config.history_token_budget:
+        workflow_steps.insert(0, make_history_compactor(config))
+        stages.insert(0, 'analysis')
+
+    # STEP 3: Run all the steps in order, ending with the formatting agent;
+    # under a turn budget, overrunning steps finish in the background.
+    if config.turn_budget:
+        return BudgetedWorkflowAgent(
+            name='analysis_workflow_agent',
+            sub_agents=workflow_steps,
+            description='A workflow that analyzes a patient narrative and generates a formatted text report '
+                        'within a time budget per turn.',
+            budget=config.turn_budget,
+            stages=stages,
+            shares=parse_budget_split(config.turn_budget_split),
+        )
+    return SequentialAgent(
+        name='analysis_workflow_agent',
+        sub_agents=workflow_steps,
+        description='A workflow that analyzes a patient narrative and generates a formatted text report.',
+    )
+
+
+def make_streaming_agent(workflow: BaseAgent) -> ReportStreamingAgent:
+    """Wraps ``workflow`` so the report is emitted section by section."""
+    return ReportStreamingAgent(
+        name='streaming_report_agent',
+        description='Streams the report as each analysis stage completes.',
+        workflow=workflow,
+    )
+
+
+def build_root_agent(
+    config: LuciaSettings = settings,
+    before_agent_callback: Optional[Callable] = None,
+) -> BaseAgent:
+    """
+    Builds the root agent of the pipeline for ``config``.
+
+    Parameters
+    ----------
+    config : LuciaSettings
+        See `build_analysis_workflow`; ``stream_report`` wraps the workflow
+        in the streaming agent.
+    before_agent_callback : Optional[Callable]
+        Runs before every invocation of the root agent, e.g. deployment
+        setup that should happen on the first request instead of at import.
+
+    Returns
+    -------
+    BaseAgent
+        The streaming agent or the analysis workflow.
+    """
+    root = build_analysis_workflow(config)
+    if config.stream_report:
+        root = make_streaming_agent(root)
+    if before_agent_callback is not None:
+        root.before_agent_callback = before_agent_callback
+    return root
+
+
+root_agent = build_root_agent()
+
+# The non-streaming and streaming forms share one workflow instance.
+analysis_workflow_agent = root_agent.workflow if settings.stream_report else root_agent
+streaming_root_agent = root_agent if settings.stream_report else make_streaming_agent(analysis_workflow_agent)
+
+# Components of the default graph (None when disabled by the settings).
+history_compactor = analysis_workflow_agent.find_agent('history_compactor')
+symptom_mapper_agent = analysis_workflow_agent.find_agent('symptom_mapper_agent')
+bias_analyzer_agent = analysis_workflow_agent.find_agent('bias_analyzer_agent')
+analysis_agent = analysis_workflow_agent.find_agent('analysis_agent')
+advocacy_generator_agent = analysis_workflow_agent.find_agent('advocacy_generator_agent')
+symptom_question_agent = analysis_workflow_agent.find_agent('symptom_question_agent')
+bias_question_agent = analysis_workflow_agent.find_agent('bias_question_agent')
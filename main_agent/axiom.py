@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AXIOM Clinical Knowledge Index
+
+Local retrieval layer behind the `get_bias_implications` tool. The AXIOM
+corpus (``main_agent/data/axiom_corpus.jsonl``) is loaded once per process
+into an in-memory index that resolves whatever bias name the model produces
+("ageism", "Age-Bias", "ageist") to the closest documented bias.
+
+Retrieval Strategy:
+    1.  **Alias normalization:** names are lower-cased, punctuation and spaces
+        are folded to ``_`` and the generic word "bias" is dropped, so
+        "Age Bias", "age_bias" and "age-bias" share one key.
+    2.  **Exact lookup:** a dict from every normalized id/alias to its entry,
+        tried for the whole name and then for its individual words
+        ("ethnic_stereotyping" -> "ethnic").
+    3.  **Fuzzy lookup:** a character trigram TF-IDF index (inverted postings,
+        cosine similarity) over the same aliases. Only n-grams shared with the
+        query are visited, so lookups stay under a millisecond for corpora of
+        thousands of entries.
+
+Corpus Format:
+    A JSONL (one object per line) or JSON list file of objects with the keys
+    ``id``, ``implication`` and optionally ``title`` and ``aliases``.
+
+Usage:
+    >>> from main_agent.axiom import default_index
+    >>> default_index().search("ageism").entry.id
+    'ageism_bias'
+"""
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "axiom_corpus.jsonl")
+
+# Returned by the lookup tools for names that match no documented bias.
+NO_AXIOM_INFORMATION = "No specific information found for this bias type in the AXIOM library."
+
+# Cosine similarity below which a fuzzy match is treated as "not in the library".
+MIN_SIMILARITY = 0.35
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_GENERIC_TOKENS = {"bias", "biases", "biased"}
+
+
+def normalize_bias_name(name: str) -> str:
+    """
+    Folds a bias name to its lookup key.
+
+    >>> normalize_bias_name("Age-Bias")
+    'age'
+    """
+    tokens = [t for t in _NON_WORD.sub("_", str(name).lower()).split("_") if t]
+    core = [t for t in tokens if t not in _GENERIC_TOKENS]
+    return "_".join(core or tokens)
+
+
+def _trigrams(key: str) -> Counter:
+    padded = f"#{key}#"
+    return Counter(padded[i:i + 3] for i in range(max(1, len(padded) - 2)))
+
+
+@dataclass(frozen=True)
+class AxiomEntry:
+    """One documented bias and its clinical implication."""
+
+    id: str
+    implication: str
+    title: str = ""
+    aliases: tuple = field(default_factory=tuple)
+
+
+@dataclass(frozen=True)
+class AxiomMatch:
+    """Result of an index search; ``score`` is 1.0 for exact alias hits."""
+
+    entry: AxiomEntry
+    score: float
+    exact: bool
+
+
+class AxiomIndex:
+    """
+    In-memory retrieval index over the AXIOM corpus.
+
+    Parameters
+    ----------
+    entries : Iterable[AxiomEntry]
+        The documented biases. The first entry wins on alias collisions
+        (later duplicates are logged and ignored).
+    min_similarity : float
+        Minimum cosine similarity for a fuzzy match.
+    """
+
+    def __init__(self, entries: Iterable[AxiomEntry], min_similarity: float = MIN_SIMILARITY):
+        self.entries = list(entries)
+        self.min_similarity = min_similarity
+        self._exact = {}
+        self._postings = {}
+
+        keys = []
+        for position, entry in enumerate(self.entries):
+            for name in (entry.id, *entry.aliases):
+                key = normalize_bias_name(name)
+                if not key:
+                    continue
+                if key in self._exact:
+                    if self._exact[key] != position:
+                        logger.warning("AXIOM alias %r of %s is already used by %s; ignored",
+                                       name, entry.id, self.entries[self._exact[key]].id)
+                    continue
+                self._exact[key] = position
+                keys.append((key, position))
+
+        doc_grams = [_trigrams(key) for key, _ in keys]
+        document_frequency = Counter(gram for grams in doc_grams for gram in grams)
+        total = len(doc_grams)
+        self._idf = {gram: math.log(1 + total / df) for gram, df in document_frequency.items()}
+        self._unseen_idf = math.log(1 + total)
+
+        self._doc_entry = []
+        for doc_id, ((_, position), grams) in enumerate(zip(keys, doc_grams)):
+            weights = {gram: count * self._idf[gram] for gram, count in grams.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                self._postings.setdefault(gram, []).append((doc_id, weight / norm))
+            self._doc_entry.append(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "AxiomIndex":
+        """Loads a corpus from a ``.jsonl`` or ``.json`` file."""
+        with open(path, encoding="utf-8") as handle:
+            if path.endswith(".jsonl"):
+                records = [json.loads(line) for line in handle if line.strip()]
+            else:
+                records = json.load(handle)
+        return cls((cls._entry(record) for record in records), **kwargs)
+
+    @staticmethod
+    def _entry(record: dict) -> AxiomEntry:
+        return AxiomEntry(
+            id=record["id"],
+            implication=record["implication"],
+            title=record.get("title", ""),
+            aliases=tuple(record.get("aliases", ())),
+        )
+
+    def search(self, bias_type: str) -> Optional[AxiomMatch]:
+        """
+        Finds the entry that best matches ``bias_type``.
+
+        Returns
+        -------
+        Optional[AxiomMatch]
+            The best match, or None if nothing clears ``min_similarity``.
+        """
+        key = normalize_bias_name(bias_type)
+        if not key:
+            return None
+        position = self._exact.get(key)
+        if position is not None:
+            return AxiomMatch(self.entries[position], 1.0, True)
+
+        word_hits = {self._exact[word] for word in key.split("_") if word in self._exact}
+        if len(word_hits) == 1:
+            return AxiomMatch(self.entries[word_hits.pop()], 1.0, True)
+
+        query, unseen = {}, 0.0
+        for gram, count in _trigrams(key).items():
+            if gram in self._idf:
+                query[gram] = count * self._idf[gram]
+            else:
+                # Unseen n-grams still count towards the query norm, so a long
+                # query sharing one trigram with an alias does not score highly.
+                unseen += (count * self._unseen_idf) ** 2
+        if not query:
+            return None
+        norm = math.sqrt(sum(w * w for w in query.values()) + unseen)
+
+        scores = {}
+        for gram, weight in query.items():
+            for doc_id, doc_weight in self._postings[gram]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * doc_weight
+
+        doc_id, score = max(scores.items(), key=lambda item: item[1])
+        score /= norm
+        if score < self.min_similarity:
+            return None
+        return AxiomMatch(self.entries[self._doc_entry[doc_id]], score, False)
+
+
+@lru_cache(maxsize=None)
+def load_index(path: str = DEFAULT_CORPUS_PATH) -> AxiomIndex:
+    """Loads (once per path, per process) the AXIOM index."""
+    return AxiomIndex.from_file(path)
+
+
+def default_index() -> AxiomIndex:
+    """The index for the corpus configured by ``LUCIA_AXIOM_CORPUS``."""
+    return load_index(settings.axiom_corpus_path or DEFAULT_CORPUS_PATH)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Bias Implication Service
+
+Asynchronous, batched access to the AXIOM knowledge store for the
+`get_bias_implications_batch` tool and the fused analysis layout
+(`main_agent.fused`). One tool call resolves every bias the analyzer found,
+so a turn needs one tool round trip instead of one per bias, and the store
+is queried once per batch.
+
+The store is an `AxiomStore`: `LocalAxiomStore` answers from the in-memory
+index (`main_agent.axiom`); a remote vector database implements the same
+``search_many`` coroutine. In front of the store the service:
+
+    * normalizes names (`main_agent.axiom.normalize_bias_name`), so
+        "Age-Bias" and "age_bias" are one lookup,
+    * serves recent results from a TTL cache (``LUCIA_AXIOM_CACHE_TTL``;
+        unknown names are cached too),
+    * coalesces concurrent lookups of the same name across sessions: only
+        the first caller queries the store, the others await its result.
+
+Key Components:
+    * `AxiomStore` / `LocalAxiomStore`: The store interface and the local index.
+    * `BiasImplicationService`: Cache + coalescing in front of a store.
+    * `implication_service` / `use_implication_service`: The process-wide
+        service and an in-process override (e.g. for a remote store).
+
+Metrics (`main_agent.metrics`):
+    * ``axiom.lookups``: Names requested (after de-duplication per call).
+    * ``axiom.cache_hits``: Names answered from the TTL cache.
+    * ``axiom.coalesced``: Names that joined another caller's store query.
+    * ``axiom.store_queries`` / ``axiom.store_names``: Store round trips
+        and the names sent in them.
+
+Usage:
+    >>> service = BiasImplicationService(LocalAxiomStore(), ttl_seconds=600)
+    >>> await service.lookup(["ageism", "gender_bias"])
+    {'ageism': 'Dismissing a patient...', 'gender_bias': '...'}
+"""
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from . import metrics
+from .axiom import NO_AXIOM_INFORMATION, AxiomIndex, AxiomMatch, default_index, normalize_bias_name
+from .config import settings
+
+
+class AxiomStore:
+    """Interface of the knowledge store behind the implication service."""
+
+    async def search_many(self, bias_types: Sequence[str]) -> List[Optional[AxiomMatch]]:
+        """Best match (or None) for each of ``bias_types``, in order."""
+        raise NotImplementedError
+
+
+class LocalAxiomStore(AxiomStore):
+    """
+    The in-memory AXIOM index as a store.
+
+    Parameters
+    ----------
+    index : Optional[AxiomIndex]
+        The index to search; default: `main_agent.axiom.default_index`.
+    latency : float
+        Seconds to sleep per query, to stand in for a remote store in tests
+        and benchmarks.
+    """
+
+    def __init__(self, index: Optional[AxiomIndex] = None, latency: float = 0.0):
+        self._index = index
+        self.latency = latency
+
+    async def search_many(self, bias_types: Sequence[str]) -> List[Optional[AxiomMatch]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        index = self._index or default_index()
+        return [index.search(bias_type) for bias_type in bias_types]
+
+
+class BiasImplicationService:
+    """
+    TTL-cached, coalescing lookups of clinical implications.
+
+    Parameters
+    ----------
+    store : AxiomStore
+        Where cache misses are resolved.
+    ttl_seconds : float
+        Lifetime of a cached implication (0 disables the cache; concurrent
+        lookups are still coalesced).
+    max_entries : int
+        Capacity of the cache (least recently used entries are evicted).
+    """
+
+    def __init__(self, store: AxiomStore, ttl_seconds: float = 3600.0, max_entries: int = 4096):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def lookup(self, bias_types: Sequence[str]) -> Dict[str, str]:
+        """
+        Resolves every name in ``bias_types``.
+
+        Returns
+        -------
+        Dict[str, str]
+            The implication per requested name (`NO_AXIOM_INFORMATION` for
+            names the store does not know).
+
+        Raises
+        ------
+        Exception
+            Whatever the store raised; callers coalesced onto a failed query
+            receive the same error.
+        """
+        keys = {name: normalize_bias_name(name) for name in bias_types}
+        by_key = await self._resolve([key for key in dict.fromkeys(keys.values()) if key])
+        return {name: by_key.get(key, NO_AXIOM_INFORMATION) for name, key in keys.items()}
+
+    async def _resolve(self, keys: List[str]) -> Dict[str, str]:
+        metrics.increment("axiom.lookups", len(keys))
+        resolved, waiting, misses = {}, {}, []
+        now, loop = time.monotonic(), asyncio.get_running_loop()
+        for key in keys:
+            cached = self._cached(key, now)
+            inflight = self._inflight.get(key)
+            if cached is not None:
+                resolved[key] = cached
+            elif inflight is not None and inflight.get_loop() is loop:
+                waiting[key] = inflight
+            else:
+                misses.append(key)
+        metrics.increment("axiom.cache_hits", len(resolved))
+        metrics.increment("axiom.coalesced", len(waiting))
+
+        if misses:
+            resolved.update(await self._query(misses))
+        for key, future in waiting.items():
+            try:
+                resolved[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled
+                # The caller that owned the query was cancelled; query again.
+                resolved.update(await self._resolve([key]))
+        return resolved
+
+    async def _query(self, keys: List[str]) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        self._inflight.update(futures)
+        metrics.increment("axiom.store_queries")
+        metrics.increment("axiom.store_names", len(keys))
+        try:
+            matches = await self.store.search_many(keys)
+            if len(matches) != len(keys):
+                # Unmatched futures would never resolve and their waiters would hang.
+                raise ValueError(f"AXIOM store returned {len(matches)} matches for {len(keys)} names.")
+            results = {
+                key: match.entry.implication if match else NO_AXIOM_INFORMATION
+                for key, match in zip(keys, matches)
+            }
+            for key, implication in results.items():
+                self._remember(key, implication)
+                futures[key].set_result(implication)
+            return results
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    future.exception()  # retrieved: waiters re-raise it, nobody else must
+            raise
+        finally:
+            for key in keys:
+                if self._inflight.get(key) is futures[key]:
+                    del self._inflight[key]
+
+    def _cached(self, key: str, now: float) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def _remember(self, key: str, implication: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, implication)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+_service_override: Optional[BiasImplicationService] = None
+_env_service: Optional[BiasImplicationService] = None
+
+
+def implication_service() -> BiasImplicationService:
+    """The active service: the in-process override, else the local store with ``LUCIA_AXIOM_CACHE_TTL``."""
+    global _env_service
+    if _service_override is not None:
+        return _service_override
+    if _env_service is None:
+        _env_service = BiasImplicationService(LocalAxiomStore(), ttl_seconds=settings.axiom_cache_ttl)
+    return _env_service
+
+
+def set_implication_service(service: Optional[BiasImplicationService]) -> None:
+    """Installs ``service`` for the process (None restores the default)."""
+    global _service_override
+    _service_override = service
+
+
+@contextlib.contextmanager
+def use_implication_service(service: BiasImplicationService):
+    """Context manager form of `set_implication_service` that restores the previous service."""
+    previous = _service_override
+    set_implication_service(service)
+    try:
+        yield service
+    finally:
+        set_implication_service(previous)
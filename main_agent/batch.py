@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Batch Processing
+
+Back-processes archives of intake transcripts through `root_agent`. Input
+records are streamed from a JSONL file, processed with bounded concurrency
+and an optional rate limit, and written to a JSONL output file as they
+complete. Progress is checkpointed so that an interrupted run resumes where
+it stopped.
+
+Input Format (one JSON object per line):
+    * ``{"id": "p-001", "messages": ["first message", "second message"]}``:
+        a multi-turn session, replayed turn by turn.
+    * ``{"id": "p-002", "text": "single narrative"}``: a one-turn session.
+    Records without an ``id`` are identified by their line number.
+
+Output Format (one JSON object per line, in completion order):
+    ``{"id", "status": "ok", "report", "symptom_analysis", "bias_analysis",
+    "advocacy_analysis", "turns", "elapsed_s"}`` or
+    ``{"id", "status": "error", "error"}``.
+
+Checkpointing:
+    The checkpoint stores the first input line that is not yet finished
+    plus the finished lines beyond it, which never exceed the read-ahead
+    window. Memory therefore stays constant regardless of the input size.
+    Delivery is at-least-once: a record completed just before a crash may
+    appear twice in the output, with the same ``id``.
+
+Usage:
+    Run from the project root:
+    $ python -m main_agent.batch archive.jsonl -o reports.jsonl --concurrency 16 --rate 10
+    $ LUCIA_MODEL_BACKEND=standin python -m main_agent.batch archive.jsonl -o reports.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "lucia_batch"
+USER_ID = "batch"
+OUTPUT_KEYS = ("report", "symptom_analysis", "bias_analysis", "advocacy_analysis")
+
+
+class RateLimiter:
+    """
+    Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``.
+
+    A ``rate`` of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Checkpoint:
+    """
+    Resumable progress over the input lines.
+
+    ``next_line`` is the first unfinished line; ``done`` holds the finished
+    lines after it (bounded by the read-ahead window).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.next_line = 0
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            self.next_line = data.get("next_line", 0)
+            self.done = set(data.get("done", []))
+
+    def is_done(self, line: int) -> bool:
+        return line < self.next_line or line in self.done
+
+    def mark_done(self, line: int) -> None:
+        self.done.add(line)
+        while self.next_line in self.done:
+            self.done.remove(self.next_line)
+            self.next_line += 1
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump({"next_line": self.next_line, "done": sorted(self.done)}, handle)
+        os.replace(tmp, self.path)
+
+
+def read_records(path: str) -> Iterator[tuple]:
+    """
+    Yields ``(line number, record or error message)`` without loading the
+    file; blank lines yield ``(line number, None)``, so they can be
+    checkpointed like records.
+    """
+    with open(path, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle):
+            if not line.strip():
+                yield line_number, None
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_number, f"Invalid JSON: {exc}"
+                continue
+            yield line_number, record
+
+
+def record_messages(record: dict) -> list:
+    """The patient messages of an input record."""
+    messages = record.get("messages")
+    if messages is None:
+        text = record.get("text") or record.get("narrative")
+        messages = [text] if text else []
+    if not isinstance(messages, list) or not all(isinstance(m, str) and m.strip() for m in messages) or not messages:
+        raise ValueError('Record needs a non-empty "messages" list or a "text" string.')
+    return messages
+
+
+async def process_record(runner, session_service, record: dict, limiter: RateLimiter) -> dict:
+    """Runs one record's messages through the runner in a fresh session and collects the outputs."""
+    from google.genai import types as genai_types
+
+    messages = record_messages(record)
+    session_id = f"batch-{uuid.uuid4().hex}"
+    await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    start = time.perf_counter()
+    try:
+        for message in messages:
+            await limiter.acquire()
+            async for _event in runner.run_async(
+                user_id=USER_ID,
+                session_id=session_id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=message)]),
+            ):
+                pass
+        session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        outputs = {key: session.state.get(key) for key in OUTPUT_KEYS}
+    finally:
+        await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    return {"status": "ok", **outputs, "turns": len(messages), "elapsed_s": round(time.perf_counter() - start, 3)}
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = 8,
+    rate: float = 0.0,
+    limit: Optional[int] = None,
+    agent=None,
+) -> dict:
+    """
+    Processes ``input_path`` into ``output_path``, resuming from the checkpoint.
+
+    Parameters
+    ----------
+    input_path, output_path : str
+        JSONL input records and JSONL results (appended to when resuming).
+    checkpoint_path : Optional[str]
+        Progress file; defaults to ``<output_path>.checkpoint``.
+    concurrency : int
+        Records processed at the same time.
+    rate : float
+        Maximum turns started per second (0 = unlimited).
+    limit : Optional[int]
+        Stop after this many new records (useful for trial runs).
+    agent : Optional[BaseAgent]
+        Agent to run; defaults to `main_agent.agent.root_agent`.
+
+    Returns
+    -------
+    dict
+        Counts of ``processed``, ``errors`` and ``skipped`` (already done) records.
+    """
+    from google.adk.runners import Runner
+
+    from .sessions import session_service_from_settings
+
+    if agent is None:
+        from .agent import root_agent as agent
+
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint")
+    session_service = session_service_from_settings()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    limiter = RateLimiter(rate)
+    window = asyncio.Semaphore(max(concurrency * 4, concurrency + 1))  # read-ahead bound for the checkpoint
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"processed": 0, "errors": 0, "skipped": 0}
+    write_lock = asyncio.Lock()
+
+    async def _worker(output) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            line_number, record = item
+            record_id = record.get("id", f"line-{line_number}") if isinstance(record, dict) else f"line-{line_number}"
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError(record if isinstance(record, str) else "Record is not a JSON object.")
+                result = await process_record(runner, session_service, record, limiter)
+            except Exception as exc:  # noqa: BLE001 - one bad record must not stop the batch
+                logger.warning("Record %s failed: %s", record_id, exc)
+                result = {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+            async with write_lock:
+                output.write(json.dumps({"id": record_id, **result}, ensure_ascii=False) + "\n")
+                output.flush()
+                checkpoint.mark_done(line_number)
+                checkpoint.save()
+                stats["processed"] += 1
+                stats["errors"] += result["status"] == "error"
+                if stats["processed"] % 100 == 0:
+                    logger.info("%d records processed (%d errors)", stats["processed"], stats["errors"])
+            window.release()
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        workers = [asyncio.create_task(_worker(output)) for _ in range(concurrency)]
+        queued = 0
+        for line_number, record in read_records(input_path):
+            if checkpoint.is_done(line_number):
+                stats["skipped"] += record is not None
+                continue
+            if record is None:
+                # Nothing to process, but `next_line` must move past it.
+                checkpoint.mark_done(line_number)
+                continue
+            if limit is not None and queued >= limit:
+                break
+            await window.acquire()
+            await queue.put((line_number, record))
+            queued += 1
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    checkpoint.save()  # trailing blank lines
+    await session_service.flush()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSONL file of narratives")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (appended to on resume)")
+    parser.add_argument("--checkpoint", help="progress file (default: <output>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="records processed at the same time")
+    parser.add_argument("--rate", type=float, default=0.0, help="max turns started per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int, help="stop after this many new records")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint and output")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    if args.restart:
+        for path in (args.output, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    start = time.perf_counter()
+    stats = asyncio.run(run_batch(
+        args.input, args.output, checkpoint_path, args.concurrency, args.rate, args.limit
+    ))
+    elapsed = time.perf_counter() - start
+    print(f"{stats['processed']} records processed ({stats['errors']} errors, "
+          f"{stats['skipped']} already done) in {elapsed:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Turn Time Budget
+
+Without a budget a turn either completes `analysis_workflow_agent` or fails,
+so one slow stage (a latency spike, a retried call) sets the latency of the
+whole turn. With ``LUCIA_TURN_BUDGET`` set, `BudgetedWorkflowAgent` replaces
+the workflow's `SequentialAgent` and gives every turn an end-to-end deadline,
+split across its stages (``LUCIA_TURN_BUDGET_SPLIT``):
+
+    * ``analysis``: history compaction and the symptom/bias analysis,
+    * ``advocacy``: the advocacy questions and the report.
+
+A stage has to finish by the end of its cumulative share of the budget
+(with the default split 70% for the analysis, the whole budget for the
+advocacy). When a stage overruns, the turn ends at once with a partial
+report in the usual template (`main_agent.report.render_partial_sections`):
+the sections produced so far in this turn, the others marked pending. The
+remaining steps keep running in the background. Their events are appended
+to the session directly (runner plugins do not see them), so the finished
+analysis, questions and report are in the session for the next turn.
+
+The steps of the next turn of the same session start only once that
+background work is done, on the session reloaded from the session service,
+so they run on complete state instead of racing it (in incremental mode no
+message's delta is lost). The wait counts against the new turn's own
+budget: if the previous work is still running at its cutoff, the new turn
+is answered with a partial report too and its steps follow in the
+background. A partial report also clears the change gate's fingerprint,
+so it is never reused as a complete report.
+
+Key Components:
+    * `BudgetedWorkflowAgent`: Sequential workflow with per-stage cutoffs and
+        background completion. Its steps never see the turn's own partial
+        report, which would otherwise start the "current turn" of workers
+        that only read the current turn (``include_contents='none'``).
+    * `parse_budget_split`: ``"analysis=0.7,advocacy=0.3"`` -> shares.
+    * `wait_for_background`: Awaits the background work of all sessions
+        (graceful shutdown, benchmarks, tests).
+
+Metrics (`main_agent.metrics`):
+    * ``turn_budget.turns``: Turns run under a budget.
+    * ``turn_budget.degraded.<stage>``: Turns answered with a partial report
+        because ``<stage>`` overran.
+    * ``turn_budget.background_completed`` / ``background_failed``: Outcome
+        of the work finished in the background.
+    * ``turn_budget.background_waits``: Turns that had to wait for the
+        previous turn's background work.
+
+Usage:
+    >>> from dataclasses import replace
+    >>> from main_agent.agent import build_root_agent
+    >>> agent = build_root_agent(replace(settings, turn_budget=8.0))
+"""
+import asyncio
+import logging
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from . import metrics
+from .change_detection import FINGERPRINT_KEY
+from .report import (
+    ReportInputError,
+    extract_bias_awareness,
+    extract_structured_advocacy,
+    extract_symptom_mapping,
+    render_partial_sections,
+)
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("analysis", "advocacy")
+
+_SECTIONS = (
+    ("symptom_analysis", extract_symptom_mapping),
+    ("bias_analysis", extract_bias_awareness),
+    ("advocacy_analysis", extract_structured_advocacy),
+)
+
+_background: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+
+def parse_budget_split(spec: str) -> Dict[str, float]:
+    """
+    ``"analysis=0.7,advocacy=0.3"`` -> shares of the budget per stage.
+
+    Shares are normalized to sum to 1; stages left out get no share.
+
+    Raises
+    ------
+    ValueError
+        For unknown stages, negative shares or a split without any share.
+    """
+    shares = dict.fromkeys(STAGES, 0.0)
+    for item in spec.split(","):
+        if item.strip():
+            stage, _, share = item.partition("=")
+            stage = stage.strip()
+            if stage not in shares:
+                raise ValueError(f"Unknown budget stage {stage!r}; expected one of {STAGES}.")
+            shares[stage] = float(share)
+    total = sum(shares.values())
+    if total <= 0 or any(share < 0 for share in shares.values()):
+        raise ValueError(f"Invalid turn budget split {spec!r}.")
+    return {stage: share / total for stage, share in shares.items()}
+
+
+def _forget(key: Tuple[str, str, str], task: asyncio.Task) -> None:
+    if _background.get(key) is task:
+        del _background[key]
+
+
+async def wait_for_background(timeout: Optional[float] = None) -> bool:
+    """Waits for the background work of every session; returns False on timeout."""
+    tasks = [task for task in _background.values() if task.get_loop() is asyncio.get_running_loop()]
+    if not tasks:
+        return True
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    return not pending
+
+
+def _is_partial_report(event: Event) -> bool:
+    return bool((event.custom_metadata or {}).get("partial_report"))
+
+
+class _StepPump:
+    """
+    Runs the steps in a task of their own (after the task ``after``, if
+    given) and hands their events over one at a time. An event handed over
+    is acknowledged once the consumer is resumed, i.e. after the runner has
+    appended it, so the steps see the same session state as under a plain
+    sequential run. Once detached and released (after the partial report
+    has been handed to the runner), the pump appends the events itself.
+
+    The steps run on a session of their own that shares the runner's state
+    and events until `detach`; from then on its events stay without the
+    partial report.
+    """
+
+    def __init__(self, ctx: InvocationContext, steps: List[BaseAgent], after: Optional[asyncio.Task] = None):
+        self.session = ctx.session.model_copy()
+        self.ctx = ctx.model_copy(update={"session": self.session})
+        self.steps = steps
+        self.after = after
+        self.detached = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._released = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        try:
+            if self.after is not None:
+                await asyncio.wait({self.after})  # the previous turn's background work
+                await self._reload()
+            for index, step in enumerate(self.steps):
+                if not self.detached:
+                    self.queue.put_nowait(("step", index, None))
+                async for event in step.run_async(self.ctx):
+                    if not self.detached:
+                        delivered = asyncio.get_running_loop().create_future()
+                        self.queue.put_nowait(("event", event, delivered))
+                        if await delivered:
+                            continue
+                    if not event.partial:
+                        await self._released.wait()
+                        await self.ctx.session_service.append_event(session=self.session, event=event)
+        except Exception as exc:
+            if not self.detached:
+                self.queue.put_nowait(("error", exc, None))
+                return
+            metrics.increment("turn_budget.background_failed")
+            logger.warning("Session %s: background completion failed: %s", self.session.id, exc)
+            return
+        if self.detached:
+            metrics.increment("turn_budget.background_completed")
+        else:
+            self.queue.put_nowait(("done", None, None))
+
+    async def _reload(self) -> None:
+        """Replaces the session loaded before the previous turn's background work finished."""
+        while True:
+            detached = self.detached
+            if detached:
+                await self._released.wait()  # the partial report is stored
+            fresh = await self.ctx.session_service.get_session(
+                app_name=self.session.app_name, user_id=self.session.user_id, session_id=self.session.id)
+            if fresh is None:
+                return
+            if self.detached == detached:
+                break  # else the partial report may be missing; load again
+        # The previous turn's background events were stored after this turn's
+        # message, which has to come last to start the current turn.
+        own = [event for event in fresh.events if event.invocation_id == self.ctx.invocation_id]
+        events = [event for event in fresh.events if event.invocation_id != self.ctx.invocation_id]
+        events += [event for event in own if not _is_partial_report(event)]
+        self.session.state.clear()
+        self.session.state.update(fresh.state)
+        self.session.last_update_time = fresh.last_update_time
+        if self.detached:
+            self.session.events = events
+        else:
+            self.session.events[:] = events  # shared with the runner's session
+
+    async def next(self, deadline: float) -> Optional[tuple]:
+        """The next item, or None once ``deadline`` (loop time) has passed."""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        timeout = deadline - asyncio.get_running_loop().time()
+        if timeout <= 0:
+            return None
+        getter = asyncio.ensure_future(self.queue.get())
+        done, _ = await asyncio.wait({getter}, timeout=timeout)
+        if done:
+            return getter.result()
+        getter.cancel()
+        return None
+
+    def detach(self) -> None:
+        """Stops handing events over; the pump keeps them until `release`."""
+        self.detached = True
+        self.session.events = list(self.session.events)  # without the partial report to come
+
+    def release(self) -> None:
+        """Lets the detached pump append the remaining events itself."""
+        self._released.set()
+        while not self.queue.empty():
+            kind, _, delivered = self.queue.get_nowait()
+            if kind == "event":
+                delivered.set_result(False)
+
+
+class BudgetedWorkflowAgent(BaseAgent):
+    """
+    Runs its sub-agents in order within a time budget per turn.
+
+    ``stages`` names the stage (`STAGES`) of every sub-agent; ``shares`` is
+    a `parse_budget_split` result.
+    """
+
+    budget: float
+    stages: list
+    shares: dict
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        cutoffs, elapsed_share = {}, 0.0
+        for stage in STAGES:
+            elapsed_share += self.shares.get(stage, 0.0)
+            cutoffs[stage] = started + self.budget * elapsed_share
+        metrics.increment("turn_budget.turns")
+
+        key = (ctx.session.app_name, ctx.session.user_id, ctx.session.id)
+        previous = _background.get(key)
+        if previous is not None and (previous.done() or previous.get_loop() is not loop):
+            previous = None
+        if previous is not None:
+            metrics.increment("turn_budget.background_waits")
+
+        pump = _StepPump(ctx, list(self.sub_agents), after=previous)
+        written, stage = set(), self.stages[0]
+        try:
+            while True:
+                item = await pump.next(cutoffs[stage])
+                if item is None:
+                    break
+                kind, value, delivered = item
+                if kind == "step":
+                    stage = self.stages[value]
+                elif kind == "event":
+                    if not value.partial and value.actions and value.actions.state_delta:
+                        written.update(value.actions.state_delta)
+                    yield value
+                    delivered.set_result(True)
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+
+            pump.detach()
+            _background[key] = pump.task
+            pump.task.add_done_callback(lambda task: _forget(key, task))
+            metrics.increment(f"turn_budget.degraded.{stage}")
+            annotate({"lucia.turn_budget.degraded": stage})
+            logger.warning("Session %s: %s stage overran the %.1fs turn budget; sending a partial report",
+                           ctx.session.id, stage, self.budget)
+            report = render_partial_sections(*self._available(ctx, written))
+            # The pump appends nothing before this event has been stored
+            # (`release` below), so the complete report always lands after it.
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part.from_text(text=report)]),
+                actions=EventActions(state_delta={"report": report, FINGERPRINT_KEY: None}),
+                custom_metadata={"partial_report": True, "overrun_stage": stage},
+            )
+        finally:
+            if pump.detached:
+                pump.release()
+            else:
+                pump.task.cancel()  # finished, failed, or the caller stopped the turn
+
+    @staticmethod
+    def _available(ctx: InvocationContext, written: set) -> list:
+        """This turn's value of every report section, None where it is still pending."""
+        sections = []
+        for key, extractor in _SECTIONS:
+            value = None
+            if key in written:
+                try:
+                    value = extractor(ctx.session.state.get(key))
+                except ReportInputError:
+                    logger.warning("Ignoring malformed %s in the partial report", key)
+            sections.append(value)
+        return sections
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Worker Response Cache
+
+Many intake sessions open with near-identical messages, and retried turns
+resend the same history, yet every turn pays for the worker model calls. This
+module caches model responses for `symptom_mapper_agent`,
+`bias_analyzer_agent` and `advocacy_generator_agent` (or, with advocacy
+fan-out, `symptom_question_agent` and `bias_question_agent`).
+
+The cache sits inside the `LuciaModel` proxy (`main_agent.models`), so a hit
+replaces only the network call: the agent's callbacks still run and its
+``output_key`` is written exactly as for a live response.
+
+Cache Key:
+    sha256 of (agent name, instruction version, model, normalized request),
+    where the model is the one the call is routed to (`main_agent.routing`),
+    so a lite-tier answer is never served for an escalated call, and the
+    instruction version is a hash of the agent's instruction template and
+    the normalized request is the rendered system instruction (including any
+    injected state) plus the conversation contents, lower-cased and
+    whitespace-collapsed. Function-call ids are ignored.
+
+Tiers:
+    1.  In-process LRU with a TTL (`collections.OrderedDict`).
+    2.  Optional SQLite file shared across processes and restarts.
+
+Invalidation:
+    Entries are bound to their instruction version, so editing an
+    instruction string makes old entries unreachable. The first time a new
+    version is seen for an agent, entries for its older versions are purged
+    from both tiers.
+
+Usage:
+    >>> from main_agent.cache import ResponseCache, use_response_cache
+    >>> with use_response_cache(ResponseCache(max_entries=512, ttl_seconds=600)) as cache:
+    ...     ...
+    ...     cache.stats()
+"""
+import contextlib
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .config import settings
+
+
+def instruction_version(instruction: str) -> str:
+    """Short, stable hash identifying an instruction template."""
+    return hashlib.sha256(instruction.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _normalize_part(part: types.Part) -> Any:
+    if part.text:
+        return _normalize_text(part.text)
+    if part.function_call:
+        return {"call": part.function_call.name, "args": part.function_call.args or {}}
+    if part.function_response:
+        return {"result": part.function_response.name, "response": part.function_response.response or {}}
+    return None
+
+
+def normalize_request(llm_request: LlmRequest) -> str:
+    """Canonical text of everything in the request that can change the model output."""
+    system = llm_request.config.system_instruction if llm_request.config else None
+    contents = [
+        [content.role, [_normalize_part(part) for part in content.parts or []]]
+        for content in llm_request.contents
+    ]
+    return json.dumps([_normalize_text(str(system or "")), contents], sort_keys=True, default=str)
+
+
+def cache_key(agent_name: str, version: str, llm_request: LlmRequest, model: Optional[str] = None) -> str:
+    """Key of a request; ``model`` defaults to the request's (routed) model."""
+    payload = json.dumps([agent_name, version, model or llm_request.model, normalize_request(llm_request)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache of final model responses.
+
+    Parameters
+    ----------
+    max_entries : int
+        Capacity of the in-process LRU.
+    ttl_seconds : float
+        Time-to-live of an entry in both tiers.
+    sqlite_path : Optional[str]
+        File for the on-disk tier; None keeps the cache in memory only.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._versions = {}
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, agent TEXT, version TEXT, payload TEXT, expires_at REAL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def check_version(self, agent_name: str, version: str) -> None:
+        """Purges entries of ``agent_name`` cached under an older instruction version."""
+        if self._versions.get(agent_name) == version:
+            return
+        self._versions[agent_name] = version
+        stale = [key for key, (agent, entry_version, _, _) in self._memory.items()
+                 if agent == agent_name and entry_version != version]
+        for key in stale:
+            del self._memory[key]
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE agent = ? AND version != ?", (agent_name, version))
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[LlmResponse]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[3] >= now:
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                return LlmResponse.model_validate_json(entry[2])
+            del self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT agent, version, payload, expires_at FROM responses WHERE key = ? AND expires_at >= ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+                return LlmResponse.model_validate_json(row[2])
+
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, agent_name: str, version: str, response: LlmResponse) -> None:
+        payload = response.model_dump_json(exclude_none=True)
+        entry = (agent_name, version, payload, time.time() + self.ttl_seconds)
+        self._remember(key, entry)
+        self._counters["stores"] += 1
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, *entry))
+            self._db.commit()
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus the current number of in-memory entries."""
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_cache_override: Optional[ResponseCache] = None
+_env_cache: Optional[ResponseCache] = None
+
+
+def response_cache() -> Optional[ResponseCache]:
+    """The active cache: the in-process override, else one built from ``LUCIA_RESPONSE_CACHE*``."""
+    global _env_cache
+    if _cache_override is not None:
+        return _cache_override
+    if not settings.response_cache:
+        return None
+    if _env_cache is None:
+        _env_cache = ResponseCache(
+            max_entries=settings.response_cache_size,
+            ttl_seconds=settings.response_cache_ttl,
+            sqlite_path=settings.response_cache_path or None,
+        )
+    return _env_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Installs ``cache`` for the process (None restores the environment default)."""
+    global _cache_override
+    _cache_override = cache
+
+
+@contextlib.contextmanager
+def use_response_cache(cache: ResponseCache):
+    """Context manager form of `set_response_cache` that restores the previous cache."""
+    previous = _cache_override
+    set_response_cache(cache)
+    try:
+        yield cache
+    finally:
+        set_response_cache(previous)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Downstream Change Detection
+
+Messages such as "thanks" or "ok" add no symptoms and no biases, yet the
+advocacy generator would still be called and would reproduce the previous
+turn's questions. `AnalysisChangeGate` wraps the downstream steps
+(advocacy generation and report formatting) and reuses the stored
+``advocacy_analysis`` and ``report`` when the analysis is semantically
+unchanged since they were produced.
+
+Key Components:
+    * `normalize_text`: Case- and whitespace-folded form of a phrase.
+    * `analysis_fingerprint`: Hash of the normalized ``symptom_analysis`` and
+        ``bias_analysis`` (case, whitespace, ordering and duplicates ignored).
+    * `AnalysisChangeGate`: Custom ADK agent that runs its sub-agents only
+        when the fingerprint differs from the one stored in session state
+        under ``analysis_fingerprint``.
+
+Metrics (`main_agent.metrics`):
+    * ``change_gate.turns``: Turns that reached the gate.
+    * ``change_gate.skipped_turns``: Turns that reused the stored outputs.
+    * ``change_gate.skipped_model_calls``: Model calls avoided by skipping.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from . import metrics
+from .report import ReportInputError, extract_bias_awareness, extract_symptom_mapping
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_KEY = "analysis_fingerprint"
+
+
+def normalize_text(text: Any) -> str:
+    """
+    Folds a phrase for comparison: lowercased, whitespace collapsed.
+
+    >>> normalize_text("  Joint   Pain ")
+    'joint pain'
+    """
+    return " ".join(str(text).lower().split())
+
+
+def analysis_fingerprint(symptom_analysis: Any, bias_analysis: Any) -> Optional[str]:
+    """
+    Fingerprint of the analysis outputs that the downstream steps depend on.
+
+    Returns
+    -------
+    Optional[str]
+        A sha256 hex digest, or None when either output cannot be parsed (a
+        malformed analysis is never treated as unchanged).
+    """
+    try:
+        mapping = extract_symptom_mapping(symptom_analysis)
+        biases = extract_bias_awareness(bias_analysis)
+    except ReportInputError:
+        return None
+    symptoms = {
+        normalize_text(cluster): sorted({normalize_text(item) for item in items or []})
+        for cluster, items in mapping.items()
+        if isinstance(items, list) and items
+    }
+    bias_entries = sorted(
+        {(normalize_text(b.get("bias", "")), normalize_text(b.get("reason", "")), normalize_text(b.get("implication", "")))
+         for b in biases}
+    )
+    canonical = json.dumps([symptoms, bias_entries], sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AnalysisChangeGate(BaseAgent):
+    """
+    Runs its sub-agents in order unless the analysis is unchanged.
+
+    The sub-agents' ``output_keys`` must already be present in state for a
+    turn to be skipped; on a skip the stored ``report`` is re-emitted as the
+    turn's final response.
+    """
+
+    output_keys: list = ["advocacy_analysis", "report"]
+    report_key: str = "report"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        fingerprint = analysis_fingerprint(state.get("symptom_analysis"), state.get("bias_analysis"))
+        metrics.increment("change_gate.turns")
+
+        if (
+            fingerprint is not None
+            and fingerprint == state.get(FINGERPRINT_KEY)
+            and all(state.get(key) for key in self.output_keys)
+        ):
+            skipped = sum(1 for agent in self.sub_agents if isinstance(agent, LlmAgent))
+            metrics.increment("change_gate.skipped_turns")
+            metrics.increment("change_gate.skipped_model_calls", skipped)
+            logger.info("Analysis unchanged; reusing stored %s", ", ".join(self.output_keys))
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part.from_text(text=state[self.report_key])]),
+            )
+            return
+
+        for agent in self.sub_agents:
+            async for event in agent.run_async(ctx):
+                yield event
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={FINGERPRINT_KEY: fingerprint}),
+        )
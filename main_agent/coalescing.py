@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Turn Coalescing
+
+Mobile clients retry aggressively, so the same message is often submitted
+to the same session two or three times while the first run is still going.
+With a plain `Runner` every copy runs the whole pipeline again and appends
+its own user message and agent events to the session, interleaved with
+the first run's.
+
+`CoalescingRunner` is a drop-in `Runner` that runs identical in-flight turns
+once (single flight). Turns are keyed on (user, session, hash of the
+message, state delta and run config). The first submission starts the run
+in a background task. Every submission of the same key, the first one
+included, follows that run's event stream from the beginning, so a
+duplicate receives exactly the events the original caller receives.
+Session state is written by the one run only. Once the run has finished,
+the next identical message is a new turn again.
+
+A caller that goes away (closed stream, cancelled request) only stops
+following: the run still completes, so a retry that arrives a moment later
+either attaches to it or finds the finished turn in the session, never
+half of it. An error of the run is raised to every follower.
+
+Turns that resume an invocation (``invocation_id``) or come with their own
+``abort_signal`` are not coalesced. Coalescing is per runner instance and
+process; route a session's requests to one process to coalesce across
+workers.
+
+Key Components:
+    * `CoalescingRunner`: `Runner` with single-flight ``run_async``.
+    * `turn_key`: Key of a submission.
+    * `CoalescingRunner.wait_idle`: Waits for the running turns (shutdown).
+
+Metrics (`main_agent.metrics`):
+    * ``coalescing.runs``: Turns actually run.
+    * ``coalescing.coalesced``: Submissions attached to an in-flight run.
+    * ``coalescing.failed``: Runs that failed (logged even if every
+        follower has gone away).
+
+Usage:
+    >>> runner = CoalescingRunner(agent=root_agent, app_name="agents", session_service=service)
+    >>> async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+    ...     ...
+
+Dependencies:
+    * google.adk.runners
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.events.event import Event
+from google.adk.runners import Runner
+from google.genai import types
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+TurnKey = Tuple[str, str, str]
+
+
+def turn_key(
+    user_id: str,
+    session_id: str,
+    new_message: types.Content,
+    state_delta: Optional[Dict[str, Any]] = None,
+    run_config: Optional[RunConfig] = None,
+    yield_user_message: bool = False,
+) -> TurnKey:
+    """(user, session, digest): submissions with equal keys share one run."""
+    payload = json.dumps({
+        "message": new_message.model_dump(mode="json", exclude_none=True),
+        "state_delta": state_delta,
+        "run_config": run_config.model_dump(mode="json", exclude_none=True) if run_config else None,
+        "yield_user_message": yield_user_message,
+    }, sort_keys=True, default=str)
+    return user_id, session_id, hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """Events of one in-flight run, buffered for every follower."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.events: List[Event] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Event) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done, self.error = True, error
+        self._wake()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncGenerator[Event, None]:
+        index = 0
+        while True:
+            if index < len(self.events):
+                yield self.events[index]
+                index += 1
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class CoalescingRunner(Runner):
+    """
+    `Runner` that runs identical in-flight turns of a session once.
+
+    Accepts the same arguments as `Runner`.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._flights: Dict[TurnKey, _Flight] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of turns currently running."""
+        return len(self._flights)
+
+    async def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the running turns (e.g. on shutdown); returns False on timeout."""
+        tasks = [flight.task for flight in self._flights.values() if flight.loop is asyncio.get_running_loop()]
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+
+    async def run_async(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        invocation_id: Optional[str] = None,
+        new_message: Optional[types.Content] = None,
+        state_delta: Optional[Dict[str, Any]] = None,
+        run_config: Optional[RunConfig] = None,
+        yield_user_message: bool = False,
+        abort_signal: Optional[asyncio.Event] = None,
+    ) -> AsyncGenerator[Event, None]:
+        run = super().run_async
+        kwargs = dict(
+            user_id=user_id,
+            session_id=session_id,
+            invocation_id=invocation_id,
+            new_message=new_message,
+            state_delta=state_delta,
+            run_config=run_config,
+            yield_user_message=yield_user_message,
+            abort_signal=abort_signal,
+        )
+        if invocation_id is not None or new_message is None or abort_signal is not None:
+            async for event in run(**kwargs):
+                yield event
+            return
+
+        key = turn_key(user_id, session_id, new_message, state_delta, run_config, yield_user_message)
+        flight = self._flights.get(key)
+        if flight is not None and flight.loop is asyncio.get_running_loop():
+            metrics.increment("coalescing.coalesced")
+            logger.info("Session %s: duplicate message attached to the in-flight turn", session_id)
+        else:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(self._run_flight(key, flight, run(**kwargs)))
+            metrics.increment("coalescing.runs")
+        async for event in flight.follow():
+            yield event
+
+    async def _run_flight(self, key: TurnKey, flight: _Flight, events: AsyncGenerator[Event, None]) -> None:
+        try:
+            async for event in events:
+                flight.publish(event)
+        except BaseException as exc:
+            flight.finish(exc)
+            if not isinstance(exc, Exception):
+                raise
+            # Followers re-raise it, but there may be none left (all went away).
+            metrics.increment("coalescing.failed")
+            logger.warning("Session %s: coalesced turn failed: %s", key[1], exc)
+        else:
+            flight.finish()
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
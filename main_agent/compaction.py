@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Session History Compaction
+
+The worker instructions analyze the "conversation history", so every turn
+re-sends all earlier patient messages plus every intermediate agent output
+and tool call. `HistoryCompactor` runs first in the workflow and, once the
+history exceeds ``max_events`` events or an estimated ``token_budget``,
+collapses everything before the last ``keep_turns`` turns into one digest:
+
+    * the current canonical ``symptom_analysis`` and ``bias_analysis``, and
+    * the patient's earlier messages, abridged (at most ``digest_messages``
+        messages of ``digest_message_chars`` characters; earlier digests are
+        folded in, so the digest itself stays bounded).
+
+The digest is a patient-role event (author ``user``) so every worker reads it
+as part of the patient's history. Its ``custom_metadata`` records the
+timestamp up to which the history was compacted. Older events are pruned
+from the session the agents see and from the stored session:
+`PersistentSessionService` (`main_agent.sessions`) deletes them from its
+hot copy and from SQLite, and for `InMemorySessionService` the compactor
+prunes the service's stored copy itself. Other session services keep the
+raw events; they are pruned again from each turn's view.
+
+Key Components:
+    * `HistoryCompactor`: Custom ADK agent that compacts the session history.
+    * `prune_compacted`: Applies the latest digest to an event list in place.
+    * `prune_stored_session`: Applies it to `InMemorySessionService` storage.
+    * `estimate_tokens`: Rough prompt-size estimate (~4 characters per token).
+
+Metrics (`main_agent.metrics`):
+    * ``history.compactions``: Digests written.
+    * ``history.pruned_events``: Events collapsed into a digest.
+"""
+import json
+import logging
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DIGEST_KEY = "history_digest"
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    chunks = []
+    for part in event.content.parts:
+        if part.text:
+            chunks.append(part.text)
+        elif part.function_call:
+            chunks.append(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            chunks.append(json.dumps(part.function_response.response or {}, default=str))
+    return "".join(chunks)
+
+
+def estimate_tokens(events: List[Event]) -> int:
+    """Approximate prompt tokens contributed by ``events`` (~4 characters per token)."""
+    return sum(len(_event_text(event)) for event in events) // 4
+
+
+def digest_of(event: Event) -> Optional[dict]:
+    """The digest metadata of a compaction event, or None for any other event."""
+    return (event.custom_metadata or {}).get(DIGEST_KEY)
+
+
+def prune_compacted(events: List[Event]) -> int:
+    """
+    Drops the events covered by the latest digest and moves the digest first.
+
+    Returns
+    -------
+    int
+        Number of events removed from ``events``.
+    """
+    latest = next((event for event in reversed(events) if digest_of(event)), None)
+    if latest is None:
+        return 0
+    until = digest_of(latest)["compacted_until"]
+    kept = [event for event in events if event is not latest and event.timestamp > until]
+    removed = len(events) - len(kept) - 1
+    events[:] = [latest, *kept]
+    return removed
+
+
+def prune_stored_session(ctx: InvocationContext) -> int:
+    """
+    Prunes the stored copy of ``ctx.session`` in an `InMemorySessionService`,
+    which hands out copies, so the compacted events do not stay in memory.
+
+    Returns
+    -------
+    int
+        Number of stored events removed (0 for other session services).
+    """
+    service, session = ctx.session_service, ctx.session
+    if not isinstance(service, InMemorySessionService):
+        return 0
+    stored = service.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+    if stored is None or stored is session:
+        return 0
+    return prune_compacted(stored.events)
+
+
+class HistoryCompactor(BaseAgent):
+    """
+    Collapses old turns into a digest once the session history is too large.
+
+    A limit of 0 disables that trigger.
+    """
+
+    max_events: int = 60
+    token_budget: int = 12000
+    keep_turns: int = 2
+    digest_messages: int = 8
+    digest_message_chars: int = 280
+    state_keys: list = ["symptom_analysis", "bias_analysis"]
+
+    def _over_budget(self, events: List[Event]) -> bool:
+        return bool(
+            (self.max_events and len(events) > self.max_events)
+            or (self.token_budget and estimate_tokens(events) > self.token_budget)
+        )
+
+    def _split_index(self, events: List[Event]) -> int:
+        """Index of the first event of the last ``keep_turns`` invocations."""
+        seen = set()
+        for index in range(len(events) - 1, -1, -1):
+            invocation = events[index].invocation_id
+            if invocation not in seen:
+                if len(seen) == self.keep_turns:
+                    return index + 1
+                seen.add(invocation)
+        return 0
+
+    def _digest(self, ctx: InvocationContext, older: List[Event]) -> Event:
+        messages, compacted = [], 0
+        for event in older:
+            previous = digest_of(event)
+            if previous:
+                messages, compacted = list(previous["messages"]), previous["compacted_messages"]
+            elif event.author == "user":
+                text = " ".join(_event_text(event).split())
+                if text:
+                    limit = self.digest_message_chars
+                    messages.append(text if len(text) <= limit else text[:limit - 3].rstrip() + "...")
+                    compacted += 1
+        messages = messages[-self.digest_messages:]
+
+        state = ctx.session.state
+        lines = [
+            f"[Summary of the earlier conversation: {compacted} patient messages were compacted.]",
+            *(f"Current {key}: {state.get(key, '')}" for key in self.state_keys),
+            "Earlier patient messages (abridged, oldest first):",
+            *(f"- {message}" for message in messages),
+        ]
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author="user",
+            branch=ctx.branch,
+            content=types.Content(role="user", parts=[types.Part.from_text(text="\n".join(lines))]),
+            custom_metadata={DIGEST_KEY: {
+                "compacted_until": max(event.timestamp for event in older),
+                "compacted_messages": compacted,
+                "messages": messages,
+            }},
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        events = ctx.session.events
+        prune_compacted(events)
+        if not self._over_budget(events):
+            return
+        split = self._split_index(events)
+        older = events[:split]
+        if not older or all(digest_of(event) for event in older):
+            return
+
+        digest = self._digest(ctx, older)
+        del events[:split]
+        metrics.increment("history.compactions")
+        metrics.increment("history.pruned_events", len(older))
+        logger.info("Compacted %d events of session %s into a digest", len(older), ctx.session.id)
+        yield digest
+        # The runner appended the digest after the current message; it belongs first.
+        prune_compacted(events)
+        prune_stored_session(ctx)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Runtime Settings
+
+Central place for the switches that change how the `root_agent` pipeline is
+assembled. Every setting has a safe default and can be overridden through an
+environment variable (or the `.env` file loaded by the runner scripts).
+
+Environment Variables:
+    * ``LUCIA_REPORT_LLM_FALLBACK``: When truthy, malformed analysis JSON is
+        handed to the LLM report formatter instead of being rendered
+        leniently by the deterministic formatter. Default: off.
+    * ``LUCIA_ANALYSIS_MODE``: ``cumulative`` (re-analyze the full history
+        every turn) or ``incremental`` (merge per-message deltas).
+        Default: ``cumulative``.
+    * ``LUCIA_ANALYSIS_LAYOUT``: ``parallel`` (separate symptom mapper and
+        bias analyzer calls) or ``fused`` (one call returning both analyses,
+        see `main_agent.fused`; cumulative mode only). Default: ``parallel``.
+    * ``LUCIA_AXIOM_CORPUS``: Path to an alternative AXIOM corpus
+        (``.jsonl`` or ``.json``). Default: the bundled
+        ``main_agent/data/axiom_corpus.jsonl``.
+    * ``LUCIA_AXIOM_BATCH``: When truthy, the bias analyzer is instructed to
+        resolve all its biases with one `get_bias_implications_batch` call
+        (see `main_agent.axiom_service`). Default: on.
+    * ``LUCIA_AXIOM_CACHE_TTL``: Seconds an implication looked up by the
+        batch tool is cached (0 disables the cache). Default: 3600.
+    * ``LUCIA_MODEL_BACKEND``: ``gemini`` (real models through the ADK
+        registry) or ``standin`` (local offline stand-in, see
+        `main_agent.models`). Default: ``gemini``.
+    * ``LUCIA_STANDIN_LATENCY_MS``: Latency injected per stand-in call.
+        Default: 0.
+    * ``LUCIA_STANDIN_REPLAY``: JSONL file of recorded responses replayed
+        by the stand-in. Default: canned responses.
+    * ``LUCIA_MODEL_DEADLINE``: Seconds a model call may take, retries and
+        hedges included (0: none; see `main_agent.resilience`). Default: 60.
+    * ``LUCIA_MODEL_DEADLINES``: Per-agent deadlines overriding it, as
+        ``agent=seconds,agent=seconds``. Default: none.
+    * ``LUCIA_MODEL_RETRIES``: Retries of a model call after a 408/429/5xx
+        or connection error. Default: 3.
+    * ``LUCIA_MODEL_BACKOFF_MS``: First retry backoff, doubled per retry
+        (jittered; a server retry-after hint is a lower bound). Default: 500.
+    * ``LUCIA_MODEL_HEDGE``: When truthy, a second request is sent when a
+        call is slower than the agent's observed latency quantile.
+        Default: off.
+    * ``LUCIA_MODEL_HEDGE_QUANTILE``: That quantile (0-100). Default: 95.
+    * ``LUCIA_MODEL_CONCURRENCY``: Backend requests in flight in the process,
+        hedges included (0: unlimited). Default: 0.
+    * ``LUCIA_TURN_BUDGET``: End-to-end seconds per turn; a stage that
+        overruns its share ends the turn with a partial report and finishes
+        in the background (see `main_agent.budget`). Default: 0 (off).
+    * ``LUCIA_TURN_BUDGET_SPLIT``: Shares of the turn budget per stage,
+        ``"analysis=0.7,advocacy=0.3"``. Default: that split.
+    * ``LUCIA_ROUTING_POLICY``: Model routing policy (``fixed``,
+        ``complexity``, ``economy``, ``quality`` or one defined in
+        ``LUCIA_ROUTING_CONFIG``; see `main_agent.routing`). Default: ``fixed``.
+    * ``LUCIA_ROUTING_CONFIG``: JSON file with additional model tiers and
+        routing policies. Default: built-in tiers and policies only.
+    * ``LUCIA_BIAS_PRECLASSIFIER``: When truthy, the bias analyzer answers
+        ``{"biasAwareness": []}`` locally until the session mentions a
+        clinician interaction (see `main_agent.preclassifier`). Default: on.
+    * ``LUCIA_COMPACT_CONTEXT``: When truthy, the advocacy generator sees only
+        the symptom and bias analysis instead of the whole conversation
+        (see `main_agent.context`). Default: on.
+    * ``LUCIA_ADVOCACY_FANOUT``: When truthy, symptom-cluster and bias
+        questions are generated per analysis branch, each as soon as its
+        worker finishes, and merged in code instead of by one advocacy call
+        after both (see `main_agent.fanout`). Default: off.
+    * ``LUCIA_HISTORY_MAX_EVENTS``: Session events after which older turns
+        are compacted into a digest (see `main_agent.compaction`; 0 disables
+        this trigger). Default: 60.
+    * ``LUCIA_HISTORY_TOKEN_BUDGET``: Estimated history tokens after which
+        older turns are compacted (0 disables this trigger). Default: 12000.
+    * ``LUCIA_HISTORY_KEEP_TURNS``: Most recent turns (including the current
+        one) kept verbatim by compaction. Default: 2.
+    * ``LUCIA_SKIP_UNCHANGED``: When truthy, advocacy generation and report
+        formatting are skipped for turns that leave the symptom and bias
+        analysis unchanged (see `main_agent.change_detection`). Default: on.
+    * ``LUCIA_STREAM_REPORT``: When truthy, `root_agent` streams the report
+        section by section as partial events (see `main_agent.streaming`).
+        Default: off.
+    * ``LUCIA_OUTPUT_RETRIES``: How often a worker output that fails schema
+        validation is re-requested (see `main_agent.schemas`). Default: 1.
+    * ``LUCIA_RESPONSE_CACHE``: When truthy, worker-agent responses are
+        cached (see `main_agent.cache`). Default: off.
+    * ``LUCIA_RESPONSE_CACHE_SIZE``: Entries kept in the in-process LRU.
+        Default: 1024.
+    * ``LUCIA_RESPONSE_CACHE_TTL``: Entry time-to-live in seconds.
+        Default: 3600.
+    * ``LUCIA_RESPONSE_CACHE_PATH``: SQLite file for the on-disk cache
+        tier. Default: memory only.
+    * ``LUCIA_TRACE``: ``console`` or ``json`` routes the OpenTelemetry
+        spans of the pipeline to a local exporter (see
+        `main_agent.telemetry`). Default: unset, no local export.
+    * ``LUCIA_TRACE_PATH``: Output file of the ``json`` trace exporter.
+        Default: ``lucia_traces.jsonl``.
+    * ``LUCIA_SESSION_DB``: SQLite file for persistent sessions (see
+        `main_agent.sessions`). Default: unset, sessions stay in memory.
+    * ``LUCIA_SESSION_HOT``: Sessions kept in memory by the persistent
+        session service. Default: 256.
+    * ``LUCIA_SESSION_RETENTION_DAYS``: Idle days after which a persisted
+        session is deleted. Default: 0 (keep forever).
+    * ``LUCIA_SESSION_MAX_EVENTS``: Newest events kept per persisted session.
+        Default: 0 (all).
+    * ``LUCIA_SERVER_CONCURRENCY``: Turns the HTTP service
+        (`main_agent.server`) runs at the same time, per worker. Default: 32.
+    * ``LUCIA_SERVER_QUEUE``: Turns waiting for a slot before messages are
+        shed with 429, per worker. Default: 64.
+    * ``LUCIA_SERVER_DRAIN_S``: Seconds a shutting-down worker waits for
+        admitted turns and background work. Default: 30.
+    * ``LUCIA_WARMUP``: When truthy, the Agent Engine entry point runs one
+        synthetic turn at import so the first request does not pay for lazy
+        initialization (see `main_agent.warmup`). Default: on.
+
+Usage:
+    >>> from main_agent.config import settings
+    >>> settings.report_llm_fallback
+    False
+"""
+import os
+from dataclasses import dataclass
+
+_TRUTHY = {"1", "true", "yes", "on"}
+ANALYSIS_MODES = ("cumulative", "incremental")
+ANALYSIS_LAYOUTS = ("parallel", "fused")
+MODEL_BACKENDS = ("gemini", "standin")
+TRACE_EXPORTERS = ("", "console", "json")
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Reads a boolean switch from the environment ("1", "true", "yes", "on")."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in _TRUTHY
+
+
+@dataclass(frozen=True)
+class LuciaSettings:
+    """Immutable snapshot of the pipeline configuration."""
+
+    report_llm_fallback: bool = False
+    analysis_mode: str = "cumulative"
+    analysis_layout: str = "parallel"
+    axiom_corpus_path: str = ""
+    axiom_batch: bool = True
+    axiom_cache_ttl: float = 3600.0
+    model_backend: str = "gemini"
+    standin_latency_ms: float = 0.0
+    standin_replay_path: str = ""
+    model_deadline: float = 60.0
+    model_deadlines: str = ""
+    model_retries: int = 3
+    model_backoff_ms: float = 500.0
+    model_hedge: bool = False
+    model_hedge_quantile: float = 95.0
+    model_concurrency: int = 0
+    turn_budget: float = 0.0
+    turn_budget_split: str = "analysis=0.7,advocacy=0.3"
+    routing_policy: str = "fixed"
+    routing_config_path: str = ""
+    bias_preclassifier: bool = True
+    compact_context: bool = True
+    advocacy_fanout: bool = False
+    history_max_events: int = 60
+    history_token_budget: int = 12000
+    history_keep_turns: int = 2
+    skip_unchanged: bool = True
+    stream_report: bool = False
+    output_retries: int = 1
+    response_cache: bool = False
+    response_cache_size: int = 1024
+    response_cache_ttl: float = 3600.0
+    response_cache_path: str = ""
+    trace_exporter: str = ""
+    trace_path: str = "lucia_traces.jsonl"
+    session_db: str = ""
+    session_hot: int = 256
+    session_retention_days: float = 0.0
+    session_max_events: int = 0
+    server_concurrency: int = 32
+    server_queue: int = 64
+    server_drain_seconds: float = 30.0
+    warmup: bool = True
+
+    def __post_init__(self):
+        if self.analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(
+                f"Unknown analysis mode {self.analysis_mode!r}; expected one of {ANALYSIS_MODES}."
+            )
+        if self.analysis_layout not in ANALYSIS_LAYOUTS:
+            raise ValueError(
+                f"Unknown analysis layout {self.analysis_layout!r}; expected one of {ANALYSIS_LAYOUTS}."
+            )
+        if self.analysis_layout == "fused" and self.analysis_mode != "cumulative":
+            raise ValueError("The fused analysis layout requires the cumulative analysis mode.")
+        if self.turn_budget < 0:
+            raise ValueError(f"The turn budget must not be negative, got {self.turn_budget}.")
+        if self.model_backend not in MODEL_BACKENDS:
+            raise ValueError(
+                f"Unknown model backend {self.model_backend!r}; expected one of {MODEL_BACKENDS}."
+            )
+        if self.trace_exporter not in TRACE_EXPORTERS:
+            raise ValueError(
+                f"Unknown trace exporter {self.trace_exporter!r}; expected one of {TRACE_EXPORTERS}."
+            )
+
+    @classmethod
+    def from_env(cls) -> "LuciaSettings":
+        """Builds the settings from ``LUCIA_*`` environment variables."""
+        return cls(
+            report_llm_fallback=env_flag("LUCIA_REPORT_LLM_FALLBACK"),
+            analysis_mode=os.environ.get("LUCIA_ANALYSIS_MODE", "cumulative").strip().lower(),
+            analysis_layout=os.environ.get("LUCIA_ANALYSIS_LAYOUT", "parallel").strip().lower(),
+            axiom_corpus_path=os.environ.get("LUCIA_AXIOM_CORPUS", ""),
+            axiom_batch=env_flag("LUCIA_AXIOM_BATCH", default=True),
+            axiom_cache_ttl=float(os.environ.get("LUCIA_AXIOM_CACHE_TTL", "3600")),
+            model_backend=os.environ.get("LUCIA_MODEL_BACKEND", "gemini").strip().lower(),
+            standin_latency_ms=float(os.environ.get("LUCIA_STANDIN_LATENCY_MS", "0")),
+            standin_replay_path=os.environ.get("LUCIA_STANDIN_REPLAY", ""),
+            model_deadline=float(os.environ.get("LUCIA_MODEL_DEADLINE", "60")),
+            model_deadlines=os.environ.get("LUCIA_MODEL_DEADLINES", ""),
+            model_retries=int(os.environ.get("LUCIA_MODEL_RETRIES", "3")),
+            model_backoff_ms=float(os.environ.get("LUCIA_MODEL_BACKOFF_MS", "500")),
+            model_hedge=env_flag("LUCIA_MODEL_HEDGE"),
+            model_hedge_quantile=float(os.environ.get("LUCIA_MODEL_HEDGE_QUANTILE", "95")),
+            model_concurrency=int(os.environ.get("LUCIA_MODEL_CONCURRENCY", "0")),
+            turn_budget=float(os.environ.get("LUCIA_TURN_BUDGET", "0")),
+            turn_budget_split=os.environ.get("LUCIA_TURN_BUDGET_SPLIT", "analysis=0.7,advocacy=0.3"),
+            routing_policy=os.environ.get("LUCIA_ROUTING_POLICY", "fixed").strip().lower(),
+            routing_config_path=os.environ.get("LUCIA_ROUTING_CONFIG", ""),
+            bias_preclassifier=env_flag("LUCIA_BIAS_PRECLASSIFIER", default=True),
+            compact_context=env_flag("LUCIA_COMPACT_CONTEXT", default=True),
+            advocacy_fanout=env_flag("LUCIA_ADVOCACY_FANOUT"),
+            history_max_events=int(os.environ.get("LUCIA_HISTORY_MAX_EVENTS", "60")),
+            history_token_budget=int(os.environ.get("LUCIA_HISTORY_TOKEN_BUDGET", "12000")),
+            history_keep_turns=int(os.environ.get("LUCIA_HISTORY_KEEP_TURNS", "2")),
+            skip_unchanged=env_flag("LUCIA_SKIP_UNCHANGED", default=True),
+            stream_report=env_flag("LUCIA_STREAM_REPORT"),
+            output_retries=int(os.environ.get("LUCIA_OUTPUT_RETRIES", "1")),
+            response_cache=env_flag("LUCIA_RESPONSE_CACHE"),
+            response_cache_size=int(os.environ.get("LUCIA_RESPONSE_CACHE_SIZE", "1024")),
+            response_cache_ttl=float(os.environ.get("LUCIA_RESPONSE_CACHE_TTL", "3600")),
+            response_cache_path=os.environ.get("LUCIA_RESPONSE_CACHE_PATH", ""),
+            trace_exporter=os.environ.get("LUCIA_TRACE", "").strip().lower(),
+            trace_path=os.environ.get("LUCIA_TRACE_PATH", "lucia_traces.jsonl"),
+            session_db=os.environ.get("LUCIA_SESSION_DB", ""),
+            session_hot=int(os.environ.get("LUCIA_SESSION_HOT", "256")),
+            session_retention_days=float(os.environ.get("LUCIA_SESSION_RETENTION_DAYS", "0")),
+            session_max_events=int(os.environ.get("LUCIA_SESSION_MAX_EVENTS", "0")),
+            server_concurrency=int(os.environ.get("LUCIA_SERVER_CONCURRENCY", "32")),
+            server_queue=int(os.environ.get("LUCIA_SERVER_QUEUE", "64")),
+            server_drain_seconds=float(os.environ.get("LUCIA_SERVER_DRAIN_S", "30")),
+            warmup=env_flag("LUCIA_WARMUP", default=True),
+        )
+
+
+settings = LuciaSettings.from_env()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Context Assembly & Prompt-Size Instrumentation
+
+The downstream agents only need the structured analysis, not the raw
+conversation and every intermediate event. With compact context
+(``LUCIA_COMPACT_CONTEXT``, on by default) they run with
+``include_contents='none'`` and receive exactly the state keys they declare,
+injected into their instruction through ADK state templating.
+
+Key Components:
+    * `state_context`: Instruction block that injects the declared state keys.
+    * `log_prompt_tokens`: ``after_model_callback`` that logs the prompt tokens
+        of every model call per agent and turn (``invocation_id``) and adds
+        them to `main_agent.metrics` (``prompt_tokens.<agent>``,
+        ``model_calls.<agent>``).
+
+Usage:
+    >>> LlmAgent(
+    ...     instruction=advocacy_instruction + state_context("symptom_analysis", "bias_analysis"),
+    ...     include_contents='none',
+    ...     after_model_callback=log_prompt_tokens,
+    ... )
+"""
+import logging
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_response import LlmResponse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def state_context(*keys: str) -> str:
+    """Instruction suffix that injects ``keys`` from session state (empty if missing)."""
+    return "\n".join([
+        "",
+        "---------------------------",
+        "CONTEXT",
+        "---------------------------",
+        *(f"{key}: {{{key}?}}" for key in keys),
+        "",
+    ])
+
+
+def log_prompt_tokens(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """Records the prompt size of a model call; never modifies the response."""
+    usage = llm_response.usage_metadata
+    if llm_response.partial or usage is None or not usage.prompt_token_count:
+        return None
+    if (llm_response.custom_metadata or {}).get("cache") == "hit":
+        return None
+    agent = callback_context.agent_name
+    metrics.increment(f"prompt_tokens.{agent}", usage.prompt_token_count)
+    metrics.increment(f"model_calls.{agent}")
+    logger.info(
+        "prompt_tokens agent=%s invocation=%s tokens=%d",
+        agent, callback_context.invocation_id, usage.prompt_token_count,
+    )
+    return None
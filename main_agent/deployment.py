@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Deployment Setup (Vertex AI Agent Engine)
+
+Setup that only the Agent Engine deployment needs. Vertex AI is never
+initialized by the import itself, so importing the agent works without
+cloud credentials or ``GOOGLE_CLOUD_*`` variables (e.g. when ``adk deploy``
+validates the agent locally). With ``LUCIA_WARMUP`` (default on) it is
+initialized in the background during the start-up warm-up
+(`main_agent.warmup`); otherwise, or if that failed, on the first request.
+
+Key Components:
+    * `ensure_vertex_ai`: Calls ``vertexai.init`` once per process, with
+        ``GOOGLE_CLOUD_PROJECT`` and ``GOOGLE_CLOUD_LOCATION``.
+    * `init_vertex_ai`: ``before_agent_callback`` form of `ensure_vertex_ai`
+        for the root agent.
+    * `build_deployment_agent`: The Agent Engine ``root_agent``: the shared
+        graph with lazy Vertex AI initialization, warmed up if configured.
+
+Usage:
+    >>> root_agent = build_deployment_agent()
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from .config import LuciaSettings, settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_vertex_initialized = False
+
+
+def ensure_vertex_ai() -> None:
+    """Initializes the Vertex AI SDK once per process."""
+    global _vertex_initialized
+    if _vertex_initialized:
+        return
+    with _lock:
+        if not _vertex_initialized:
+            import vertexai
+
+            project = os.environ.get("GOOGLE_CLOUD_PROJECT")
+            location = os.environ.get("GOOGLE_CLOUD_LOCATION")
+            vertexai.init(project=project, location=location)
+            logger.info("Vertex AI initialized (project=%s, location=%s)", project, location)
+            _vertex_initialized = True
+
+
+def init_vertex_ai(callback_context: CallbackContext) -> Optional[types.Content]:
+    """``before_agent_callback`` that initializes Vertex AI if needed; never answers."""
+    ensure_vertex_ai()
+    return None
+
+
+def build_deployment_agent(config: LuciaSettings = settings) -> BaseAgent:
+    """
+    Builds the Agent Engine root agent.
+
+    With ``config.warmup`` a synthetic turn runs before this returns, while
+    Vertex AI is initialized in a background thread.
+    """
+    from .agent import build_root_agent
+
+    root_agent = build_root_agent(config)
+    if config.warmup:
+        from .warmup import warm_up
+
+        warm_up(root_agent, setup=[ensure_vertex_ai])
+    # Installed after the warm-up so the synthetic turn does not wait for Vertex AI.
+    root_agent.before_agent_callback = init_vertex_ai
+    return root_agent
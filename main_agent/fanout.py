@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Advocacy Fan-Out
+
+The advocacy generator waits for both analysis workers and then writes
+every question in one call, so the critical path of a turn is
+max(symptom mapper, bias analyzer) + advocacy generator. Its output splits
+naturally into 1-2 questions per symptom cluster and 1 per bias. With
+fan-out (``LUCIA_ADVOCACY_FANOUT``) each analysis branch asks its own
+questions as soon as its worker has finished:
+
+    parallel_analysis_step
+        * symptom_branch: symptom_mapper_agent -> symptom_question_agent
+        * bias_branch:    bias_analyzer_agent  -> bias_question_agent
+    advocacy_merge_agent (deterministic, no model call)
+
+so the critical path becomes max(symptom -> questions, bias -> questions).
+The merged list is written to ``advocacy_analysis`` in the same shape as the
+single advocacy generator's output, so the change gate, the report formatter
+and the streaming report are unchanged.
+
+A question agent does not call the model when its input has no entries (no
+symptom clusters, no biases). With ``LUCIA_SKIP_UNCHANGED`` it also reuses
+its stored questions while its own input is unchanged, e.g. the symptom
+questions of a turn that only added a bias.
+
+Key Components:
+    * `merge_questions`: Symptom questions, then bias questions, duplicates
+        (case and whitespace ignored) removed.
+    * `question_call_guard`: Builds the ``before_model_callback`` that
+        answers a question call locally when its input is empty or unchanged.
+    * `AdvocacyMergeAgent`: Writes the merged questions to
+        ``advocacy_analysis``.
+
+Metrics (`main_agent.metrics`):
+    * ``advocacy_fanout.no_input.<agent>``: Calls skipped for empty input.
+    * ``advocacy_fanout.unchanged.<agent>``: Calls that reused stored questions.
+
+Usage:
+    >>> from dataclasses import replace
+    >>> from main_agent.agent import build_root_agent
+    >>> agent = build_root_agent(replace(settings, advocacy_fanout=True))
+"""
+import logging
+from typing import AsyncGenerator, Callable, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from . import metrics
+from .change_detection import analysis_fingerprint, normalize_text
+from .report import ReportInputError, extract_bias_awareness, extract_structured_advocacy, extract_symptom_mapping
+from .schemas import compact_json
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+NO_QUESTIONS = compact_json({"structuredAdvocacy": []})
+
+# Input of each question agent: (state key, entries extractor, fingerprint of the state value).
+_INPUTS = {
+    "symptom_analysis": (
+        lambda raw: [cluster for cluster, items in extract_symptom_mapping(raw).items() if items],
+        lambda raw: analysis_fingerprint(raw, None),
+    ),
+    "bias_analysis": (
+        extract_bias_awareness,
+        lambda raw: analysis_fingerprint(None, raw),
+    ),
+}
+
+
+def merge_questions(*question_lists: List[str]) -> List[str]:
+    """Concatenates ``question_lists`` in order, keeping the first of any duplicates."""
+    merged, seen = [], set()
+    for questions in question_lists:
+        for question in questions:
+            key = normalize_text(question)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(question)
+    return merged
+
+
+def _answer(text: str, reason: str) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part.from_text(text=text)]),
+        custom_metadata={"advocacy_fanout": reason},
+    )
+
+
+def question_call_guard(
+    input_key: str, output_key: str, skip_unchanged: bool = True
+) -> Callable[[CallbackContext, LlmRequest], Optional[LlmResponse]]:
+    """
+    Builds the ``before_model_callback`` of a fan-out question agent.
+
+    Parameters
+    ----------
+    input_key : str
+        ``symptom_analysis`` or ``bias_analysis``.
+    output_key : str
+        The question agent's ``output_key``; its input fingerprint is stored
+        under ``<output_key>_fingerprint``.
+    skip_unchanged : bool
+        Reuse the stored questions while the input fingerprint is unchanged.
+    """
+    entries_of, fingerprint_of = _INPUTS[input_key]
+    fingerprint_key = f"{output_key}_fingerprint"
+
+    def _guard(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        state, agent = callback_context.state, callback_context.agent_name
+        raw = state.get(input_key)
+        try:
+            entries = entries_of(raw)
+        except ReportInputError:
+            return None  # Malformed input: let the model make sense of it.
+        if not entries:
+            metrics.increment(f"advocacy_fanout.no_input.{agent}")
+            annotate({"lucia.advocacy_fanout": "no_input"})
+            return _answer(NO_QUESTIONS, "no_input")
+        if not skip_unchanged:
+            return None
+
+        fingerprint = fingerprint_of(raw)
+        stored = state.get(output_key)
+        if fingerprint is not None and fingerprint == state.get(fingerprint_key) and stored:
+            metrics.increment(f"advocacy_fanout.unchanged.{agent}")
+            annotate({"lucia.advocacy_fanout": "unchanged"})
+            return _answer(stored, "unchanged")
+        # Committed with the model's response event, so a failed call leaves the old fingerprint.
+        state[fingerprint_key] = fingerprint
+        return None
+
+    return _guard
+
+
+class AdvocacyMergeAgent(BaseAgent):
+    """
+    Merges the per-branch questions into ``advocacy_analysis`` without a model call.
+
+    A malformed question list is logged and treated as empty.
+    """
+
+    input_keys: list = ["symptom_questions", "bias_questions"]
+    output_key: str = "advocacy_analysis"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        lists = []
+        for key in self.input_keys:
+            try:
+                lists.append(extract_structured_advocacy(ctx.session.state.get(key)))
+            except ReportInputError as exc:
+                logger.warning("Ignoring malformed %s: %s", key, exc)
+                lists.append([])
+        merged = compact_json({"structuredAdvocacy": merge_questions(*lists)})
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: merged}),
+        )
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Fused Analysis
+
+In the default "parallel" layout `symptom_mapper_agent` and
+`bias_analyzer_agent` are two model calls over the same conversation, so every
+turn sends the history twice and spends two requests of quota. With
+``LUCIA_ANALYSIS_LAYOUT=fused`` one `analysis_agent` reads the conversation
+once and answers both questions in a single structured response:
+
+    {"symptomMapping": {...}, "biasAwareness": [...]}
+
+The fused agent has no tool. Instead of the AXIOM tool round trip (a second
+call that re-sends the whole prompt), `split_fused_analysis` looks up the
+implications of all reported biases with one batched query to
+`main_agent.axiom_service` and writes them into the biases, so every turn is
+one model call. It then writes the two halves to ``symptom_analysis`` and
+``bias_analysis`` in exactly the canonical JSON the two workers would have
+produced, so the change gate, the advocacy stage, the report formatter and
+the streaming report are unchanged. A fused response that fails validation
+(after ``LUCIA_OUTPUT_RETRIES``) leaves the previous analysis untouched; if
+the AXIOM store fails, the biases are stored without implications.
+
+The layout only exists for the cumulative analysis mode; the incremental
+mode already keeps each worker's prompt small.
+
+Key Components:
+    * `split_fused_analysis`: ``after_model_callback`` of the fused agent.
+
+Metrics (`main_agent.metrics`):
+    * ``fused_analysis.malformed``: Fused responses that could not be split.
+    * ``fused_analysis.lookup_errors``: Implication lookups that failed.
+
+Usage:
+    >>> from dataclasses import replace
+    >>> from main_agent.agent import build_root_agent
+    >>> agent = build_root_agent(replace(settings, analysis_layout="fused"))
+"""
+import logging
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_response import LlmResponse
+
+from . import metrics
+from .axiom_service import implication_service
+from .incremental import _response_text
+from .schemas import FusedAnalysis, OutputValidationError, canonical_json, parse_output
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+
+async def split_fused_analysis(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """
+    Stores a fused response as ``symptom_analysis`` and ``bias_analysis``.
+
+    The implication of every bias is replaced by the AXIOM one. Partial
+    chunks are ignored. The state is committed with the agent's response
+    event, so both keys appear in one state delta.
+    """
+    text = _response_text(llm_response)
+    if text is None:
+        return None
+    try:
+        symptoms, biases = parse_output(text, FusedAnalysis).split()
+    except OutputValidationError as exc:
+        metrics.increment("fused_analysis.malformed")
+        logger.warning("%s: keeping the previous analysis, malformed fused output: %s",
+                       callback_context.agent_name, exc)
+        return None
+
+    if biases.biasAwareness:
+        try:
+            implications = await implication_service().lookup([entry.bias for entry in biases.biasAwareness])
+        except Exception as exc:  # a remote store is down: keep the analysis, without implications
+            metrics.increment("fused_analysis.lookup_errors")
+            logger.warning("%s: AXIOM lookup failed: %s", callback_context.agent_name, exc)
+        else:
+            for entry in biases.biasAwareness:
+                entry.implication = implications[entry.bias]
+
+    callback_context.state["symptom_analysis"] = canonical_json(symptoms)
+    callback_context.state["bias_analysis"] = canonical_json(biases)
+    annotate({
+        "lucia.fused.clusters": len(symptoms.symptomMapping),
+        "lucia.fused.biases": len(biases.biasAwareness),
+    })
+    return None
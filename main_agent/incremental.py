@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Incremental (Delta) Analysis
+
+In the default "cumulative" mode the worker agents re-read the whole
+conversation every turn and regenerate the full symptom map and bias list, so
+prompt size grows with every message. In "incremental" mode each worker only
+sees the newest patient message plus the previous structured state, and
+returns a small add/remove delta. This module merges those deltas back into
+the canonical state in code.
+
+Delta Formats:
+    * Symptoms: ``{"add": {"cluster": ["phrase", ...]}, "remove": {"cluster": ["phrase", ...]}}``
+      (``remove`` may also be a flat list of phrases to drop from every cluster).
+    * Biases: ``{"add": [{"bias": ..., "reason": ..., "implication": ...}], "remove": ["bias_name", ...]}``
+      (adding a bias that already exists replaces it).
+
+Key Components:
+    * `merge_symptom_delta` / `merge_bias_delta`: Pure merge functions.
+    * `merge_delta_callback`: Builds an ``after_model_callback`` that rewrites
+        the model's delta into the merged full state, so the agent's
+        ``output_key`` keeps holding the same JSON shape as in cumulative mode.
+"""
+import logging
+from typing import Any, Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .report import (
+    ReportInputError,
+    extract_bias_awareness,
+    extract_symptom_mapping,
+    parse_agent_json,
+)
+from .schemas import compact_json
+
+logger = logging.getLogger(__name__)
+
+
+def _phrase_key(phrase: Any) -> str:
+    return " ".join(str(phrase).lower().split())
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def merge_symptom_delta(previous: Any, delta: dict) -> dict:
+    """
+    Applies a symptom delta to the previous ``symptom_analysis``.
+
+    Parameters
+    ----------
+    previous : Any
+        The previous ``symptom_analysis`` value (JSON string, dict or None).
+    delta : dict
+        The parsed delta returned by the model.
+
+    Returns
+    -------
+    dict
+        The merged state as ``{"symptomMapping": {...}}``. Phrases are kept
+        verbatim, de-duplicated case-insensitively, and empty clusters are
+        dropped.
+    """
+    try:
+        previous_mapping = extract_symptom_mapping(previous)
+    except ReportInputError as exc:
+        logger.warning("Previous symptom_analysis is malformed, starting fresh: %s", exc)
+        previous_mapping = {}
+    mapping = {cluster: list(_as_list(symptoms)) for cluster, symptoms in previous_mapping.items()}
+
+    removals = delta.get("remove") or {}
+    if isinstance(removals, dict):
+        for cluster, phrases in removals.items():
+            drop = {_phrase_key(p) for p in _as_list(phrases)}
+            if cluster in mapping:
+                mapping[cluster] = [s for s in mapping[cluster] if _phrase_key(s) not in drop]
+    else:
+        drop = {_phrase_key(p) for p in _as_list(removals)}
+        for cluster in mapping:
+            mapping[cluster] = [s for s in mapping[cluster] if _phrase_key(s) not in drop]
+
+    for cluster, phrases in (delta.get("add") or {}).items():
+        existing = mapping.setdefault(cluster, [])
+        seen = {_phrase_key(s) for s in existing}
+        for phrase in _as_list(phrases):
+            if _phrase_key(phrase) not in seen:
+                existing.append(phrase)
+                seen.add(_phrase_key(phrase))
+
+    return {"symptomMapping": {cluster: phrases for cluster, phrases in mapping.items() if phrases}}
+
+
+def merge_bias_delta(previous: Any, delta: dict) -> dict:
+    """
+    Applies a bias delta to the previous ``bias_analysis``.
+
+    Parameters
+    ----------
+    previous : Any
+        The previous ``bias_analysis`` value (JSON string, dict or None).
+    delta : dict
+        The parsed delta returned by the model.
+
+    Returns
+    -------
+    dict
+        The merged state as ``{"biasAwareness": [...]}``, keyed by bias name
+        in first-seen order.
+    """
+    try:
+        previous_biases = extract_bias_awareness(previous)
+    except ReportInputError as exc:
+        logger.warning("Previous bias_analysis is malformed, starting fresh: %s", exc)
+        previous_biases = []
+    biases = {bias.get("bias"): bias for bias in previous_biases}
+
+    for name in _as_list(delta.get("remove")):
+        biases.pop(name, None)
+    for bias in _as_list(delta.get("add")):
+        if isinstance(bias, dict) and bias.get("bias"):
+            biases[bias["bias"]] = bias
+
+    return {"biasAwareness": list(biases.values())}
+
+
+def _response_text(llm_response: LlmResponse) -> Optional[str]:
+    """Returns the final text of a model response, or None for tool calls / partial chunks."""
+    content = llm_response.content
+    if llm_response.partial or not content or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    text = "".join(part.text for part in content.parts if part.text and not part.thought)
+    return text or None
+
+
+def merge_delta_callback(
+    state_key: str,
+    merge: Callable[[Any, dict], dict],
+) -> Callable[[CallbackContext, LlmResponse], Optional[LlmResponse]]:
+    """
+    Builds an ``after_model_callback`` that merges a delta into ``state_key``.
+
+    The callback replaces the model's delta text with the merged full state,
+    which the agent then stores under its ``output_key`` as usual. A delta
+    that cannot be parsed leaves the previous state untouched.
+    """
+
+    def _callback(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        text = _response_text(llm_response)
+        if text is None:
+            return None
+
+        previous = callback_context.state.get(state_key)
+        try:
+            merged = merge(previous, parse_agent_json(text))
+        except ReportInputError as exc:
+            logger.warning("%s: discarding malformed delta for %s: %s",
+                           callback_context.agent_name, state_key, exc)
+            merged = merge(previous, {})
+
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part.from_text(text=compact_json(merged))]),
+            usage_metadata=llm_response.usage_metadata,
+        )
+
+    return _callback
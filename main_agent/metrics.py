@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Process Metrics
+
+Minimal in-process counters for the optimizations in the pipeline (skipped
+calls, cache hits, ...), so their effect can be read from a running service
+or a benchmark without an external metrics stack.
+
+Usage:
+    >>> from main_agent import metrics
+    >>> metrics.increment("change_gate.skipped_turns")
+    >>> metrics.counters()
+    {'change_gate.skipped_turns': 1}
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """Adds ``amount`` to the counter ``name``."""
+    with _lock:
+        _counters[name] += amount
+
+
+def counters(prefix: str = "") -> dict:
+    """Snapshot of all counters whose name starts with ``prefix``."""
+    with _lock:
+        return {name: value for name, value in _counters.items() if name.startswith(prefix)}
+
+
+def reset() -> None:
+    """Clears every counter (used by tests and benchmarks)."""
+    with _lock:
+        _counters.clear()
+
+
+def restore(snapshot: dict) -> None:
+    """Replaces every counter with ``snapshot`` (a `counters` result)."""
+    with _lock:
+        _counters.clear()
+        _counters.update(snapshot)
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Model Factory & Offline Stand-In
+
+Every `LlmAgent` in the pipeline gets its model from `model_for`, which
+returns a thin `LuciaModel` proxy. The proxy resolves the real backend on
+each call, so the same agent graph can be driven by Gemini in production and
+by a local stand-in in tests, benchmarks and CI without rebuilding agents.
+
+Backends:
+    * ``gemini`` (default): models are created through the ADK `LLMRegistry`
+        from the agent's model name (e.g., ``gemini-2.5-flash``).
+    * ``standin``: `StandInLlm`, a local fake that returns scripted,
+        replayed or canned responses with configurable latency and token
+        counts, including AXIOM lookup function calls. It can inject latency
+        spikes and Gemini-shaped 429/5xx errors (`stand_in_error`).
+
+    The backend is chosen by ``LUCIA_MODEL_BACKEND`` or overridden in-process
+    with `use_model_backend`.
+
+Output Validation:
+    Models built with ``output_schema`` validate the final text against it
+    (`main_agent.schemas`). Valid outputs are replaced by their canonical
+    compact JSON; invalid ones are counted (``schema.invalid.<agent>``) and
+    re-requested with the validation error, at most ``LUCIA_OUTPUT_RETRIES``
+    times. An output that is still invalid is passed on marked
+    ``custom_metadata={"schema": "invalid"}`` and counted as
+    ``schema.exhausted.<agent>``.
+
+Response Cache:
+    Models built with ``cache_instruction`` consult the active
+    `main_agent.cache.ResponseCache` before calling the backend; a hit is
+    returned as the model's final response (marked
+    ``custom_metadata={"cache": "hit"}``) without touching the backend.
+
+Model Routing:
+    The model of a call is ``llm_request.model``, which the routing callback
+    may have changed from the agent's default (`main_agent.routing`); the
+    proxy's own ``model`` is the fallback. Every backend call is added to
+    its tier's latency, token and cost counters.
+
+Resilience:
+    Each backend call runs under `main_agent.resilience`: a per-stage
+    deadline, retries with backoff on rate limits and server errors, optional
+    hedging and the process-wide concurrency budget (``LUCIA_MODEL_*``).
+
+Tracing:
+    The model tier, the cache outcome and the number of schema retries are
+    recorded as ``lucia.*`` attributes on ADK's ``generate_content`` span
+    (`main_agent.telemetry`).
+
+Usage:
+    >>> from main_agent.models import stand_in_backend, use_model_backend
+    >>> with use_model_backend(stand_in_backend(latency=0.05)):
+    ...     runner.run_async(...)   # no network calls
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import re
+import time
+from typing import Any, AsyncGenerator, Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import errors, types
+
+from . import metrics
+from .cache import cache_key, instruction_version, response_cache
+from .config import settings
+from .resilience import resilience
+from .routing import record_call, tier_of
+from .schemas import OutputValidationError, canonical_json, parse_output
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+# A backend turns (model name, agent name) into the `BaseLlm` that serves the call.
+ModelBackend = Callable[[str, str], BaseLlm]
+
+_backend_override: Optional[ModelBackend] = None
+_registry_models: dict = {}
+
+
+def _registry_backend(model_name: str, agent_name: str) -> BaseLlm:
+    model = _registry_models.get(model_name)
+    if model is None:
+        model = _registry_models[model_name] = LLMRegistry.new_llm(model_name)
+    return model
+
+
+def resolve_backend() -> ModelBackend:
+    """Returns the active backend: the in-process override, else ``LUCIA_MODEL_BACKEND``."""
+    if _backend_override is not None:
+        return _backend_override
+    if settings.model_backend == "standin":
+        return _env_stand_in_backend()
+    return _registry_backend
+
+
+def set_model_backend(backend: Optional[ModelBackend]) -> None:
+    """Installs ``backend`` for every `LuciaModel` in the process (None restores the default)."""
+    global _backend_override
+    _backend_override = backend
+
+
+@contextlib.contextmanager
+def use_model_backend(backend: ModelBackend):
+    """Context manager form of `set_model_backend` that restores the previous backend."""
+    previous = _backend_override
+    set_model_backend(backend)
+    try:
+        yield backend
+    finally:
+        set_model_backend(previous)
+
+
+class LuciaModel(BaseLlm):
+    """
+    Proxy model used by every LUCIA agent.
+
+    ``model`` is the agent's default model name (calls use
+    ``llm_request.model`` when set). ``agent_name`` identifies the calling
+    agent so that stand-in backends can script per-agent output.
+    A non-empty ``instruction_version`` makes the responses cacheable, and
+    ``output_schema`` enables output validation.
+    """
+
+    agent_name: str = ""
+    instruction_version: str = ""
+    output_schema: Optional[type] = None
+
+    def resolve(self, model: Optional[str] = None) -> BaseLlm:
+        return resolve_backend()(model or self.model, self.agent_name)
+
+    @property
+    def capabilities(self):
+        return self.resolve().capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        cache = response_cache() if self.instruction_version else None
+        tier = tier_of(llm_request.model or self.model)
+        annotate({
+            "lucia.agent": self.agent_name,
+            "lucia.model.tier": tier.name if tier else None,
+            "lucia.cache": "off" if cache is None else None,
+        })
+        if cache is None:
+            async for response in self._generate_validated(llm_request, stream):
+                yield response
+            return
+
+        cache.check_version(self.agent_name, self.instruction_version)
+        key = cache_key(self.agent_name, self.instruction_version, llm_request, llm_request.model or self.model)
+        cached = cache.get(key)
+        annotate({"lucia.cache": "miss" if cached is None else "hit"})
+        if cached is not None:
+            cached.custom_metadata = {**(cached.custom_metadata or {}), "cache": "hit"}
+            yield cached
+            return
+        async for response in self._generate_validated(llm_request, stream):
+            if (
+                not response.partial and response.content and not response.error_code
+                and (response.custom_metadata or {}).get("schema") != "invalid"
+            ):
+                cache.put(key, self.agent_name, self.instruction_version, response)
+            yield response
+
+    async def _generate_validated(
+        self, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.output_schema is None:
+            async for response in self._metered(llm_request, stream):
+                yield response
+            return
+
+        request, attempt = llm_request, 0
+        while True:
+            final = None
+            async for response in self._metered(request, stream):
+                if _final_text(response) is None:
+                    yield response
+                else:
+                    final = response
+            if final is None:
+                return
+            text = _final_text(final)
+            try:
+                output = parse_output(text, self.output_schema)
+            except OutputValidationError as exc:
+                metrics.increment(f"schema.invalid.{self.agent_name}")
+                if attempt >= settings.output_retries:
+                    metrics.increment(f"schema.exhausted.{self.agent_name}")
+                    logger.warning("%s: invalid output after %d retries: %s", self.agent_name, attempt, exc)
+                    final.custom_metadata = {**(final.custom_metadata or {}), "schema": "invalid"}
+                    annotate({"lucia.schema.retries": attempt, "lucia.schema.valid": False})
+                    yield final
+                    return
+                attempt += 1
+                metrics.increment(f"schema.retries.{self.agent_name}")
+                request = _retry_request(request, text, exc)
+                continue
+            final.content = types.Content(role="model", parts=[types.Part.from_text(text=canonical_json(output))])
+            annotate({"lucia.schema.retries": attempt, "lucia.schema.valid": True})
+            yield final
+            return
+
+    async def _metered(
+        self, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """One backend call (retried and hedged by `main_agent.resilience`), recorded in the per-tier routing metrics."""
+        model = llm_request.model or self.model
+        backend = self.resolve(model)
+
+        def _call(hedge: bool):
+            # A hedge runs concurrently with the first request: give it its own copy.
+            request = llm_request.model_copy(deep=True) if hedge else llm_request
+            return backend.generate_content_async(request, stream)
+
+        started, usage = time.perf_counter(), None
+        async for response in resilience().stream(self.agent_name, _call):
+            if response.usage_metadata and not response.partial:
+                usage = response.usage_metadata
+            yield response
+        record_call(model, time.perf_counter() - started, usage)
+
+    def connect(self, llm_request: LlmRequest):
+        return self.resolve(llm_request.model).connect(llm_request)
+
+
+def _final_text(llm_response: LlmResponse) -> Optional[str]:
+    """Text of a final, non-tool-call response; None for partial chunks, tool calls and errors."""
+    content = llm_response.content
+    if llm_response.partial or llm_response.error_code or not content or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    return "".join(part.text for part in content.parts if part.text and not part.thought) or None
+
+
+def _retry_request(llm_request: LlmRequest, text: str, error: Exception) -> LlmRequest:
+    """Re-asks the model with its invalid output and the validation error appended."""
+    retry = llm_request.model_copy(deep=True)
+    retry.contents.append(types.Content(role="model", parts=[types.Part.from_text(text=text)]))
+    retry.contents.append(types.Content(role="user", parts=[types.Part.from_text(
+        text=f"Your previous reply was rejected: {error} Reply again with only the corrected JSON object."
+    )]))
+    return retry
+
+
+def model_for(
+    agent_name: str,
+    model_name: str,
+    cache_instruction: Optional[str] = None,
+    output_schema: Optional[type] = None,
+) -> LuciaModel:
+    """
+    The model factory used by `main_agent.agent` for each `LlmAgent`.
+
+    Passing the agent's instruction as ``cache_instruction`` opts the agent
+    into the response cache, versioned by that instruction; ``output_schema``
+    (a `main_agent.schemas` model) validates and canonicalizes its output.
+    """
+    version = instruction_version(cache_instruction) if cache_instruction else ""
+    return LuciaModel(
+        model=model_name, agent_name=agent_name, instruction_version=version, output_schema=output_schema
+    )
+
+
+# ---------------------------------------------------------------------------
+# Offline stand-in
+# ---------------------------------------------------------------------------
+
+_PROVIDER_MENTION = re.compile(r"\b(doctor|dr|physician|provider|clinician|nurse|gp|(he|she) (just )?(said|told))\b", re.I)
+
+
+def function_call_content(name: str, **args: Any) -> types.Content:
+    """Builds a model turn that calls tool ``name`` with ``args``."""
+    return types.Content(role="model", parts=[types.Part.from_function_call(name=name, args=args)])
+
+
+def stand_in_error(code: int = 503, retry_after: Optional[float] = None) -> errors.APIError:
+    """
+    A Gemini-shaped API error (``ClientError`` for 4xx, ``ServerError`` for
+    5xx), with a ``RetryInfo`` hint of ``retry_after`` seconds.
+    """
+    status = {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED"}.get(code, "INTERNAL")
+    error = {"code": code, "message": "Injected by the stand-in.", "status": status, "details": []}
+    if retry_after is not None:
+        error["details"].append({"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{retry_after}s"})
+    return (errors.ClientError if code < 500 else errors.ServerError)(code, {"error": error})
+
+
+def _as_content(response: Any) -> types.Content:
+    if isinstance(response, types.Content):
+        return response
+    if not isinstance(response, str):
+        response = json.dumps(response)
+    return types.Content(role="model", parts=[types.Part.from_text(text=response)])
+
+
+def _user_texts(llm_request: LlmRequest) -> list:
+    """Texts of the patient's own messages (ADK relays other agents' output as "For context:" user turns)."""
+    texts = []
+    for content in llm_request.contents:
+        if content.role == "user":
+            text = "".join(part.text for part in content.parts or [] if part.text)
+            if text and not text.startswith("For context:"):
+                texts.append(text)
+    return texts
+
+
+def _function_responses(llm_request: LlmRequest) -> list:
+    last = llm_request.contents[-1] if llm_request.contents else None
+    if not last or not last.parts:
+        return []
+    return [part.function_response for part in last.parts if part.function_response]
+
+
+def _is_delta_request(llm_request: LlmRequest) -> bool:
+    return '"add"' in str(llm_request.config.system_instruction or "")
+
+
+_SYMPTOM_MAPPING = {"pain_cluster": ["stiff, swollen joints"], "fatigue_cluster": ["fatigue"]}
+
+
+def _scripted_biases(llm_request: LlmRequest) -> Any:
+    """The scripted bias list, or the AXIOM tool call that has to come first if a tool is offered."""
+    responses = _function_responses(llm_request)
+    if responses:
+        result = responses[0].response or {}
+        implication = result.get("result") or next(iter(result.values()), "")
+    elif not any(_PROVIDER_MENTION.search(text) for text in _user_texts(llm_request)):
+        return []
+    elif "get_bias_implications_batch" in llm_request.tools_dict:
+        return function_call_content("get_bias_implications_batch", bias_types=["gender_bias"])
+    elif "get_bias_implications" in llm_request.tools_dict:
+        return function_call_content("get_bias_implications", bias_type="gender_bias")
+    else:
+        implication = ""
+    return [{"bias": "gender_bias", "reason": "Provider dismissed reported symptoms.", "implication": implication}]
+
+
+def default_script(agent_name: str, llm_request: LlmRequest) -> Any:
+    """
+    Canned, well-formed responses for each LUCIA agent.
+
+    The bias analyzer calls the AXIOM lookup tool (`get_bias_implications_batch`
+    if the request offers it, else `get_bias_implications`) when the
+    conversation it was sent mentions a provider, then answers with the
+    tool's implication. The fused ``analysis_agent`` has no tool; it reports
+    the same bias with an empty implication, next to the symptom mapping.
+    """
+    delta = _is_delta_request(llm_request)
+    if agent_name == "symptom_mapper_agent":
+        return {"add": _SYMPTOM_MAPPING, "remove": {}} if delta else {"symptomMapping": _SYMPTOM_MAPPING}
+    if agent_name in ("bias_analyzer_agent", "analysis_agent"):
+        biases = _scripted_biases(llm_request)
+        if isinstance(biases, types.Content):
+            return biases
+        if agent_name == "analysis_agent":
+            return {"symptomMapping": _SYMPTOM_MAPPING, "biasAwareness": biases}
+        return {"add": biases, "remove": []} if delta else {"biasAwareness": biases}
+    if agent_name == "advocacy_generator_agent":
+        return {"structuredAdvocacy": [
+            "What further evaluations could help understand my stiff and swollen joints?",
+            "How can we ensure my symptoms are evaluated thoroughly?",
+        ]}
+    if agent_name == "symptom_question_agent":
+        return {"structuredAdvocacy": ["What further evaluations could help understand my stiff and swollen joints?"]}
+    if agent_name == "bias_question_agent":
+        return {"structuredAdvocacy": ["How can we ensure my symptoms are evaluated thoroughly?"]}
+    if agent_name == "llm_report_formatter_agent":
+        return "**Patient Advocacy & Consultation Aid**"
+    return {}
+
+
+class StandInLlm(BaseLlm):
+    """
+    Local stand-in for Gemini.
+
+    Response source, in priority order:
+        1. ``responses``: a queue consumed one item per call (str, dict -> JSON
+           text, or a ready-made `types.Content`, e.g. `function_call_content`;
+           an exception, e.g. `stand_in_error`, is raised).
+        2. ``script``: ``script(agent_name, llm_request)`` returning one such item.
+        3. `default_script`.
+
+    Parameters
+    ----------
+    agent_name : str
+        The calling agent, passed to the script.
+    latency, latency_jitter : float
+        Seconds to sleep per call (uniform jitter of +/- ``latency_jitter``).
+    latency_per_token : float
+        Additional seconds per completion token, to model decode time (long
+        outputs take longer).
+    spike_rate, spike_latency : float
+        Probability of a latency spike per call, and the seconds it adds.
+    error_rate : float
+        Probability that a call fails with `stand_in_error` ``error_code``
+        (after ``latency``), hinting ``error_retry_after`` seconds.
+    prompt_tokens, completion_tokens : Optional[int]
+        Fixed token counts for ``usage_metadata``; by default they are
+        estimated as ~4 characters per token.
+    record_requests : bool
+        Keep every `LlmRequest` in ``requests`` (off for load tests).
+    """
+
+    agent_name: str = ""
+    responses: list = []
+    script: Optional[Callable[[str, LlmRequest], Any]] = None
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    latency_per_token: float = 0.0
+    spike_rate: float = 0.0
+    spike_latency: float = 0.0
+    error_rate: float = 0.0
+    error_code: int = 503
+    error_retry_after: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    record_requests: bool = False
+    requests: list = []
+    calls: int = 0
+
+    def _next_response(self, llm_request: LlmRequest) -> types.Content:
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, BaseException):
+                raise response
+            return _as_content(response)
+        script = self.script or default_script
+        return _as_content(script(self.agent_name, llm_request))
+
+    def _usage(self, llm_request: LlmRequest, content: types.Content) -> types.GenerateContentResponseUsageMetadata:
+        prompt = self.prompt_tokens
+        if prompt is None:
+            chars = len(str(llm_request.config.system_instruction or ""))
+            chars += sum(len(part.text or "") for c in llm_request.contents for part in c.parts or [])
+            prompt = max(1, chars // 4)
+        completion = self.completion_tokens
+        if completion is None:
+            completion = max(1, sum(len(part.text or "") for part in content.parts or []) // 4)
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt,
+            candidates_token_count=completion,
+            total_token_count=prompt + completion,
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.record_requests:
+            self.requests.append(llm_request)
+        if self.error_rate and random.random() < self.error_rate:
+            await asyncio.sleep(self.latency)
+            raise stand_in_error(self.error_code, self.error_retry_after)
+        content = self._next_response(llm_request)
+        usage = self._usage(llm_request, content)
+
+        delay = self.latency + self.latency_per_token * usage.candidates_token_count
+        if self.latency_jitter:
+            delay += random.uniform(-self.latency_jitter, self.latency_jitter)
+        if self.spike_rate and random.random() < self.spike_rate:
+            delay += self.spike_latency
+        text_parts = [part.text for part in content.parts or [] if part.text]
+
+        if stream and text_parts and delay > 0:
+            # Spread the latency over word-sized chunks, like an SSE stream.
+            words = re.findall(r"\S+\s*", "".join(text_parts)) or [""]
+            for word in words:
+                await asyncio.sleep(max(0.0, delay) / len(words))
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part.from_text(text=word)]), partial=True)
+        elif delay > 0:
+            await asyncio.sleep(delay)
+        elif stream and text_parts:
+            for word in re.findall(r"\S+\s*", "".join(text_parts)):
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part.from_text(text=word)]), partial=True)
+
+        yield LlmResponse(content=content, usage_metadata=usage, turn_complete=True)
+
+
+def stand_in_backend(**options: Any) -> ModelBackend:
+    """
+    Builds a backend that serves every agent from a `StandInLlm`.
+
+    One stand-in is created per (model, agent) pair and reused, so scripted
+    ``responses`` and call counters persist across turns. ``options`` are
+    passed to `StandInLlm` (e.g. ``latency=0.2, prompt_tokens=900``).
+    """
+    instances = {}
+
+    def _backend(model_name: str, agent_name: str) -> BaseLlm:
+        key = (model_name, agent_name)
+        if key not in instances:
+            instances[key] = StandInLlm(model=model_name, agent_name=agent_name, **options)
+        return instances[key]
+
+    _backend.instances = instances
+    return _backend
+
+
+def replay_script(path: str) -> Callable[[str, LlmRequest], Any]:
+    """
+    Builds a stand-in script that replays recorded responses.
+
+    ``path`` is a JSONL file of ``{"agent": ..., "text": ...}`` or
+    ``{"agent": ..., "function_call": {"name": ..., "args": {...}}}`` records.
+    Each agent's responses are replayed in order and then cycled; agents
+    without recordings fall back to `default_script`.
+    """
+    recorded = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                recorded.setdefault(record["agent"], []).append(record)
+    cursors = {agent: 0 for agent in recorded}
+
+    def _script(agent_name: str, llm_request: LlmRequest) -> Any:
+        records = recorded.get(agent_name)
+        if not records:
+            return default_script(agent_name, llm_request)
+        record = records[cursors[agent_name] % len(records)]
+        cursors[agent_name] += 1
+        if "function_call" in record:
+            call = record["function_call"]
+            return function_call_content(call["name"], **call.get("args", {}))
+        return record["text"]
+
+    return _script
+
+
+_env_backend: Optional[ModelBackend] = None
+
+
+def _env_stand_in_backend() -> ModelBackend:
+    global _env_backend
+    if _env_backend is None:
+        options = {"latency": settings.standin_latency_ms / 1000}
+        if settings.standin_replay_path:
+            options["script"] = replay_script(settings.standin_replay_path)
+        _env_backend = stand_in_backend(**options)
+    return _env_backend
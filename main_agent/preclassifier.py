@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Provider-Mention Pre-Classifier
+
+`bias_analyzer_agent` follows a "NO DOCTOR, NO BIAS" rule, yet answering
+``{"biasAwareness": []}`` for a turn that only describes symptoms costs a
+full model call. This module detects, with a local lexicon, whether a patient
+message references an interaction with a clinician, and provides a
+``before_model_callback`` that answers the bias stage directly while the
+session contains no such reference.
+
+The lexicon is tuned for recall: a false positive only costs the model call
+that would have happened anyway, while a false negative would hide a bias.
+Precision and recall are measured against the labeled fixture
+``tests/fixtures/provider_mentions.jsonl`` (`tests/test_preclassifier.py`,
+``python -m benchmarks.provider_classifier``).
+
+Key Components:
+    * `mentions_provider`: Classifies one message.
+    * `evaluate`: Precision/recall of the classifier on labeled messages.
+    * `skip_bias_without_provider`: The ``before_model_callback``. The
+        session-level verdict is kept in state under ``provider_mentioned`` so
+        only the newest message is classified on later turns.
+
+Metrics (`main_agent.metrics`):
+    * ``bias_preclassifier.short_circuits``: Bias model calls answered locally.
+"""
+import json
+import logging
+import re
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from . import metrics
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_MENTIONED_KEY = "provider_mentioned"
+EMPTY_BIAS_ANALYSIS = json.dumps({"biasAwareness": []})
+
+_ROLES = (
+    r"doctors?|docs?|drs?\.?|physicians?|providers?|clinicians?|nurses?|practitioners?|specialists?|"
+    r"surgeons?|therapists?|psychiatrists?|psychologists?|midwi(fe|ves)|pharmacists?|"
+    r"\w+(ologist|ologists|iatrist|iatrists|ician|icians)|internists?|ob-?gyns?|gynos?|"
+    r"paramedics?|medics?|residents?|attendings?"
+)
+_SETTINGS = (
+    r"clinic|hospital|emergency room|urgent care|walk-in|appointment|appt|check-?up|consultation|"
+    r"office visit|telehealth|follow-?up|triage|admitted|discharged"
+)
+_ACTIONS = (
+    r"prescribed|diagnosed|misdiagnosed|referred|referral|examined|blood ?work|lab results|"
+    r"test results|scan|x-?ray|mri|ultrasound"
+)
+_REPORTED_SPEECH = (
+    r"(he|she|they)\s+(just\s+|only\s+|basically\s+)?"
+    r"(said|says|told|tells|thinks|thought|insisted|claimed|dismissed|brushed|laughed|refused|"
+    r"wouldn'?t|didn'?t|did not|won'?t|suggested|recommended|blamed)"
+)
+
+_LEXICON = re.compile(rf"\b({_ROLES}|{_SETTINGS}|{_ACTIONS}|{_REPORTED_SPEECH})\b", re.IGNORECASE)
+# Case-sensitive acronyms ("ER" but not "her", "GP" but not "gp" as a typo).
+_ACRONYMS = re.compile(r"\b(ER|A&E|GP|PCP|MD|NP|PA-C|OB|ICU)\b")
+
+
+def mentions_provider(text: str) -> bool:
+    """True if ``text`` appears to reference an interaction with a clinician."""
+    return bool(text) and bool(_LEXICON.search(text) or _ACRONYMS.search(text))
+
+
+def evaluate(samples: list) -> dict:
+    """
+    Scores `mentions_provider` on ``samples`` of ``{"text": str, "provider": bool}``.
+
+    Returns
+    -------
+    dict
+        ``precision``, ``recall``, the confusion counts and the
+        ``false_negatives`` / ``false_positives`` texts for inspection.
+    """
+    counts = {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+    misses = {"false_negatives": [], "false_positives": []}
+    for sample in samples:
+        predicted, actual = mentions_provider(sample["text"]), bool(sample["provider"])
+        if predicted and actual:
+            counts["tp"] += 1
+        elif predicted:
+            counts["fp"] += 1
+            misses["false_positives"].append(sample["text"])
+        elif actual:
+            counts["fn"] += 1
+            misses["false_negatives"].append(sample["text"])
+        else:
+            counts["tn"] += 1
+    flagged, relevant = counts["tp"] + counts["fp"], counts["tp"] + counts["fn"]
+    return {
+        "precision": counts["tp"] / flagged if flagged else 1.0,
+        "recall": counts["tp"] / relevant if relevant else 1.0,
+        **counts,
+        **misses,
+    }
+
+
+def _content_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def session_mentions_provider(callback_context: CallbackContext) -> bool:
+    """
+    Session-level verdict, updated with the newest user message.
+
+    The first call scans every user message of the session; the result is
+    stored under ``provider_mentioned`` so later turns classify only their
+    own message.
+    """
+    state = callback_context.state
+    if state.get(PROVIDER_MENTIONED_KEY):
+        return True
+    texts = [_content_text(callback_context.user_content)]
+    if PROVIDER_MENTIONED_KEY not in state:
+        texts += [_content_text(event.content) for event in callback_context.session.events if event.author == "user"]
+    mentioned = any(mentions_provider(text) for text in texts)
+    state[PROVIDER_MENTIONED_KEY] = mentioned
+    return mentioned
+
+
+def skip_bias_without_provider(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """``before_model_callback`` that answers the bias stage locally when no provider was mentioned."""
+    if session_mentions_provider(callback_context):
+        return None
+    metrics.increment("bias_preclassifier.short_circuits")
+    annotate({"lucia.bias_preclassifier.short_circuit": True})
+    logger.debug("No provider interaction in session; skipping %s model call", callback_context.agent_name)
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part.from_text(text=EMPTY_BIAS_ANALYSIS)]),
+        custom_metadata={"preclassifier": "no_provider"},
+    )
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Deterministic Report Formatter
+
+The last stage of the pipeline turns the three JSON outputs stored in session
+state (`symptom_analysis`, `bias_analysis`, `advocacy_analysis`) into the
+fixed "Patient Advocacy & Consultation Aid" text. The job is purely
+mechanical, so it is done in code: no model call, no paraphrasing, and the
+same input always produces the same report.
+
+Key Components:
+    * `render_report`: Pure function that fills in the report template.
+    * `render_partial_sections`: The same template with sections marked
+        pending, for turns cut short by their time budget.
+    * `ReportFormatterAgent`: A custom ADK agent that reads the analysis from
+        session state, renders the report and writes it to the `report`
+        output key. An optional LLM sub-agent can be attached as a fallback
+        for analysis outputs that cannot be parsed as JSON.
+
+Usage:
+    >>> from main_agent.report import render_report
+    >>> print(render_report(symptom_json, bias_json, advocacy_json))
+"""
+import json
+import logging
+import re
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+REPORT_TITLE = "**Patient Advocacy & Consultation Aid**"
+REPORT_DISCLAIMER = (
+    "**Disclaimer:** This report is generated to assist in patient–doctor "
+    "communication and is not medical advice. Always consult a qualified "
+    "healthcare professional for diagnosis and treatment."
+)
+SYMPTOMS_HEADING = "**1. Summary of Reported Symptoms:**"
+BIAS_HEADING = "**2. Communication & Bias Insights:**"
+QUESTIONS_HEADING = "**3. Suggested Questions for Your Doctor:**"
+
+NO_SYMPTOMS = "No symptoms identified."
+NO_BIASES = "No diagnostic biases identified."
+NO_QUESTIONS = "No questions generated."
+
+SYMPTOMS_PENDING = "Symptom summary pending; it will be included in your next report."
+BIASES_PENDING = "Bias review pending; it will be included in your next report."
+QUESTIONS_PENDING = "Questions pending; they will be included in your next report."
+
+_CODE_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+class ReportInputError(ValueError):
+    """Raised when an analysis output cannot be interpreted as JSON."""
+
+
+def parse_agent_json(raw: Any) -> dict:
+    """
+    Parses the JSON object emitted by a worker agent.
+
+    Models frequently wrap their JSON in Markdown code fences or surround it
+    with a sentence of prose; both are tolerated.
+
+    Parameters
+    ----------
+    raw : Any
+        The value stored under the agent's ``output_key``. Already-parsed
+        dictionaries are returned unchanged.
+
+    Returns
+    -------
+    dict
+        The decoded JSON object.
+
+    Raises
+    ------
+    ReportInputError
+        If no JSON object can be recovered from the text.
+    """
+    if isinstance(raw, dict):
+        return raw
+    if not isinstance(raw, str):
+        raise ReportInputError(f"Expected a JSON string, got {type(raw).__name__}.")
+
+    text = _CODE_FENCE.sub("", raw.strip())
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise ReportInputError("No JSON object found in agent output.") from None
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as exc:
+            raise ReportInputError(f"Malformed JSON in agent output: {exc}") from None
+
+    if not isinstance(parsed, dict):
+        raise ReportInputError("Agent output is not a JSON object.")
+    return parsed
+
+
+def extract_symptom_mapping(raw: Any) -> dict:
+    """Returns the ``symptomMapping`` clusters, accepting an unwrapped mapping too."""
+    if raw is None:
+        return {}
+    data = parse_agent_json(raw)
+    mapping = data.get("symptomMapping", data)
+    if not isinstance(mapping, dict):
+        raise ReportInputError('"symptomMapping" must be an object.')
+    return mapping
+
+
+def extract_bias_awareness(raw: Any) -> list:
+    """Returns the ``biasAwareness`` list of bias objects."""
+    if raw is None:
+        return []
+    biases = parse_agent_json(raw).get("biasAwareness", [])
+    if not isinstance(biases, list):
+        raise ReportInputError('"biasAwareness" must be a list.')
+    return [bias for bias in biases if isinstance(bias, dict)]
+
+
+def extract_structured_advocacy(raw: Any) -> list:
+    """Returns the ``structuredAdvocacy`` list of question strings."""
+    if raw is None:
+        return []
+    questions = parse_agent_json(raw).get("structuredAdvocacy", [])
+    if not isinstance(questions, list):
+        raise ReportInputError('"structuredAdvocacy" must be a list.')
+    return [str(question) for question in questions if question]
+
+
+def title_case(identifier: str) -> str:
+    """Converts a snake_case identifier to Title Case ("pain_cluster" -> "Pain Cluster")."""
+    return " ".join(word.capitalize() for word in str(identifier).split("_") if word)
+
+
+def _symptom_lines(mapping: dict) -> list:
+    lines = []
+    for cluster, symptoms in mapping.items():
+        if isinstance(symptoms, (list, tuple)):
+            symptoms = ", ".join(str(symptom) for symptom in symptoms)
+        if symptoms:
+            lines.append(f"* {title_case(cluster)}: {symptoms}")
+    return lines or [NO_SYMPTOMS]
+
+
+def _bias_lines(biases: list) -> list:
+    lines = []
+    for bias in biases:
+        lines.append(f"* {title_case(bias.get('bias', 'unspecified_bias'))}")
+        lines.append(f"    * Observation: {bias.get('reason') or 'Not provided.'}")
+        lines.append(f"    * Potential Risk: {bias.get('implication') or 'Not provided.'}")
+    return lines or [NO_BIASES]
+
+
+def _question_lines(questions: list) -> list:
+    return [f"* {question}" for question in questions] or [NO_QUESTIONS]
+
+
+REPORT_PREAMBLE = f"{REPORT_TITLE}\n\n{REPORT_DISCLAIMER}"
+
+
+def render_symptom_section(symptom_mapping: dict) -> str:
+    return "\n".join([SYMPTOMS_HEADING, *_symptom_lines(symptom_mapping)])
+
+
+def render_bias_section(bias_awareness: list) -> str:
+    return "\n".join([BIAS_HEADING, *_bias_lines(bias_awareness)])
+
+
+def render_question_section(structured_advocacy: list) -> str:
+    return "\n".join([QUESTIONS_HEADING, *_question_lines(structured_advocacy)])
+
+
+def render_sections(
+    symptom_mapping: dict,
+    bias_awareness: list,
+    structured_advocacy: list,
+) -> str:
+    """Fills in the report template from already-extracted analysis data."""
+    return "\n\n".join([
+        REPORT_PREAMBLE,
+        render_symptom_section(symptom_mapping),
+        render_bias_section(bias_awareness),
+        render_question_section(structured_advocacy),
+    ])
+
+
+def render_partial_sections(
+    symptom_mapping: Optional[dict],
+    bias_awareness: Optional[list],
+    structured_advocacy: Optional[list],
+) -> str:
+    """
+    Fills in the report template for a turn cut short by its time budget
+    (`main_agent.budget`): sections given as None are marked pending.
+    """
+    return "\n\n".join([
+        REPORT_PREAMBLE,
+        render_symptom_section(symptom_mapping) if symptom_mapping is not None
+        else f"{SYMPTOMS_HEADING}\n{SYMPTOMS_PENDING}",
+        render_bias_section(bias_awareness) if bias_awareness is not None
+        else f"{BIAS_HEADING}\n{BIASES_PENDING}",
+        render_question_section(structured_advocacy) if structured_advocacy is not None
+        else f"{QUESTIONS_HEADING}\n{QUESTIONS_PENDING}",
+    ])
+
+
+def render_report(
+    symptom_analysis: Any,
+    bias_analysis: Any,
+    advocacy_analysis: Any,
+) -> str:
+    """
+    Renders the "Patient Advocacy & Consultation Aid" report.
+
+    Parameters
+    ----------
+    symptom_analysis, bias_analysis, advocacy_analysis : Any
+        The raw values of the corresponding session state keys (JSON strings
+        or dictionaries). ``None`` renders as an empty section.
+
+    Returns
+    -------
+    str
+        The report text. Wording of symptoms, reasons, implications and
+        questions is preserved verbatim; only cluster and bias identifiers
+        are converted to Title Case.
+
+    Raises
+    ------
+    ReportInputError
+        If any of the analysis outputs is malformed.
+    """
+    return render_sections(
+        extract_symptom_mapping(symptom_analysis),
+        extract_bias_awareness(bias_analysis),
+        extract_structured_advocacy(advocacy_analysis),
+    )
+
+
+def _render_leniently(state: Any) -> str:
+    """Renders what can be parsed, treating malformed sections as empty."""
+    sections = []
+    for key, extractor in (
+        ("symptom_analysis", extract_symptom_mapping),
+        ("bias_analysis", extract_bias_awareness),
+        ("advocacy_analysis", extract_structured_advocacy),
+    ):
+        try:
+            sections.append(extractor(state.get(key)))
+        except ReportInputError as exc:
+            logger.warning("Ignoring malformed %s: %s", key, exc)
+            sections.append(extractor(None))
+    return render_sections(*sections)
+
+
+class ReportFormatterAgent(BaseAgent):
+    """
+    Zero-LLM replacement for the report formatting `LlmAgent`.
+
+    If a sub-agent is attached it is used as an opt-in fallback: it runs only
+    when one of the analysis outputs is malformed, and is expected to write
+    the same ``output_key``.
+    """
+
+    output_key: str = "report"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        try:
+            report = render_report(
+                state.get("symptom_analysis"),
+                state.get("bias_analysis"),
+                state.get("advocacy_analysis"),
+            )
+        except ReportInputError as exc:
+            fallback = self._fallback_agent()
+            if fallback is not None:
+                logger.info("Delegating report to %s: %s", fallback.name, exc)
+                async for event in fallback.run_async(ctx):
+                    yield event
+                return
+            report = _render_leniently(state)
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part.from_text(text=report)]),
+            actions=EventActions(state_delta={self.output_key: report}),
+        )
+
+    def _fallback_agent(self) -> Optional[BaseAgent]:
+        return self.sub_agents[0] if self.sub_agents else None
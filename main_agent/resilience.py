@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Model Call Resilience
+
+The stages of a turn run in series, so one slow or failed Gemini response
+(a latency spike, a 429 RESOURCE_EXHAUSTED, a 503) stalls the whole report.
+Every backend call made by `main_agent.models.LuciaModel` goes through
+`ModelResilience.stream`, which adds:
+
+    * **Per-stage deadlines:** a call, including all its retries and
+        hedges, must produce its response within the deadline of its agent
+        (``LUCIA_MODEL_DEADLINE``, per-agent overrides in
+        ``LUCIA_MODEL_DEADLINES="advocacy_generator_agent=20,..."``), else
+        `ModelDeadlineExceeded` is raised.
+    * **Retries with backoff:** 408/429/5xx and connection errors are retried
+        up to ``LUCIA_MODEL_RETRIES`` times after a jittered exponential
+        backoff (``LUCIA_MODEL_BACKOFF_MS`` doubling per retry, capped at
+        8 s). A retry-after hint of the server (Gemini's ``RetryInfo``
+        ``retryDelay``, or a ``Retry-After`` header) is a lower bound for the
+        wait; a hint that does not fit in the deadline fails the call at once.
+    * **Hedging** (``LUCIA_MODEL_HEDGE``): when the first response of a call
+        takes longer than the agent's observed p95 first-response latency
+        (``LUCIA_MODEL_HEDGE_QUANTILE``, once 20 calls were observed), a
+        second identical request is sent; the first response of either wins
+        and the other request is cancelled.
+    * **Concurrency budget** (``LUCIA_MODEL_CONCURRENCY``): at most this many
+        backend requests are in flight in the process, hedges included.
+        Calls wait for a slot (within their deadline); a hedge is only sent
+        when a slot is free right away, so hedging never queues primary
+        requests.
+
+Retries and hedges only happen before the first response of a call has been
+passed on; a streamed response that fails halfway is not repeated.
+
+Key Components:
+    * `ResiliencePolicy`: The settings above (`ResiliencePolicy.from_settings`).
+    * `ModelResilience`: Applies a policy; keeps the latency samples and the
+        concurrency budget.
+    * `is_retryable` / `retry_after`: Error classification and server hints.
+    * `resilience` / `use_resilience`: The process-wide instance and an
+        in-process override.
+
+Metrics (`main_agent.metrics`):
+    * ``resilience.retries.<agent>``: Calls repeated after a transient error.
+    * ``resilience.hedges.<agent>`` / ``resilience.hedge_wins.<agent>``:
+        Hedge requests sent, and those that answered first.
+    * ``resilience.hedges_skipped.<agent>``: Hedges not sent for lack of budget.
+    * ``resilience.deadline_exceeded.<agent>``: Calls that ran out of time.
+    * ``resilience.failed.<agent>``: Calls that failed after their retries.
+
+Usage:
+    >>> policy = ResiliencePolicy(deadline=10, max_retries=2, hedge=True, concurrency=32)
+    >>> with use_resilience(ModelResilience(policy)):
+    ...     runner.run_async(...)
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Mapping, Optional
+
+from . import metrics
+from .config import LuciaSettings, settings
+from .telemetry import annotate
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_CODES = frozenset({408, 429, 500, 502, 503, 504})
+_SECONDS = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*s?\s*$")
+
+
+class ModelDeadlineExceeded(TimeoutError):
+    """Raised when a model call does not respond within its stage deadline."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for rate limits, server errors and connection failures."""
+    if isinstance(exc, ConnectionError):
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_CODES
+
+
+def _seconds(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):  # protobuf Duration as JSON object
+        return float(value.get("seconds", 0)) + float(value.get("nanos", 0)) / 1e9
+    match = _SECONDS.match(str(value or ""))
+    return float(match.group(1)) if match else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Seconds the server asked the client to wait, if any.
+
+    Read from the ``google.rpc.RetryInfo`` entry of a Gemini error
+    (``{"error": {"details": [{"@type": ...RetryInfo, "retryDelay": "13s"}]}}``),
+    else from a ``Retry-After`` header (seconds form).
+    """
+    details = getattr(exc, "details", None)
+    if isinstance(details, dict):
+        details = details.get("error", details).get("details", [])
+    for detail in details if isinstance(details, list) else []:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+            delay = _seconds(detail.get("retryDelay"))
+            if delay is not None:
+                return delay
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None:
+        return _seconds(headers.get("retry-after"))
+    return None
+
+
+def _parse_deadlines(spec: str) -> Dict[str, float]:
+    """``"agent=seconds,agent=seconds"`` -> ``{agent: seconds}``."""
+    deadlines = {}
+    for item in spec.split(","):
+        if item.strip():
+            agent, _, seconds = item.partition("=")
+            deadlines[agent.strip()] = float(seconds)
+    return deadlines
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    How model calls are bounded, retried and hedged.
+
+    Parameters
+    ----------
+    deadline : float
+        Seconds per call, retries and hedges included (0: no deadline).
+    deadlines : Mapping[str, float]
+        Per-agent overrides of ``deadline``.
+    max_retries : int
+        Retries after a retryable error.
+    backoff_base, backoff_max : float
+        First backoff in seconds, doubled per retry up to ``backoff_max``.
+    hedge : bool
+        Send a second request when the first is slower than the quantile.
+    hedge_quantile : float
+        Quantile (0-100) of the agent's first-response latencies after which
+        the hedge is sent.
+    hedge_min_samples : int
+        Observed calls needed before an agent is hedged.
+    hedge_min_delay : float
+        Lower bound of the hedge delay in seconds.
+    concurrency : int
+        Backend requests in flight in the process (0: unlimited).
+    """
+
+    deadline: float = 60.0
+    deadlines: Mapping[str, float] = field(default_factory=dict)
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge: bool = False
+    hedge_quantile: float = 95.0
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.05
+    concurrency: int = 0
+
+    @classmethod
+    def from_settings(cls, config: LuciaSettings = settings) -> "ResiliencePolicy":
+        return cls(
+            deadline=config.model_deadline,
+            deadlines=_parse_deadlines(config.model_deadlines),
+            max_retries=config.model_retries,
+            backoff_base=config.model_backoff_ms / 1000,
+            hedge=config.model_hedge,
+            hedge_quantile=config.model_hedge_quantile,
+            concurrency=config.model_concurrency,
+        )
+
+    def deadline_for(self, agent: str) -> Optional[float]:
+        seconds = self.deadlines.get(agent, self.deadline)
+        return seconds if seconds and seconds > 0 else None
+
+    def backoff(self, retry: int, hint: Optional[float] = None) -> float:
+        """Wait before retry number ``retry`` (0-based): equal jitter, at least ``hint``."""
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** retry)
+        delay = random.uniform(ceiling / 2, ceiling)
+        return max(delay, hint) if hint is not None else delay
+
+
+class ConcurrencyBudget:
+    """A process-wide limit on in-flight requests (``limit`` 0: unlimited)."""
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+    def try_acquire(self) -> bool:
+        if self.limit > 0 and (self.in_flight >= self.limit or self._waiters):
+            return False
+        self.in_flight += 1
+        return True
+
+    async def acquire(self) -> None:
+        if self.try_acquire():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter  # `release` hands its slot over
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class _Attempt:
+    """One backend request; a racing request is advanced to its first response in a task."""
+
+    def __init__(self, responses: AsyncIterator, hedge: bool = False, race: bool = True):
+        self.responses = responses
+        self.hedge = hedge
+        self.first = asyncio.ensure_future(responses.__anext__()) if race else None
+
+    async def close(self) -> None:
+        if self.first is None:
+            with contextlib.suppress(Exception):
+                await self.responses.aclose()
+            return
+        if not self.first.done():
+            self.first.cancel()
+        await asyncio.wait([self.first])
+        if not self.first.cancelled():
+            self.first.exception()  # retrieved: a loser's error is not reported
+        with contextlib.suppress(Exception):
+            await self.responses.aclose()
+
+
+_EMPTY = object()
+
+
+class ModelResilience:
+    """
+    Deadlines, retries, hedging and the concurrency budget for model calls.
+
+    Parameters
+    ----------
+    policy : ResiliencePolicy
+        The rules to apply.
+    """
+
+    def __init__(self, policy: Optional[ResiliencePolicy] = None):
+        self.policy = policy or ResiliencePolicy()
+        self.budget = ConcurrencyBudget(self.policy.concurrency)
+        self._latencies: Dict[str, deque] = {}
+
+    def hedge_delay(self, agent: str) -> Optional[float]:
+        """The agent's hedge delay, or None while hedging is off or too few calls were observed."""
+        samples = self._latencies.get(agent)
+        if not self.policy.hedge or not samples or len(samples) < self.policy.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        rank = max(0, min(len(ordered) - 1, int(round(self.policy.hedge_quantile / 100 * len(ordered) + 0.5)) - 1))
+        return max(self.policy.hedge_min_delay, ordered[rank])
+
+    def _observe(self, agent: str, seconds: float) -> None:
+        self._latencies.setdefault(agent, deque(maxlen=256)).append(seconds)
+
+    async def stream(
+        self, agent: str, call: Callable[[bool], AsyncIterator]
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Runs ``call`` under the policy and yields its responses.
+
+        Parameters
+        ----------
+        agent : str
+            The calling agent (deadline, latency samples, metrics).
+        call : Callable[[bool], AsyncIterator]
+            Starts one backend request; its argument is True for a hedge,
+            which runs concurrently with the first request.
+
+        Raises
+        ------
+        ModelDeadlineExceeded
+            If no response arrived within the agent's deadline.
+        Exception
+            The backend's error, when it is not retryable or the retries
+            are exhausted.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = self.policy.deadline_for(agent)
+        expires = loop.time() + deadline if deadline else None
+        retries = 0
+        while True:
+            try:
+                first, winner = await self._first_response(agent, call, expires)
+                break
+            except ModelDeadlineExceeded:
+                metrics.increment(f"resilience.deadline_exceeded.{agent}")
+                raise
+            except Exception as exc:
+                if not is_retryable(exc) or retries >= self.policy.max_retries:
+                    metrics.increment(f"resilience.failed.{agent}")
+                    raise
+                delay = self.policy.backoff(retries, retry_after(exc))
+                if expires is not None and loop.time() + delay >= expires:
+                    metrics.increment(f"resilience.deadline_exceeded.{agent}")
+                    raise ModelDeadlineExceeded(
+                        f"{agent}: no retry within the {deadline:g}s deadline ({exc})"
+                    ) from exc
+                retries += 1
+                metrics.increment(f"resilience.retries.{agent}")
+                logger.info("%s: retrying in %.2fs after %s", agent, delay, exc)
+                await asyncio.sleep(delay)
+        annotate({"lucia.resilience.retries": retries, "lucia.resilience.hedged": winner.hedge})
+
+        try:
+            if first is _EMPTY:
+                return
+            yield first
+            while True:
+                try:
+                    response = await self._within(
+                        winner.responses.__anext__(), expires, f"{agent}: response incomplete at the deadline"
+                    )
+                except StopAsyncIteration:
+                    return
+                except ModelDeadlineExceeded:
+                    metrics.increment(f"resilience.deadline_exceeded.{agent}")
+                    raise
+                yield response
+        finally:
+            with contextlib.suppress(Exception):
+                await winner.responses.aclose()
+            self.budget.release()
+
+    async def _within(self, awaitable, expires: Optional[float], what: str):
+        """Awaits ``awaitable`` in the current task until ``expires`` (loop time)."""
+        if expires is None:
+            return await awaitable
+        try:
+            if hasattr(asyncio, "timeout_at"):  # Python 3.11+: no extra task
+                async with asyncio.timeout_at(expires):
+                    return await awaitable
+            return await asyncio.wait_for(awaitable, max(0.0, expires - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError:
+            raise ModelDeadlineExceeded(what) from None
+
+    async def _first_response(self, agent: str, call: Callable[[bool], AsyncIterator], expires: Optional[float]):
+        """
+        Starts a request (plus a hedge, if it is slow) and returns
+        (first response, winning attempt). The winner keeps its budget slot.
+        """
+        loop = asyncio.get_running_loop()
+        await self._within(self.budget.acquire(), expires, f"{agent}: no concurrency budget before the deadline")
+        started = loop.time()
+        hedge_at = self.hedge_delay(agent)
+        if hedge_at is None:
+            return await self._single_first_response(agent, call, expires, started)
+
+        attempts: List[_Attempt] = []
+        winner = None
+        try:
+            attempts.append(_Attempt(call(False)))
+            errors = []
+            while True:
+                pending = [attempt.first for attempt in attempts if not attempt.first.done()]
+                timeout = None if expires is None else expires - loop.time()
+                if hedge_at is not None:
+                    until_hedge = started + hedge_at - loop.time()
+                    timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, timeout) if timeout is not None else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for attempt in attempts:
+                    if attempt.first in done:
+                        exc = attempt.first.exception()
+                        if exc is None or isinstance(exc, StopAsyncIteration):
+                            winner = attempt
+                            break
+                        errors.append(exc)
+                if winner is not None:
+                    break
+                if errors and all(attempt.first.done() for attempt in attempts):
+                    raise errors[0]
+                if expires is not None and loop.time() >= expires:
+                    raise ModelDeadlineExceeded(f"{agent}: no response within the deadline")
+                if hedge_at is not None and loop.time() >= started + hedge_at:
+                    hedge_at = None
+                    if self.budget.try_acquire():
+                        metrics.increment(f"resilience.hedges.{agent}")
+                        attempts.append(_Attempt(call(True), hedge=True))
+                    else:
+                        metrics.increment(f"resilience.hedges_skipped.{agent}")
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    await attempt.close()
+                    self.budget.release()
+            if not attempts:
+                self.budget.release()  # ``call`` itself raised
+
+        self._observe(agent, loop.time() - started)
+        if winner.hedge:
+            metrics.increment(f"resilience.hedge_wins.{agent}")
+        exc = winner.first.exception()
+        return (_EMPTY if exc is not None else winner.first.result()), winner
+
+    async def _single_first_response(
+        self, agent: str, call: Callable[[bool], AsyncIterator], expires: Optional[float], started: float
+    ):
+        """`_first_response` without a hedge: the request runs in the caller's task."""
+        attempt = None
+        try:
+            attempt = _Attempt(call(False), race=False)
+            try:
+                first = await self._within(
+                    attempt.responses.__anext__(), expires, f"{agent}: no response within the deadline"
+                )
+            except StopAsyncIteration:
+                first = _EMPTY
+        except BaseException:
+            if attempt is not None:
+                await attempt.close()
+            self.budget.release()
+            raise
+        self._observe(agent, asyncio.get_running_loop().time() - started)
+        return first, attempt
+
+
+_resilience_override: Optional[ModelResilience] = None
+_env_resilience: Optional[ModelResilience] = None
+
+
+def resilience() -> ModelResilience:
+    """The active instance: the in-process override, else one built from ``LUCIA_MODEL_*``."""
+    global _env_resilience
+    if _resilience_override is not None:
+        return _resilience_override
+    if _env_resilience is None:
+        _env_resilience = ModelResilience(ResiliencePolicy.from_settings())
+    return _env_resilience
+
+
+def set_resilience(instance: Optional[ModelResilience]) -> None:
+    """Installs ``instance`` for the process (None restores the environment default)."""
+    global _resilience_override
+    _resilience_override = instance
+
+
+@contextlib.contextmanager
+def use_resilience(instance: ModelResilience):
+    """Context manager form of `set_resilience` that restores the previous instance."""
+    previous = _resilience_override
+    set_resilience(instance)
+    try:
+        yield instance
+    finally:
+        set_resilience(previous)
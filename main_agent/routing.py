@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Model Routing
+
+Single source of truth for which Gemini model each agent runs on. Models
+are grouped into tiers (``lite``, ``standard``) with a price per million
+tokens. A routing policy gives every agent a default tier and, optionally,
+a tier to escalate to when the turn looks complex. The decision is made per
+model call from cheap local signals:
+
+    * the length of the patient's newest message (``min_chars``),
+    * whether that message mentions a clinician (``on_provider``, using the
+        `main_agent.preclassifier` lexicon), and
+    * the number of symptom clusters already in ``symptom_analysis``
+        (``min_clusters``).
+
+Any trigger that is set and met escalates the call. A trigger of 0/False is
+disabled.
+
+Policies (``LUCIA_ROUTING_POLICY``):
+    * ``fixed`` (default): the historical assignment, flash for the symptom
+        mapper (and the fused analysis agent) and flash-lite for the other
+        agents. No escalation.
+    * ``complexity``: flash-lite for every agent, escalating the symptom
+        mapper on long narratives or many clusters, the bias analyzer when the
+        newest message describes a clinician interaction, the fused analysis
+        agent on any of these triggers, and the advocacy generator (or, with
+        fan-out, the symptom question agent) when there are many clusters.
+    * ``economy``: flash-lite for every agent.
+    * ``quality``: flash for every agent.
+
+``LUCIA_ROUTING_CONFIG`` names a JSON file that adds or overrides tiers and
+policies::
+
+    {"tiers": {"lite": {"model": "gemini-2.5-flash-lite",
+                        "input_usd_per_mtok": 0.1, "output_usd_per_mtok": 0.4}},
+     "policies": {"mine": {"symptom_mapper_agent": {"tier": "lite",
+                                                    "escalate_to": "standard",
+                                                    "min_chars": 400}}}}
+
+Both entry points (`main_agent.agent` and ``lucia_deploy/agent.py``) take
+their model names from this module, so they cannot drift apart.
+
+Key Components:
+    * `ModelRouter`: Tiers plus the active policy; picks the tier of a call.
+    * `router`: The process-wide router built from the settings.
+    * `route_model`: ``before_model_callback`` that applies the routing
+        decision by rewriting ``llm_request.model``.
+    * `record_call`: Per-tier latency, token and cost accounting, called by
+        `main_agent.models.LuciaModel` for every backend call.
+    * `tier_summary`: Per-tier totals read back from the metrics.
+
+Metrics (`main_agent.metrics`):
+    * ``routing.<tier>.calls``, ``routing.<tier>.latency_ms``,
+        ``routing.<tier>.input_tokens``, ``routing.<tier>.output_tokens`` and
+        ``routing.<tier>.cost_microusd``: Backend calls served by a tier.
+    * ``routing.escalations.<agent>``: Calls routed above the agent's default tier.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from . import metrics
+from .config import settings
+from .preclassifier import mentions_provider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """A model and its list price (USD per million input / output tokens)."""
+
+    name: str
+    model: str
+    input_usd_per_mtok: float = 0.0
+    output_usd_per_mtok: float = 0.0
+
+    def cost_usd(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_usd_per_mtok + output_tokens * self.output_usd_per_mtok) / 1e6
+
+
+@dataclass(frozen=True)
+class Signals:
+    """The local complexity signals of one model call."""
+
+    message_chars: int = 0
+    provider_mentioned: bool = False
+    clusters: int = 0
+
+
+@dataclass(frozen=True)
+class Route:
+    """Routing rule of one agent: its default tier and when to escalate."""
+
+    tier: str
+    escalate_to: str = ""
+    min_chars: int = 0
+    on_provider: bool = False
+    min_clusters: int = 0
+
+    def choose(self, signals: Signals) -> str:
+        """The tier for a call with ``signals``."""
+        if self.escalate_to and (
+            (self.min_chars and signals.message_chars >= self.min_chars)
+            or (self.on_provider and signals.provider_mentioned)
+            or (self.min_clusters and signals.clusters >= self.min_clusters)
+        ):
+            return self.escalate_to
+        return self.tier
+
+
+TIERS = {
+    "lite": ModelTier("lite", "gemini-2.5-flash-lite", input_usd_per_mtok=0.10, output_usd_per_mtok=0.40),
+    "standard": ModelTier("standard", "gemini-2.5-flash", input_usd_per_mtok=0.30, output_usd_per_mtok=2.50),
+}
+
+AGENTS = (
+    "symptom_mapper_agent", "bias_analyzer_agent", "analysis_agent", "advocacy_generator_agent",
+    "symptom_question_agent", "bias_question_agent", "llm_report_formatter_agent",
+)
+
+POLICIES = {
+    "fixed": {
+        "symptom_mapper_agent": Route("standard"),
+        "bias_analyzer_agent": Route("lite"),
+        "analysis_agent": Route("standard"),
+        "advocacy_generator_agent": Route("lite"),
+        "symptom_question_agent": Route("lite"),
+        "bias_question_agent": Route("lite"),
+        "llm_report_formatter_agent": Route("lite"),
+    },
+    "complexity": {
+        "symptom_mapper_agent": Route("lite", escalate_to="standard", min_chars=280, min_clusters=4),
+        "bias_analyzer_agent": Route("lite", escalate_to="standard", on_provider=True),
+        "analysis_agent": Route("lite", escalate_to="standard", min_chars=280, on_provider=True, min_clusters=4),
+        "advocacy_generator_agent": Route("lite", escalate_to="standard", min_clusters=4),
+        "symptom_question_agent": Route("lite", escalate_to="standard", min_clusters=4),
+        "bias_question_agent": Route("lite"),
+        "llm_report_formatter_agent": Route("lite"),
+    },
+    "economy": {agent: Route("lite") for agent in AGENTS},
+    "quality": {agent: Route("standard") for agent in AGENTS},
+}
+
+
+@dataclass
+class ModelRouter:
+    """
+    Picks the model of every agent call.
+
+    Parameters
+    ----------
+    policy : str
+        Name of the active policy.
+    tiers : Dict[str, ModelTier]
+        Available tiers by name.
+    routes : Dict[str, Route]
+        The policy's rule per agent. Agents without a rule keep their model.
+    """
+
+    policy: str
+    tiers: Dict[str, ModelTier] = field(default_factory=lambda: dict(TIERS))
+    routes: Dict[str, Route] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for agent, route in self.routes.items():
+            for tier in (route.tier, route.escalate_to):
+                if tier and tier not in self.tiers:
+                    raise ValueError(f"Policy {self.policy!r} routes {agent} to unknown tier {tier!r}.")
+        self._by_model = {tier.model: tier for tier in self.tiers.values()}
+
+    def default_model(self, agent_name: str) -> str:
+        """Model name an agent is built with (its default tier under the policy, else under ``fixed``)."""
+        route = self.routes.get(agent_name) or POLICIES["fixed"][agent_name]
+        return self.tiers[route.tier].model
+
+    def route(self, agent_name: str, signals: Signals) -> Optional[ModelTier]:
+        """The tier for one call of ``agent_name``, or None if the agent is not routed."""
+        route = self.routes.get(agent_name)
+        return self.tiers[route.choose(signals)] if route else None
+
+    def tier_of(self, model: str) -> Optional[ModelTier]:
+        """The tier serving ``model``, if any."""
+        return self._by_model.get(model)
+
+
+def load_router(policy: str = settings.routing_policy, config_path: str = settings.routing_config_path) -> ModelRouter:
+    """
+    Builds the router for ``policy`` from the built-in tiers and policies and
+    the optional JSON file ``config_path``.
+    """
+    tiers, policies = dict(TIERS), dict(POLICIES)
+    if config_path:
+        with open(config_path, encoding="utf-8") as handle:
+            config = json.load(handle)
+        for name, tier in config.get("tiers", {}).items():
+            tiers[name] = ModelTier(name=name, **tier)
+        for name, routes in config.get("policies", {}).items():
+            policies[name] = {agent: Route(**route) for agent, route in routes.items()}
+    if policy not in policies:
+        raise ValueError(f"Unknown routing policy {policy!r}; expected one of {tuple(policies)}.")
+    return ModelRouter(policy=policy, tiers=tiers, routes=policies[policy])
+
+
+router = load_router()
+
+
+def default_model(agent_name: str) -> str:
+    """Model name of ``agent_name`` under the active policy (shared by both entry points)."""
+    return router.default_model(agent_name)
+
+
+def tier_of(model: str) -> Optional[ModelTier]:
+    """The tier serving ``model`` under the active router, if any."""
+    return router.tier_of(model)
+
+
+def _content_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _cluster_count(symptom_analysis: Any) -> int:
+    if isinstance(symptom_analysis, str):
+        try:
+            symptom_analysis = json.loads(symptom_analysis)
+        except ValueError:
+            return 0
+    if not isinstance(symptom_analysis, dict):
+        return 0
+    mapping = symptom_analysis.get("symptomMapping", symptom_analysis)
+    return len(mapping) if isinstance(mapping, dict) else 0
+
+
+def signals_of(callback_context: CallbackContext) -> Signals:
+    """Complexity signals of the current turn: newest message and recorded clusters."""
+    message = _content_text(callback_context.user_content)
+    return Signals(
+        message_chars=len(message),
+        provider_mentioned=mentions_provider(message),
+        clusters=_cluster_count(callback_context.state.get("symptom_analysis")),
+    )
+
+
+def route_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """``before_model_callback`` that sets ``llm_request.model`` to the routed tier; never answers."""
+    agent = callback_context.agent_name
+    tier = router.route(agent, signals_of(callback_context))
+    if tier is None:
+        return None
+    if tier.name != router.routes[agent].tier:
+        metrics.increment(f"routing.escalations.{agent}")
+        logger.debug("Routing %s to %s (%s)", agent, tier.name, tier.model)
+    llm_request.model = tier.model
+    return None
+
+
+def record_call(model: str, seconds: float, usage: Optional[types.GenerateContentResponseUsageMetadata]) -> None:
+    """Adds one backend call on ``model`` to its tier's latency, token and cost counters."""
+    tier = router.tier_of(model)
+    if tier is None:
+        return
+    input_tokens = (usage.prompt_token_count or 0) if usage else 0
+    output_tokens = (usage.candidates_token_count or 0) if usage else 0
+    prefix = f"routing.{tier.name}"
+    metrics.increment(f"{prefix}.calls")
+    metrics.increment(f"{prefix}.latency_ms", round(seconds * 1000))
+    metrics.increment(f"{prefix}.input_tokens", input_tokens)
+    metrics.increment(f"{prefix}.output_tokens", output_tokens)
+    metrics.increment(f"{prefix}.cost_microusd", round(tier.cost_usd(input_tokens, output_tokens) * 1e6))
+
+
+def tier_summary() -> Dict[str, dict]:
+    """Per-tier ``calls``, ``mean_latency_ms``, tokens and ``cost_usd`` from the metrics."""
+    summary = {}
+    for name in router.tiers:
+        prefix = f"routing.{name}."
+        totals = {key[len(prefix):]: value for key, value in metrics.counters(prefix).items()}
+        if not totals.get("calls"):
+            continue
+        summary[name] = {
+            "calls": totals["calls"],
+            "mean_latency_ms": totals.get("latency_ms", 0) / totals["calls"],
+            "input_tokens": totals.get("input_tokens", 0),
+            "output_tokens": totals.get("output_tokens", 0),
+            "cost_usd": totals.get("cost_microusd", 0) / 1e6,
+        }
+    return summary
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Structured Outputs
+
+Typed schemas for the JSON each worker agent writes to its ``output_key``, a
+local repair parser for the usual model defects, and compact canonical
+serialization of the validated result.
+
+Every worker's final text is validated in the `LuciaModel` proxy
+(`main_agent.models`). A valid output reaches the agent as canonical compact
+JSON, so the next stage reads the same bytes no matter how the model
+formatted them. An invalid output is counted and re-requested, with the
+validation error, up to ``LUCIA_OUTPUT_RETRIES`` times.
+
+Repairs (no model call):
+    * Markdown code fences and surrounding prose.
+    * Trailing commas, typographic quotes, Python literals and single quotes.
+    * Missing top-level wrapper, e.g. a bare cluster mapping instead of
+        ``{"symptomMapping": {...}}`` or a bare list of questions.
+    * A single string where a list of strings is expected.
+
+Key Components:
+    * `SymptomAnalysis`, `BiasAnalysis`, `AdvocacyAnalysis`: Cumulative outputs.
+    * `SymptomDelta`, `BiasDelta`: Incremental-mode outputs.
+    * `FusedAnalysis`: Output of the fused analysis agent (both cumulative
+        outputs in one object, ``LUCIA_ANALYSIS_LAYOUT=fused``).
+    * `parse_output`: Repair + validate raw text against a schema.
+    * `canonical_json`: Compact, key-ordered serialization.
+"""
+import ast
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator, model_validator
+
+
+class OutputValidationError(ValueError):
+    """Raised when a model output cannot be repaired into its schema."""
+
+
+def _string_list(value: Any) -> Any:
+    if isinstance(value, str):
+        value = [value]
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if item is not None and str(item).strip()]
+    return value
+
+
+def _string_list_mapping(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(key): _string_list(items) for key, items in value.items()}
+    return value
+
+
+class _Output(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class SymptomAnalysis(_Output):
+    symptomMapping: Dict[str, List[str]]
+
+    @model_validator(mode="before")
+    @classmethod
+    def _wrap(cls, data: Any) -> Any:
+        # The prompt's own example omits the wrapper: {"pain_cluster": [...]}.
+        if (
+            isinstance(data, dict)
+            and "symptomMapping" not in data
+            and all(isinstance(items, (list, str)) for items in data.values())
+        ):
+            return {"symptomMapping": data}
+        return data
+
+    @field_validator("symptomMapping", mode="before")
+    @classmethod
+    def _clusters(cls, value: Any) -> Any:
+        return _string_list_mapping(value)
+
+
+class BiasEntry(_Output):
+    bias: str
+    reason: str = ""
+    implication: str = ""
+
+    @field_validator("reason", "implication", mode="before")
+    @classmethod
+    def _text(cls, value: Any) -> Any:
+        return "" if value is None else value
+
+
+class BiasAnalysis(_Output):
+    biasAwareness: List[BiasEntry]
+
+    @model_validator(mode="before")
+    @classmethod
+    def _wrap(cls, data: Any) -> Any:
+        return {"biasAwareness": data} if isinstance(data, list) else data
+
+
+class AdvocacyAnalysis(_Output):
+    structuredAdvocacy: List[str]
+
+    @model_validator(mode="before")
+    @classmethod
+    def _wrap(cls, data: Any) -> Any:
+        return {"structuredAdvocacy": data} if isinstance(data, list) else data
+
+    @field_validator("structuredAdvocacy", mode="before")
+    @classmethod
+    def _questions(cls, value: Any) -> Any:
+        return _string_list(value)
+
+
+class FusedAnalysis(_Output):
+    symptomMapping: Dict[str, List[str]]
+    biasAwareness: List[BiasEntry]
+
+    @field_validator("symptomMapping", mode="before")
+    @classmethod
+    def _clusters(cls, value: Any) -> Any:
+        return _string_list_mapping(value)
+
+    def split(self) -> Tuple[SymptomAnalysis, BiasAnalysis]:
+        """The symptom and bias outputs the two analysis workers would have written."""
+        return SymptomAnalysis(symptomMapping=self.symptomMapping), BiasAnalysis(biasAwareness=self.biasAwareness)
+
+
+class _Delta(_Output):
+    @model_validator(mode="before")
+    @classmethod
+    def _keys(cls, data: Any) -> Any:
+        # Both keys have defaults, so without this any object, e.g. a
+        # cumulative answer, would validate as an empty delta.
+        if not isinstance(data, dict) or not {"add", "remove"} & data.keys():
+            raise ValueError('a delta needs an "add" or "remove" key')
+        return data
+
+
+class SymptomDelta(_Delta):
+    add: Dict[str, List[str]] = {}
+    remove: Union[Dict[str, List[str]], List[str]] = {}
+
+    @field_validator("add", mode="before")
+    @classmethod
+    def _add(cls, value: Any) -> Any:
+        return _string_list_mapping(value or {})
+
+    @field_validator("remove", mode="before")
+    @classmethod
+    def _remove(cls, value: Any) -> Any:
+        return _string_list(value) if isinstance(value, (list, str)) else _string_list_mapping(value or {})
+
+
+class BiasDelta(_Delta):
+    add: List[BiasEntry] = []
+    remove: List[str] = []
+
+    @field_validator("remove", mode="before")
+    @classmethod
+    def _remove(cls, value: Any) -> Any:
+        return _string_list(value or [])
+
+
+_FENCE = re.compile(r"```[a-zA-Z]*")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PY_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+
+def _json_span(text: str) -> Optional[str]:
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    start = min(starts)
+    end = text.rfind("}" if text[start] == "{" else "]")
+    return text[start:end + 1] if end > start else None
+
+
+def repair_json(text: Any) -> Any:
+    """
+    Decodes model output that should be JSON, repairing common defects.
+
+    Raises
+    ------
+    OutputValidationError
+        If no JSON value can be recovered.
+    """
+    if isinstance(text, (dict, list)):
+        return text
+    if not isinstance(text, str):
+        raise OutputValidationError(f"Expected text, got {type(text).__name__}.")
+    span = _json_span(_FENCE.sub("", text))
+    if span is None:
+        raise OutputValidationError("No JSON object in output.")
+    try:
+        return json.loads(span)
+    except ValueError:
+        pass
+    candidate = _TRAILING_COMMA.sub(r"\1", span.translate(_SMART_QUOTES))
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    try:
+        # Single quotes / Python literals: parse as a Python literal.
+        python_source = re.sub(r"\b(true|false|null)\b", lambda m: _PY_LITERALS[m.group(1)], candidate)
+        return ast.literal_eval(python_source)
+    except (ValueError, SyntaxError) as exc:
+        raise OutputValidationError(f"Unrepairable JSON: {exc}") from exc
+
+
+def parse_output(raw: Any, schema: Type[BaseModel]) -> BaseModel:
+    """Repairs ``raw`` and validates it against ``schema``."""
+    try:
+        return schema.model_validate(repair_json(raw))
+    except ValidationError as exc:
+        errors = "; ".join(f"{'.'.join(map(str, e['loc'])) or 'output'}: {e['msg']}" for e in exc.errors()[:3])
+        raise OutputValidationError(f"Does not match {schema.__name__}: {errors}") from exc
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def canonical_json(output: BaseModel) -> str:
+    """Compact JSON of a validated output (field order fixed by the schema)."""
+    return compact_json(output.model_dump())
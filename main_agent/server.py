@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA HTTP Service
+
+A self-hostable ASGI service around `Runner`, so the pipeline can be driven
+and load-tested over HTTP outside Agent Engine.
+
+Endpoints:
+    * ``POST /sessions``: Creates a session. Body (all optional):
+        ``{"user_id", "session_id", "state"}``. 201 ``{"user_id", "session_id"}``.
+    * ``GET /sessions/{session_id}?user_id=``: The session state and event count.
+    * ``POST /sessions/{session_id}/messages``: Runs one turn. Body:
+        ``{"text", "user_id"}``. Returns ``{"report", "partial", "events"}``,
+        or, with ``Accept: text/event-stream`` (or ``?stream=1``), streams
+        every agent event as a server-sent event (``event: agent``, data: the
+        ADK event JSON; partial report chunks with ``LUCIA_STREAM_REPORT``),
+        followed by ``event: done`` (or ``event: error``).
+    * ``GET /healthz``: Load and process counters; 503 while draining.
+
+Serving:
+    * Turns run through `main_agent.coalescing.CoalescingRunner`, so a
+        retried message joins the turn already running.
+    * Backpressure: at most ``LUCIA_SERVER_CONCURRENCY`` turns run and
+        ``LUCIA_SERVER_QUEUE`` wait for a slot; further messages are shed
+        with 429 and a ``Retry-After`` estimated from recent turn times.
+    * Graceful shutdown: on SIGTERM (or Ctrl-C) the server keeps listening
+        while new messages get 503 and ``/healthz`` reports draining;
+        accepted turns (running and queued) finish, as does the background
+        work of turns cut short by ``LUCIA_TURN_BUDGET``, for at most
+        ``LUCIA_SERVER_DRAIN_S`` seconds. Then the server stops listening
+        and the session service is closed. The router drains its workers
+        the same way.
+    * Multi-process (``--workers N``): N worker processes on local ports
+        behind a router process that sends every request of a session to
+        the same worker (CRC32 of the session id), so in-memory sessions,
+        the hot-session cache and turn coalescing all stay per session.
+        SSE streams are proxied as they arrive.
+
+Key Components:
+    * `create_app`: The ASGI application of one worker.
+    * `DrainingServer`: uvicorn server that drains on the exit signal.
+    * `TurnAdmission`: Bounded concurrency + queue with load shedding and drain.
+    * `create_router_app`, `worker_for`: Sticky session routing to workers.
+    * `serve`: Runs one worker, or the router with N workers.
+
+Metrics (`main_agent.metrics`):
+    * ``server.turns``: Turns served.
+    * ``server.shed``: Messages rejected with 429.
+    * ``server.draining``: Messages rejected with 503 during shutdown.
+    * ``server.errors``: Turns that failed.
+
+Usage:
+    Run from the project root:
+    $ python -m main_agent.server --port 8080
+    $ LUCIA_MODEL_BACKEND=standin python -m main_agent.server --port 8080 --workers 4
+    $ curl -X POST localhost:8080/sessions -d '{"session_id": "s1"}'
+    $ curl -N -H 'Accept: text/event-stream' localhost:8080/sessions/s1/messages -d '{"text": "My joints ache."}'
+
+Dependencies:
+    * starlette, uvicorn, httpx (installed with google-adk)
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import time
+import uuid
+import zlib
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+import httpx
+import uvicorn
+from google.adk.agents import BaseAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.sessions import BaseSessionService
+from google.genai import types
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from . import metrics
+from .config import LuciaSettings, settings
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "agents"
+DEFAULT_USER = "user"
+
+SHUTDOWN_GRACE_S = 1  # for responses still being sent once drained
+
+
+class Shed(Exception):
+    """A message that was not admitted: ``status`` 429 (overloaded) or 503 (draining)."""
+
+    def __init__(self, status: int, retry_after: int):
+        super().__init__(status)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TurnAdmission:
+    """
+    Admission control for turns.
+
+    Parameters
+    ----------
+    concurrency : int
+        Turns running at the same time.
+    queue_size : int
+        Turns waiting for a slot; beyond that, messages are shed.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.running = self.waiting = 0
+        self.draining = False
+        self.turn_seconds = 1.0  # moving average, for Retry-After
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free."""
+        return max(1, math.ceil(self.turn_seconds * (self.waiting / self.concurrency + 1)))
+
+    async def enter(self) -> "_Slot":
+        """
+        Waits for a slot.
+
+        Raises
+        ------
+        Shed
+            429 when every slot and queue place is taken, 503 while draining.
+        """
+        if self.draining:
+            metrics.increment("server.draining")
+            raise Shed(503, self.retry_after())
+        if self.running + self.waiting >= self.concurrency + self.queue_size:
+            metrics.increment("server.shed")
+            raise Shed(429, self.retry_after())
+        self.waiting += 1
+        self._idle.clear()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self.waiting -= 1
+            self._check_idle()
+            raise
+        self.waiting -= 1
+        self.running += 1
+        return _Slot(self)
+
+    def _leave(self, seconds: float) -> None:
+        self.running -= 1
+        self.turn_seconds = 0.8 * self.turn_seconds + 0.2 * seconds
+        self._slots.release()
+        self._check_idle()
+
+    def _check_idle(self) -> None:
+        if not self.running and not self.waiting:
+            self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stops admitting messages and waits for the admitted ones; False on timeout."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class _Slot:
+    """One admitted turn; `release` is idempotent."""
+
+    def __init__(self, admission: TurnAdmission):
+        self._admission = admission
+        self._started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._admission._leave(time.perf_counter() - self._started)
+
+
+def _shed_response(shed: Shed) -> JSONResponse:
+    message = "draining" if shed.status == 503 else "overloaded"
+    return JSONResponse({"error": message}, status_code=shed.status, headers={"Retry-After": str(shed.retry_after)})
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _wants_stream(request: Request) -> bool:
+    return (request.query_params.get("stream", "").lower() in {"1", "true", "yes"}
+            or "text/event-stream" in request.headers.get("accept", ""))
+
+
+async def _json_body(request: Request) -> dict:
+    body = await request.body()
+    if not body:
+        return {}
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    return data
+
+
+def create_app(
+    config: LuciaSettings = settings,
+    agent: Optional[BaseAgent] = None,
+    session_service: Optional[BaseSessionService] = None,
+) -> Starlette:
+    """
+    Builds the ASGI application of one worker.
+
+    Parameters
+    ----------
+    config : LuciaSettings
+        Graph switches (see `main_agent.agent.build_root_agent`) and the
+        ``server_*`` limits; ``warmup`` runs `warm_up_async` at start-up.
+    agent : Optional[BaseAgent]
+        Root agent; built from ``config`` by default.
+    session_service : Optional[BaseSessionService]
+        Built by `session_service_from_settings` by default.
+    """
+    from .budget import wait_for_background
+    from .coalescing import CoalescingRunner
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        from .agent import build_root_agent
+        from .sessions import session_service_from_settings
+
+        root = agent or build_root_agent(config)
+        service = session_service or session_service_from_settings()
+        if config.warmup:
+            from .warmup import warm_up_async
+            await warm_up_async(root)
+        app.state.session_service = service
+        app.state.runner = CoalescingRunner(agent=root, app_name=APP_NAME, session_service=service)
+        app.state.admission = TurnAdmission(config.server_concurrency, config.server_queue)
+        drain_task = None
+
+        def start_drain() -> asyncio.Task:
+            nonlocal drain_task
+            if drain_task is None:
+                drain_task = asyncio.ensure_future(_drain(app))
+            return drain_task
+
+        app.state.start_drain = start_drain
+        yield
+        await start_drain()  # already done if `DrainingServer` started it
+        if hasattr(service, "close"):
+            await service.close()
+
+    async def _drain(app: Starlette) -> bool:
+        deadline = time.monotonic() + config.server_drain_seconds
+        drained = await app.state.admission.drain(config.server_drain_seconds)
+        # Turns whose callers went away, then work left by turn budgets.
+        drained = await app.state.runner.wait_idle(max(0.0, deadline - time.monotonic())) and drained
+        drained = await wait_for_background(max(0.0, deadline - time.monotonic())) and drained
+        if not drained:
+            logger.warning("Shutdown: turns still running after %.0fs", config.server_drain_seconds)
+        return drained
+
+    async def create_session(request: Request) -> Response:
+        try:
+            body = await _json_body(request)
+        except ValueError as exc:
+            return JSONResponse({"error": f"invalid JSON body: {exc}"}, status_code=400)
+        user_id = body.get("user_id") or DEFAULT_USER
+        try:
+            session = await request.app.state.session_service.create_session(
+                app_name=APP_NAME, user_id=user_id, session_id=body.get("session_id") or None, state=body.get("state"))
+        except AlreadyExistsError:
+            return JSONResponse({"error": "session exists"}, status_code=409)
+        return JSONResponse({"user_id": user_id, "session_id": session.id}, status_code=201)
+
+    async def get_session(request: Request) -> Response:
+        user_id = request.query_params.get("user_id") or DEFAULT_USER
+        session = await request.app.state.session_service.get_session(
+            app_name=APP_NAME, user_id=user_id, session_id=request.path_params["session_id"])
+        if session is None:
+            return JSONResponse({"error": "session not found"}, status_code=404)
+        return JSONResponse({"user_id": user_id, "session_id": session.id,
+                             "state": session.state, "events": len(session.events)})
+
+    async def post_message(request: Request) -> Response:
+        try:
+            body = await _json_body(request)
+        except ValueError as exc:
+            return JSONResponse({"error": f"invalid JSON body: {exc}"}, status_code=400)
+        if not isinstance(body.get("text"), str) or not body["text"].strip():
+            return JSONResponse({"error": '"text" is required'}, status_code=400)
+        session_id = request.path_params["session_id"]
+        user_id = body.get("user_id") or DEFAULT_USER
+        service = request.app.state.session_service
+        if await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id) is None:
+            return JSONResponse({"error": "session not found"}, status_code=404)
+        stream = _wants_stream(request)
+        try:
+            slot = await request.app.state.admission.enter()
+        except Shed as shed:
+            return _shed_response(shed)
+
+        events = request.app.state.runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=types.Content(role="user", parts=[types.Part.from_text(text=body["text"])]),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE),
+        )
+        metrics.increment("server.turns")
+        if stream:
+            return StreamingResponse(_stream(events, slot), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache"}, background=BackgroundTask(slot.release))
+        try:
+            report, partial, count = None, False, 0
+            async for event in events:
+                count += 1
+                if not event.partial and event.content and event.content.parts and event.content.parts[0].text:
+                    report = event.content.parts[0].text
+                    partial = bool((event.custom_metadata or {}).get("partial_report"))
+        except Exception as exc:
+            metrics.increment("server.errors")
+            logger.exception("Session %s: turn failed", session_id)
+            return JSONResponse({"error": str(exc)}, status_code=500)
+        finally:
+            slot.release()
+        return JSONResponse({"session_id": session_id, "report": report, "partial": partial, "events": count})
+
+    async def _stream(events, slot: _Slot):
+        try:
+            async for event in events:
+                yield _sse("agent", event.model_dump_json(exclude_none=True, by_alias=True))
+            yield _sse("done", "{}")
+        except Exception as exc:
+            metrics.increment("server.errors")
+            logger.exception("Turn failed while streaming")
+            yield _sse("error", json.dumps({"error": str(exc)}))
+        finally:
+            slot.release()
+
+    async def healthz(request: Request) -> Response:
+        admission = request.app.state.admission
+        return JSONResponse({
+            "status": "draining" if admission.draining else "ok",
+            "running": admission.running,
+            "queued": admission.waiting,
+            "coalescing_in_flight": request.app.state.runner.in_flight,
+            "counters": metrics.counters(),
+        }, status_code=503 if admission.draining else 200)
+
+    return Starlette(
+        routes=[
+            Route("/sessions", create_session, methods=["POST"]),
+            Route("/sessions/{session_id}", get_session, methods=["GET"]),
+            Route("/sessions/{session_id}/messages", post_message, methods=["POST"]),
+            Route("/healthz", healthz, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def worker_for(session_id: str, workers: int) -> int:
+    """Index of the worker that owns ``session_id`` (stable across processes)."""
+    return zlib.crc32(session_id.encode("utf-8")) % workers
+
+
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "host"}
+
+
+def create_router_app(
+    worker_urls: Sequence[str],
+    transports: Optional[Sequence[httpx.AsyncBaseTransport]] = None,
+) -> Starlette:
+    """
+    Builds the router of the multi-process mode: every request of a session
+    is forwarded to the worker `worker_for` picks; responses (SSE included)
+    are streamed back as they arrive. ``transports`` replace the network
+    (tests). Once ``app.state.draining`` is set, a worker that has already
+    drained and exited is reported as draining (503) rather than
+    unavailable.
+    """
+    clients: List[httpx.AsyncClient] = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        for index, url in enumerate(worker_urls):
+            transport = transports[index] if transports else None
+            clients.append(httpx.AsyncClient(base_url=url, transport=transport, timeout=httpx.Timeout(None)))
+        app.state.draining = False
+        yield
+        for client in clients:
+            await client.aclose()
+
+    async def _forward(request: Request, session_id: str, body: bytes) -> Response:
+        client = clients[worker_for(session_id, len(clients))]
+        headers = {key: value for key, value in request.headers.items() if key.lower() not in _HOP_HEADERS}
+        try:
+            upstream = await client.send(
+                client.build_request(request.method, request.url.path, params=list(request.query_params.multi_items()),
+                                     headers=headers, content=body),
+                stream=True,
+            )
+        except httpx.HTTPError as exc:
+            if request.app.state.draining:
+                return _shed_response(Shed(503, 1))
+            logger.warning("Worker %s unreachable: %s", client.base_url, exc)
+            return JSONResponse({"error": "worker unavailable"}, status_code=502)
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={key: value for key, value in upstream.headers.items() if key.lower() not in _HOP_HEADERS},
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    async def create_session(request: Request) -> Response:
+        try:
+            body = await _json_body(request)
+        except ValueError as exc:
+            return JSONResponse({"error": f"invalid JSON body: {exc}"}, status_code=400)
+        # The router picks the id, so it knows the owning worker.
+        body["session_id"] = body.get("session_id") or str(uuid.uuid4())
+        return await _forward(request, body["session_id"], json.dumps(body).encode("utf-8"))
+
+    async def session_request(request: Request) -> Response:
+        return await _forward(request, request.path_params["session_id"], await request.body())
+
+    async def healthz(request: Request) -> Response:
+        async def _health(client: httpx.AsyncClient):
+            try:
+                response = await client.get("/healthz")
+                return response.json()
+            except httpx.HTTPError as exc:
+                return {"status": "unreachable", "error": str(exc)}
+
+        workers = await asyncio.gather(*(_health(client) for client in clients))
+        healthy = all(worker.get("status") == "ok" for worker in workers)
+        status = "draining" if request.app.state.draining else "ok" if healthy else "degraded"
+        return JSONResponse({"status": status, "workers": workers}, status_code=200 if status == "ok" else 503)
+
+    return Starlette(
+        routes=[
+            Route("/sessions", create_session, methods=["POST"]),
+            Route("/sessions/{session_id}", session_request, methods=["GET"]),
+            Route("/sessions/{session_id}/messages", session_request, methods=["POST"]),
+            Route("/healthz", healthz, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that drains on the first SIGTERM or SIGINT.
+
+    Plain uvicorn closes its sockets first and runs the lifespan shutdown
+    last, so no client would ever see the service draining. Here the first
+    signal runs ``drain`` while the server keeps listening; the server then
+    shuts down, giving the remaining responses `SHUTDOWN_GRACE_S` seconds.
+    A second signal shuts down at once.
+
+    Parameters
+    ----------
+    config : uvicorn.Config
+        The server configuration.
+    drain : Optional[Callable[[], Awaitable]]
+        Run on the first signal; by default the drain of the `create_app`
+        application being served.
+    """
+
+    def __init__(self, config: uvicorn.Config, drain: Optional[Callable[[], Awaitable]] = None):
+        super().__init__(config)
+        self.drain = drain or (lambda: config.app.state.start_drain())
+        self.drain_requested = False
+        self._drain_task: Optional[asyncio.Task] = None
+
+    def handle_exit(self, sig: int, frame) -> None:
+        if self.drain_requested:
+            super().handle_exit(sig, frame)
+            return
+        self.drain_requested = True
+        self._captured_signals.append(sig)  # re-raised after shutdown, as uvicorn does
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_requested and self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain_and_exit())
+        return await super().on_tick(counter)
+
+    async def _drain_and_exit(self) -> None:
+        try:
+            await self.drain()
+        except Exception:
+            logger.exception("Shutdown: drain failed")
+        self.config.timeout_graceful_shutdown = SHUTDOWN_GRACE_S
+        self.should_exit = True
+
+
+def _run_worker(host: str, port: int) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    config = uvicorn.Config(create_app(), host=host, port=port, log_level="warning",
+                            timeout_graceful_shutdown=int(settings.server_drain_seconds))
+    DrainingServer(config).run()
+
+
+def _join(processes: Sequence, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+
+
+def _wait_ready(urls: Sequence[str], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if httpx.get(f"{url}/healthz", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"worker {url} did not start within {timeout:.0f}s")
+            time.sleep(0.1)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = 1, worker_base_port: int = 0) -> None:
+    """
+    Serves on ``host:port``: in this process for one worker; otherwise as
+    the router of ``workers`` processes listening on ``127.0.0.1`` ports
+    from ``worker_base_port`` (default: ``port + 1``).
+    """
+    import multiprocessing
+    import signal
+    import sys
+
+    if workers <= 1:
+        _run_worker(host, port)
+        return
+
+    base = worker_base_port or port + 1
+    urls = [f"http://127.0.0.1:{base + index}" for index in range(workers)]
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_run_worker, args=("127.0.0.1", base + index), daemon=False)
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    router = create_router_app(urls)
+
+    async def drain_workers() -> None:
+        # The router keeps forwarding while every worker drains its turns.
+        router.state.draining = True
+        for process in processes:
+            process.terminate()
+        await asyncio.get_running_loop().run_in_executor(None, _join, processes, settings.server_drain_seconds + 10)
+
+    # uvicorn re-raises the SIGTERM it drained on; exit through `finally`
+    # so the workers are stopped too.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        _wait_ready(urls, timeout=120)
+        logger.info("Routing sessions to %d workers: %s", workers, ", ".join(urls))
+        config = uvicorn.Config(router, host=host, port=port, log_level="warning",
+                                timeout_graceful_shutdown=int(settings.server_drain_seconds))
+        DrainingServer(config, drain=drain_workers).run()
+    finally:
+        for process in processes:
+            process.terminate()
+        _join(processes, settings.server_drain_seconds + 10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (sessions are routed sticky)")
+    parser.add_argument("--worker-base-port", type=int, default=0, help="first worker port (default: port + 1)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(args.host, args.port, args.workers, args.worker_base_port)
+
+
+if __name__ == "__main__":
+    main()
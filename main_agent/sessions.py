@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Persistent Session Service
+
+`InMemorySessionService` keeps the full event history of every session in
+process memory for the lifetime of the process and loses it on restart. This
+module provides a durable ADK session service whose memory use is bounded by
+the number of *active* sessions, not by the number of sessions ever seen.
+
+Design:
+    * Storage sits behind the small `SessionStore` interface, so other
+        backends (e.g. a managed SQL database) can be plugged in.
+        `SQLiteSessionStore` is the local implementation; it serves its
+        blocking calls from a pool of connections (WAL mode) on worker
+        threads, so the event loop never waits on disk.
+    * Hot sessions: the most recently used sessions are kept in an LRU of
+        ``hot_sessions`` entries; everything else is loaded on demand.
+    * Write-behind: appended events are applied in memory immediately and
+        written to the store in batches, when ``batch_size`` events are
+        pending or ``flush_interval`` seconds after the first pending event,
+        whichever comes first. Events of the last interval can be lost if the
+        process dies; `flush` and `close` write them out explicitly.
+    * Retention and compaction: sessions idle for longer than
+        ``retention_seconds`` are deleted, and only the newest ``max_events``
+        events of a session are kept (session state is stored separately and
+        is unaffected). Both run at most every ``maintenance_interval``
+        seconds during flushes, or on demand through `compact`. ``0`` disables
+        either limit.
+
+History digests written by `main_agent.compaction` delete the events they
+cover, in memory and in storage.
+
+Scoped state (``app:``/``user:`` keys) is stored with the session it was
+written in; LUCIA does not use scoped state.
+
+Key Components:
+    * `SessionStore`: Pluggable storage interface.
+    * `SQLiteSessionStore`: SQLite implementation with a connection pool.
+    * `PersistentSessionService`: ADK ``BaseSessionService`` with the hot-session
+        LRU, write-behind batching and retention.
+    * `session_service_from_settings`: Service selected by ``LUCIA_SESSION_DB``
+        (in-memory when unset).
+
+Usage:
+    >>> service = PersistentSessionService(SQLiteSessionStore("sessions.db"))
+    >>> runner = Runner(agent=root_agent, app_name="agents", session_service=service)
+    ...
+    >>> await service.close()
+
+Dependencies:
+    * sqlite3 (standard library)
+    * google.adk.sessions
+"""
+import abc
+import asyncio
+import contextlib
+import copy
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from . import metrics
+from .compaction import digest_of, prune_compacted
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+class SessionStore(abc.ABC):
+    """
+    Durable storage behind `PersistentSessionService`.
+
+    Methods are synchronous and may block; the service calls them from worker
+    threads.
+    """
+
+    @abc.abstractmethod
+    def create(self, session: Session) -> bool:
+        """Stores a new, empty session; False if the id is already taken."""
+
+    @abc.abstractmethod
+    def load(self, key: SessionKey, max_events: int = 0) -> Optional[Session]:
+        """The session with its newest ``max_events`` events (all if 0), or None."""
+
+    @abc.abstractmethod
+    def write(self, events: List[Tuple[SessionKey, Event]]) -> int:
+        """
+        Appends events and applies their state deltas in one batch; returns the number written.
+
+        A history digest (`main_agent.compaction`) also deletes the events it covers.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: SessionKey) -> None:
+        """Removes a session and its events."""
+
+    @abc.abstractmethod
+    def list(self, app_name: str, user_id: Optional[str] = None) -> List[Session]:
+        """Sessions without events, oldest update first."""
+
+    @abc.abstractmethod
+    def compact(self, expire_before: float = 0.0, max_events: int = 0) -> dict:
+        """Deletes sessions last updated before ``expire_before`` and events beyond the newest ``max_events``."""
+
+    def close(self) -> None:
+        pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared by worker threads.
+
+    Parameters
+    ----------
+    path : str
+        Database file; ``":memory:"`` gives one shared in-memory database.
+    size : int
+        Maximum number of open connections (1 for ``":memory:"``).
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = 1 if path == ":memory:" else max(1, size)
+        self._idle = queue.LifoQueue()
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a connection, opening one while the pool is below ``size``."""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.size
+                self._open += can_open
+            connection = self._connect() if can_open else self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+                self._open -= 1
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    `SessionStore` in a SQLite file.
+
+    Parameters
+    ----------
+    path : str
+        Database file (created if missing).
+    pool_size : int
+        Maximum number of pooled connections.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self._pool = ConnectionPool(path, pool_size)
+        with self._pool.connection() as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " app_name TEXT, user_id TEXT, id TEXT, state TEXT, last_update_time REAL,"
+                " PRIMARY KEY (app_name, user_id, id))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " seq INTEGER PRIMARY KEY, app_name TEXT, user_id TEXT, session_id TEXT, timestamp REAL,"
+                " payload TEXT)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_by_time ON sessions (last_update_time)")
+
+    def create(self, session: Session) -> bool:
+        with self._pool.connection() as connection, connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                (session.app_name, session.user_id, session.id, json.dumps(session.state), session.last_update_time),
+            )
+            return cursor.rowcount == 1
+
+    def load(self, key: SessionKey, max_events: int = 0) -> Optional[Session]:
+        with self._pool.connection() as connection:
+            row = connection.execute(
+                "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            payloads = connection.execute(
+                "SELECT payload FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (*key, max_events or -1),
+            ).fetchall()
+        return Session(
+            app_name=key[0], user_id=key[1], id=key[2],
+            state=json.loads(row[0]),
+            events=[Event.model_validate_json(payload) for (payload,) in reversed(payloads)],
+            last_update_time=row[1],
+        )
+
+    def write(self, events: List[Tuple[SessionKey, Event]]) -> int:
+        written = 0
+        with self._pool.connection() as connection, connection:
+            sessions = {}
+            for key, event in events:
+                if key not in sessions:
+                    row = connection.execute(
+                        "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+                    ).fetchone()
+                    sessions[key] = None if row is None else [json.loads(row[0]), 0.0]
+                if sessions[key] is None:
+                    continue  # deleted while the event was pending
+                connection.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, timestamp, payload) VALUES (?, ?, ?, ?, ?)",
+                    (*key, event.timestamp, event.model_dump_json(exclude_none=True)),
+                )
+                digest = digest_of(event)
+                if digest:
+                    connection.execute(
+                        "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp <= ?",
+                        (*key, digest["compacted_until"]),
+                    )
+                if event.actions and event.actions.state_delta:
+                    sessions[key][0].update(event.actions.state_delta)
+                sessions[key][1] = max(sessions[key][1], event.timestamp)
+                written += 1
+            connection.executemany(
+                "UPDATE sessions SET state = ?, last_update_time = MAX(last_update_time, ?)"
+                " WHERE app_name = ? AND user_id = ? AND id = ?",
+                [(json.dumps(entry[0]), entry[1], *key) for key, entry in sessions.items() if entry is not None],
+            )
+        return written
+
+    def delete(self, key: SessionKey) -> None:
+        with self._pool.connection() as connection, connection:
+            connection.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            connection.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+
+    def list(self, app_name: str, user_id: Optional[str] = None) -> List[Session]:
+        query = "SELECT user_id, id, state, last_update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        with self._pool.connection() as connection:
+            rows = connection.execute(query + " ORDER BY last_update_time, user_id, id", params).fetchall()
+        return [
+            Session(app_name=app_name, user_id=row[0], id=row[1], state=json.loads(row[2]), last_update_time=row[3])
+            for row in rows
+        ]
+
+    def compact(self, expire_before: float = 0.0, max_events: int = 0) -> dict:
+        removed = {"sessions": 0, "events": 0}
+        with self._pool.connection() as connection, connection:
+            if expire_before:
+                removed["events"] += connection.execute(
+                    "DELETE FROM events WHERE (app_name, user_id, session_id) IN"
+                    " (SELECT app_name, user_id, id FROM sessions WHERE last_update_time < ?)",
+                    (expire_before,),
+                ).rowcount
+                removed["sessions"] = connection.execute(
+                    "DELETE FROM sessions WHERE last_update_time < ?", (expire_before,)
+                ).rowcount
+            if max_events:
+                removed["events"] += connection.execute(
+                    "DELETE FROM events WHERE seq IN (SELECT seq FROM ("
+                    " SELECT seq, ROW_NUMBER() OVER ("
+                    "  PARTITION BY app_name, user_id, session_id ORDER BY seq DESC) AS newer"
+                    " FROM events) WHERE newer > ?)",
+                    (max_events,),
+                ).rowcount
+        return removed
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def _copy_session(session: Session, config: Optional[GetSessionConfig] = None) -> Session:
+    """Copy with its own events list and state dict (events themselves are shared, as in ADK)."""
+    events = session.events
+    if config is not None:
+        if config.num_recent_events is not None:
+            events = events[-config.num_recent_events:] if config.num_recent_events else []
+        if config.after_timestamp is not None:
+            events = [event for event in events if event.timestamp >= config.after_timestamp]
+    copied = session.model_copy(deep=False)
+    copied.events = list(events)
+    copied.state = copy.copy(session.state)
+    return copied
+
+
+class PersistentSessionService(BaseSessionService):
+    """
+    ADK session service over a `SessionStore` with a hot-session LRU and
+    write-behind event batching.
+
+    Parameters
+    ----------
+    store : SessionStore
+        Durable storage.
+    hot_sessions : int
+        Sessions kept in memory (least recently used are evicted).
+    batch_size : int
+        Pending events that trigger an immediate flush.
+    flush_interval : float
+        Seconds after the first pending event at which it is flushed.
+    retention_seconds : float
+        Idle time after which a session is deleted (0 = keep forever).
+    max_events : int
+        Events kept per session, newest first (0 = all).
+    maintenance_interval : float
+        Minimum seconds between automatic retention/compaction runs.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        hot_sessions: int = 256,
+        batch_size: int = 64,
+        flush_interval: float = 0.25,
+        retention_seconds: float = 0.0,
+        max_events: int = 0,
+        maintenance_interval: float = 600.0,
+    ):
+        self.store = store
+        self.hot_sessions = max(1, hot_sessions)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.maintenance_interval = maintenance_interval
+        self._hot = OrderedDict()
+        self._pending = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._last_maintenance = time.time()
+
+    def _remember(self, key: SessionKey, session: Session) -> None:
+        self._hot[key] = session
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_sessions:
+            self._hot.popitem(last=False)
+            metrics.increment("sessions.evictions")
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        session = Session(
+            app_name=app_name, user_id=user_id, id=session_id, state=dict(state or {}), last_update_time=time.time()
+        )
+        if not await asyncio.to_thread(self.store.create, session):
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+        self._remember((app_name, user_id, session_id), session)
+        return _copy_session(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id.strip())
+        session = self._hot.get(key)
+        if session is None:
+            # Pending (or in-flight) events of an evicted session must reach the store first.
+            await self.flush()
+            session = await asyncio.to_thread(self.store.load, key, self.max_events)
+            if session is None:
+                return None
+            metrics.increment("sessions.loads")
+            self._remember(key, session)
+        else:
+            self._hot.move_to_end(key)
+            metrics.increment("sessions.hot_hits")
+        return _copy_session(session, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        return ListSessionsResponse(sessions=await asyncio.to_thread(self.store.list, app_name, user_id))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id.strip())
+        self._hot.pop(key, None)
+        self._pending = [(pending_key, event) for pending_key, event in self._pending if pending_key != key]
+        await asyncio.to_thread(self.store.delete, key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        stored = self._hot.get(key)
+        if stored is not None and stored is not session:
+            stored.events.append(event)
+            if event.actions and event.actions.state_delta:
+                stored.state.update(event.actions.state_delta)
+            stored.last_update_time = event.timestamp
+        if stored is not None and digest_of(event):
+            prune_compacted(stored.events)
+        if stored is not None and self.max_events and len(stored.events) > self.max_events:
+            del stored.events[:-self.max_events]
+
+        self._pending.append((key, event))
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        return event
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes all pending events to the store (and runs due maintenance)."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                written = await asyncio.to_thread(self.store.write, batch)
+                metrics.increment("sessions.flushes")
+                metrics.increment("sessions.events_written", written)
+            if (self.retention_seconds or self.max_events) and \
+                    time.time() - self._last_maintenance >= self.maintenance_interval:
+                await self._compact()
+
+    async def compact(self) -> dict:
+        """Applies retention and the per-session event limit now."""
+        await self.flush()
+        async with self._flush_lock:
+            return await self._compact()
+
+    async def _compact(self) -> dict:
+        self._last_maintenance = time.time()
+        expire_before = time.time() - self.retention_seconds if self.retention_seconds else 0.0
+        removed = await asyncio.to_thread(self.store.compact, expire_before, self.max_events)
+        if expire_before:
+            for key in [key for key, session in self._hot.items() if session.last_update_time < expire_before]:
+                del self._hot[key]
+        metrics.increment("sessions.expired", removed["sessions"])
+        metrics.increment("sessions.compacted_events", removed["events"])
+        if removed["sessions"] or removed["events"]:
+            logger.info("Session maintenance removed %d sessions, %d events", removed["sessions"], removed["events"])
+        return removed
+
+    async def close(self) -> None:
+        """Flushes pending events and closes the store."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        self.store.close()
+
+    def stats(self) -> dict:
+        return {"hot_sessions": len(self._hot), "pending_events": len(self._pending)}
+
+
+def session_service_from_settings() -> BaseSessionService:
+    """`PersistentSessionService` on ``LUCIA_SESSION_DB`` if set, else `InMemorySessionService`."""
+    if not settings.session_db:
+        return InMemorySessionService()
+    return PersistentSessionService(
+        SQLiteSessionStore(settings.session_db),
+        hot_sessions=settings.session_hot,
+        retention_seconds=settings.session_retention_days * 86400,
+        max_events=settings.session_max_events,
+    )
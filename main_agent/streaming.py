@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Streaming Report
+
+Without streaming the client sees nothing until the whole workflow has
+finished, so perceived latency is the sum of every stage. `ReportStreamingAgent`
+wraps the workflow and turns its progress into partial report events as soon
+as each section is ready:
+
+    * the report header and symptom summary when `symptom_mapper_agent` finishes,
+    * the bias insights when `bias_analyzer_agent` finishes,
+    * the suggested questions token by token while `advocacy_generator_agent`
+        is still generating (requires ``RunConfig(streaming_mode=StreamingMode.SSE)``;
+        otherwise they arrive in one chunk when the stage finishes; with
+        advocacy fan-out they arrive in one chunk from the merge step).
+
+Partial events carry the new report text and ``custom_metadata={"section": ...}``.
+The workflow's own partial events (raw JSON tokens) are dropped; all final
+events are passed through unchanged, so the turn still ends with the
+complete report.
+
+Usage:
+    >>> from google.adk.agents.run_config import RunConfig, StreamingMode
+    >>> from main_agent.agent import streaming_root_agent
+    >>> runner = Runner(agent=streaming_root_agent, ...)
+    >>> async for event in runner.run_async(..., run_config=RunConfig(streaming_mode=StreamingMode.SSE)):
+    ...     if event.partial:
+    ...         print(event.content.parts[0].text, end="")
+"""
+import json
+import re
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types
+
+from .report import (
+    QUESTIONS_HEADING,
+    REPORT_PREAMBLE,
+    ReportInputError,
+    extract_bias_awareness,
+    extract_structured_advocacy,
+    extract_symptom_mapping,
+    render_bias_section,
+    render_question_section,
+    render_symptom_section,
+)
+
+_QUESTIONS_START = re.compile(r'"structuredAdvocacy"\s*:\s*\[')
+_UNICODE_ESCAPE_LENGTH = 6  # \uXXXX
+
+
+class QuestionStreamer:
+    """
+    Incrementally renders ``structuredAdvocacy`` questions from JSON fragments.
+
+    `feed` accepts the model's text chunks and returns the report text that
+    became available (the section heading, then ``* question`` lines
+    character by character). The concatenation of everything returned equals
+    the start of `render_question_section` for the final questions.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._phase = "seek"
+        self._questions = 0
+        self.emitted = ""
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        out = []
+        if self._phase == "seek":
+            match = _QUESTIONS_START.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+            self._phase = "array"
+
+        while self._pos < len(self._buffer) and self._phase != "done":
+            char = self._buffer[self._pos]
+            if self._phase == "array":
+                if char == '"':
+                    out.append(f"{QUESTIONS_HEADING}\n* " if self._questions == 0 else "\n* ")
+                    self._questions += 1
+                    self._phase = "string"
+                elif char == "]":
+                    self._phase = "done"
+                self._pos += 1
+            elif char == '"':
+                self._phase = "array"
+                self._pos += 1
+            elif char == "\\":
+                escape = self._read_escape()
+                if escape is None:
+                    break  # wait for the rest of the escape sequence
+                out.append(escape)
+            else:
+                out.append(char)
+                self._pos += 1
+
+        text = "".join(out)
+        self.emitted += text
+        return text
+
+    def _read_escape(self) -> Optional[str]:
+        length = _UNICODE_ESCAPE_LENGTH if self._buffer[self._pos + 1:self._pos + 2] == "u" else 2
+        sequence = self._buffer[self._pos:self._pos + length]
+        if len(sequence) < length:
+            return None
+        self._pos += length
+        try:
+            return json.loads(f'"{sequence}"')
+        except ValueError:
+            return sequence
+
+    def finish(self, questions: list) -> str:
+        """Returns whatever of the final question section has not been emitted yet."""
+        target = render_question_section(questions)
+        rest = target[len(self.emitted):] if target.startswith(self.emitted) else ""
+        self.emitted = target
+        return rest
+
+
+class ReportStreamingAgent(BaseAgent):
+    """
+    Runs ``workflow`` and streams the report section by section.
+
+    ``workflow`` is held as a field rather than a sub-agent so that the same
+    workflow instance can also be used directly as a root agent.
+    """
+
+    workflow: BaseAgent
+    advocacy_agent_name: str = "advocacy_generator_agent"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        emitted_sections = []
+        questions = QuestionStreamer()
+
+        def _partial(section: str, text: str) -> Event:
+            if not emitted_sections:
+                text = f"{REPORT_PREAMBLE}\n\n{text}"
+            elif section not in emitted_sections:
+                text = f"\n\n{text}"
+            if section not in emitted_sections:
+                emitted_sections.append(section)
+            return Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                partial=True,
+                content=types.Content(role="model", parts=[types.Part.from_text(text=text)]),
+                custom_metadata={"section": section},
+            )
+
+        async for event in self.workflow.run_async(ctx):
+            if event.partial:
+                if event.author == self.advocacy_agent_name and event.content and event.content.parts:
+                    chunk = questions.feed("".join(part.text or "" for part in event.content.parts))
+                    if chunk:
+                        yield _partial("questions", chunk)
+                continue
+
+            yield event
+            delta = event.actions.state_delta if event.actions else {}
+            try:
+                if "symptom_analysis" in delta:
+                    yield _partial("symptoms", render_symptom_section(extract_symptom_mapping(delta["symptom_analysis"])))
+                if "bias_analysis" in delta:
+                    yield _partial("biases", render_bias_section(extract_bias_awareness(delta["bias_analysis"])))
+                if "advocacy_analysis" in delta:
+                    rest = questions.finish(extract_structured_advocacy(delta["advocacy_analysis"]))
+                    if rest:
+                        yield _partial("questions", rest)
+            except ReportInputError:
+                # Malformed sections are left to the report formatter.
+                continue
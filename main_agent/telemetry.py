@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Tracing (OpenTelemetry)
+
+ADK already opens an OpenTelemetry span for every agent run
+(``invoke_agent <agent>``, e.g. ``invoke_agent parallel_analysis_step``),
+every model call (``call_llm`` / ``generate_content <model>``, with
+``gen_ai.usage.input_tokens`` and ``gen_ai.usage.output_tokens``) and every
+tool call (``execute_tool get_bias_implications_batch``). Nothing records them
+until a tracer provider with an exporter is installed. This module installs
+one and adds LUCIA's own attributes to those spans:
+
+    * ``lucia.agent``, ``lucia.cache`` (``hit``/``miss``/``off``),
+        ``lucia.schema.retries`` and ``lucia.schema.valid`` on model calls
+        (`main_agent.models`);
+    * ``lucia.bias_preclassifier.short_circuit`` when the bias stage is
+        answered locally (`main_agent.preclassifier`);
+    * ``lucia.axiom.bias_type`` and ``lucia.axiom.matched`` on
+        `get_bias_implications` calls, ``lucia.axiom.batch_size`` and
+        ``lucia.axiom.unmatched`` on `get_bias_implications_batch` calls.
+
+Exporters (``LUCIA_TRACE``):
+    * ``console``: Every span is printed to stdout as it ends.
+    * ``json``: One JSON object per span, appended to ``LUCIA_TRACE_PATH``
+        (default ``lucia_traces.jsonl``). ``python -m benchmarks.trace_summary``
+        turns the file into a per-stage latency table.
+
+If the process already has an SDK tracer provider (e.g. a deployment that
+exports to Cloud Trace), the exporter is added to it instead of replacing it.
+The OpenTelemetry SDK is only imported when an exporter is configured, so
+processes without local export do not pay for it at startup.
+
+Key Components:
+    * `configure_tracing`: Installs the exporter selected by the settings.
+    * `JsonLinesSpanExporter`: Offline span exporter to a JSONL file.
+    * `annotate`: Adds attributes to the current span, if it is recording.
+"""
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+from opentelemetry import trace
+
+from .config import settings
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+    from opentelemetry.sdk.trace.export import SpanExportResult
+
+
+def span_record(span: "ReadableSpan") -> Dict[str, Any]:
+    """Flat, JSON-serializable view of a finished span."""
+    context = span.get_span_context()
+    return {
+        "name": span.name,
+        "trace_id": format(context.trace_id, "032x"),
+        "span_id": format(context.span_id, "016x"),
+        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "start": span.start_time / 1e9,
+        "duration_ms": (span.end_time - span.start_time) / 1e6,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+    }
+
+
+class JsonLinesSpanExporter:
+    """
+    Appends every finished span to ``path`` as one JSON line.
+
+    Implements the SDK ``SpanExporter`` interface (``export``,
+    ``force_flush``, ``shutdown``) without importing the SDK at module load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence["ReadableSpan"]) -> "SpanExportResult":
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        lines = "".join(json.dumps(span_record(span), default=str) + "\n" for span in spans)
+        with self._lock:
+            if self._file.closed:
+                return SpanExportResult.FAILURE
+            self._file.write(lines)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def configure_tracing(exporter: str = settings.trace_exporter, path: str = settings.trace_path) -> Optional["SpanProcessor"]:
+    """
+    Routes the pipeline's spans to a local exporter.
+
+    Parameters
+    ----------
+    exporter : str
+        ``console``, ``json`` or empty (tracing left as configured).
+    path : str
+        Output file of the ``json`` exporter.
+
+    Returns
+    -------
+    Optional[SpanProcessor]
+        The processor that was added (call ``force_flush``/``shutdown`` on it
+        before exiting), or None if no exporter was requested.
+    """
+    if not exporter:
+        return None
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+
+    if exporter == "console":
+        processor = SimpleSpanProcessor(ConsoleSpanExporter())
+    elif exporter == "json":
+        processor = BatchSpanProcessor(JsonLinesSpanExporter(path))
+    else:
+        raise ValueError(f"Unknown trace exporter {exporter!r}; expected 'console' or 'json'.")
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": "lucia"}))
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(processor)
+    return processor
+
+
+def annotate(attributes: Dict[str, Any]) -> None:
+    """Sets ``attributes`` (None values skipped) on the current span when it is recording."""
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes({key: value for key, value in attributes.items() if value is not None})
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LUCIA Cold-Start Warm-Up
+
+A fresh process pays for much more than its imports on the first request:
+ADK imports its workflow, auth and tool modules lazily on the first
+invocation (about half a second), the AXIOM index is loaded on the first
+AXIOM lookup, instruction templates and tool declarations
+are rendered for the first time, and the model client resolves credentials
+and opens its connection. With scale-to-zero (``min_instances: 0``) all of
+this lands on the first patient after an idle period.
+
+The warm-up runs one synthetic turn through the prebuilt agent graph with
+the offline stand-in model (`main_agent.models`), so every code path of a
+real turn is loaded before the first request arrives:
+
+    * the message mentions a clinician, so the bias analyzer calls the
+        AXIOM lookup tool and the AXIOM index is built;
+    * a throwaway session and a throwaway response cache are used, and the
+        process counters (`main_agent.metrics`) are restored afterwards, so
+        nothing of the synthetic turn is visible to real sessions.
+
+The stand-in backend is installed process-wide while the turn runs, so the
+warm-up must finish before the process serves requests.
+
+Model clients are cached per event loop by ADK, so connections can only be
+opened on the loop that serves requests: `warm_up_async` (for servers that
+own their loop, e.g. in an ASGI lifespan hook) also opens one connection
+per routed model tier; `warm_up` (for import time) runs ``setup`` callables
+such as Vertex AI initialization in a background thread while the synthetic
+turn runs. The ADK CLI (``adk run``, ``adk web``, ``adk api_server``)
+imports agent modules from inside its running event loop; there `warm_up`
+runs the turn on a loop of its own in a separate thread.
+
+Key Components:
+    * `warm_up`: Synchronous warm-up for module import time.
+    * `warm_up_async`: Warm-up on a running event loop, including the model
+        connections.
+    * `open_model_connections`: Opens the client of every routed model tier.
+    * `last_warmup`: Timings of the most recent warm-up (milliseconds).
+
+Usage:
+    >>> from main_agent.agent import root_agent
+    >>> from main_agent.warmup import warm_up
+    >>> warm_up(root_agent)
+    {'turn_ms': 512.3, 'setup_ms': 0.0, 'total_ms': 512.9}
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+from google.adk.agents import BaseAgent
+from google.genai import types
+
+from . import metrics
+from .cache import ResponseCache, use_response_cache
+from .models import _registry_backend, resolve_backend, stand_in_backend, use_model_backend
+from .routing import router
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MESSAGE = "My joints ache every morning and my doctor said it's just stress."
+
+last_warmup: Dict[str, float] = {}
+
+
+async def warm_turn(agent: BaseAgent, message: str = WARMUP_MESSAGE) -> None:
+    """Runs one synthetic turn of ``agent`` on the stand-in model, without side effects."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    counters = metrics.counters()
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name="lucia_warmup", user_id="warmup")
+    runner = Runner(agent=agent, app_name="lucia_warmup", session_service=session_service)
+    try:
+        with use_model_backend(stand_in_backend()), use_response_cache(ResponseCache(max_entries=16)):
+            async for _ in runner.run_async(
+                user_id="warmup",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part.from_text(text=message)]),
+            ):
+                pass
+    finally:
+        metrics.restore(counters)
+
+
+async def open_model_connections(models: Optional[Sequence[str]] = None) -> int:
+    """
+    Opens the client connection of each model (default: every routed tier).
+
+    Only applies to the Gemini backend; each client is the one later calls
+    on this event loop reuse. Failures are logged, never raised.
+
+    Returns
+    -------
+    int
+        Number of connections opened.
+    """
+    if resolve_backend() is not _registry_backend:
+        return 0
+    return await _open_connections(models)
+
+
+async def _open_connections(models: Optional[Sequence[str]]) -> int:
+    opened = 0
+    for model in models or [tier.model for tier in router.tiers.values()]:
+        try:
+            await _registry_backend(model, "").api_client.aio.models.get(model=model)
+            opened += 1
+        except Exception as exc:  # noqa: BLE001 - warm-up must never fail startup
+            logger.warning("Warm-up could not open a connection for %s: %s", model, exc)
+    return opened
+
+
+def _run_setup(setup: Sequence[Callable[[], object]], timings: dict) -> None:
+    started = time.perf_counter()
+    for step in setup:
+        try:
+            step()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Warm-up step %s failed: %s", getattr(step, "__name__", step), exc)
+    timings["setup_ms"] = (time.perf_counter() - started) * 1000
+
+
+def _run_turn(agent: BaseAgent) -> None:
+    """Runs `warm_turn` to completion, on a thread of its own if a loop is running here."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(warm_turn(agent))
+        return
+    errors = []
+
+    def _target():
+        try:
+            asyncio.run(warm_turn(agent))
+        except BaseException as exc:  # re-raised in the calling thread
+            errors.append(exc)
+
+    turn = threading.Thread(target=_target, name="lucia-warmup-turn", daemon=True)
+    turn.start()
+    turn.join()
+    if errors:
+        raise errors[0]
+
+
+def warm_up(agent: BaseAgent, setup: Sequence[Callable[[], object]] = ()) -> Dict[str, float]:
+    """
+    Warms ``agent`` up at import time.
+
+    Blocks until the turn has run, also when called from a running event
+    loop (the turn then runs on its own loop in a separate thread).
+
+    Parameters
+    ----------
+    agent : BaseAgent
+        The prebuilt root agent that will serve requests.
+    setup : Sequence[Callable]
+        Blocking deployment setup (e.g. Vertex AI initialization), run in a
+        background thread while the synthetic turn runs.
+
+    Returns
+    -------
+    Dict[str, float]
+        ``turn_ms``, ``setup_ms`` and ``total_ms``.
+    """
+    started = time.perf_counter()
+    timings = {"setup_ms": 0.0}
+    worker = threading.Thread(target=_run_setup, args=(setup, timings), name="lucia-warmup", daemon=True)
+    if setup:
+        worker.start()
+    _run_turn(agent)
+    timings["turn_ms"] = (time.perf_counter() - started) * 1000
+    if setup:
+        worker.join()
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    return _finish(timings)
+
+
+async def warm_up_async(agent: BaseAgent, connect: bool = True) -> Dict[str, float]:
+    """
+    Warms ``agent`` up on the serving event loop, before requests are accepted.
+
+    With ``connect`` the model connections are opened concurrently with the
+    synthetic turn. Returns ``turn_ms``, ``connect_ms``, ``connections`` and
+    ``total_ms``.
+    """
+    started = time.perf_counter()
+    timings = {}
+    # Decided before the synthetic turn installs the stand-in backend.
+    connect = connect and resolve_backend() is _registry_backend
+
+    async def _turn():
+        await warm_turn(agent)
+        timings["turn_ms"] = (time.perf_counter() - started) * 1000
+
+    async def _connect():
+        timings["connections"] = await _open_connections(None) if connect else 0
+        timings["connect_ms"] = (time.perf_counter() - started) * 1000
+
+    await asyncio.gather(_turn(), _connect())
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    return _finish(timings)
+
+
+def _finish(timings: Dict[str, float]) -> Dict[str, float]:
+    last_warmup.clear()
+    last_warmup.update(timings)
+    logger.info("Warm-up finished: %s", ", ".join(f"{key}={value:.0f}" for key, value in timings.items()))
+    return dict(timings)
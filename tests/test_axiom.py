@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the AXIOM knowledge index (`main_agent.axiom`) and the
+`get_bias_implications` tool built on it.
+
+Usage:
+    $ python -m pytest tests/test_axiom.py
+"""
+import json
+
+import pytest
+
+from main_agent.agent import NO_AXIOM_INFORMATION, get_bias_implications
+from main_agent.axiom import AxiomEntry, AxiomIndex, default_index, normalize_bias_name
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("ageism_bias", "ageism_bias"),
+    ("ageism", "ageism_bias"),
+    ("Age-Bias", "ageism_bias"),
+    ("age bias", "ageism_bias"),
+    ("sexist_bias", "gender_bias"),
+    ("ethnic_stereotyping", "racial_or_ethnic_bias"),
+    ("obesity_bias", "weight_bias"),
+    ("confirmation_biases", "confirmation_bias"),
+])
+def test_search_resolves_invented_names(name, expected):
+    assert default_index().search(name).entry.id == expected
+
+
+def test_search_rejects_unrelated_names():
+    assert default_index().search("cardiology") is None
+    assert get_bias_implications("foo_bias") == NO_AXIOM_INFORMATION
+
+
+def test_tool_returns_corpus_implication():
+    assert get_bias_implications("age_bias").startswith("Dismissing a patient's medical concerns")
+
+
+def test_normalize_bias_name():
+    assert normalize_bias_name("  Racial or Ethnic BIAS ") == "racial_or_ethnic"
+    assert normalize_bias_name("bias") == "bias"
+
+
+def test_index_loads_json_corpus(tmp_path):
+    corpus = tmp_path / "corpus.json"
+    corpus.write_text(json.dumps([
+        {"id": "class_bias", "aliases": ["socioeconomic_bias"], "implication": "Class implication."},
+    ]))
+    index = AxiomIndex.from_file(str(corpus))
+    assert len(index) == 1
+    assert index.search("socio_economic_bias").entry.implication == "Class implication."
+
+
+def test_first_entry_wins_alias_collisions(caplog):
+    index = AxiomIndex([
+        AxiomEntry(id="a_bias", implication="first", aliases=("shared_name",)),
+        AxiomEntry(id="b_bias", implication="second", aliases=("shared_name",)),
+    ])
+    assert index.search("shared_name").entry.id == "a_bias"
+    assert index.search("shared_nme").entry.id == "a_bias"  # fuzzy keys agree
+    assert "already used by a_bias" in caplog.text
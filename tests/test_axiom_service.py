@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the batched AXIOM lookups (`main_agent.axiom_service`) and the
+`get_bias_implications_batch` tool.
+
+Usage:
+    $ python -m pytest tests/test_axiom_service.py
+"""
+import asyncio
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import NO_AXIOM_INFORMATION, get_bias_implications, get_bias_implications_batch, root_agent
+from main_agent.axiom_service import BiasImplicationService, LocalAxiomStore, use_implication_service
+from main_agent.models import function_call_content, stand_in_backend, use_model_backend
+
+
+class CountingStore(LocalAxiomStore):
+    def __init__(self, latency: float = 0.0, error: Exception = None):
+        super().__init__(latency=latency)
+        self.queries = []
+        self.error = error
+
+    async def search_many(self, bias_types):
+        self.queries.append(list(bias_types))
+        if self.error is not None:
+            await asyncio.sleep(self.latency)
+            raise self.error
+        return await super().search_many(bias_types)
+
+
+@pytest.mark.asyncio
+async def test_batch_tool_matches_single_lookups():
+    with use_implication_service(BiasImplicationService(CountingStore())) as service:
+        result = await get_bias_implications_batch(["ageism", "Age-Bias", "sexist_bias", "foo_bias"])
+
+    assert result == {name: get_bias_implications(name) for name in ["ageism", "Age-Bias", "sexist_bias", "foo_bias"]}
+    assert result["foo_bias"] == NO_AXIOM_INFORMATION
+    # One store round trip for the whole batch.
+    assert len(service.store.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced_then_cached():
+    metrics.reset()
+    service = BiasImplicationService(CountingStore(latency=0.05))
+
+    results = await asyncio.gather(*(service.lookup(["gender_bias", "age_bias"]) for _ in range(10)))
+    await service.lookup(["Gender Bias"])
+
+    assert len({json.dumps(result, sort_keys=True) for result in results}) == 1
+    assert service.store.queries == [["gender", "age"]]
+    assert metrics.counters("axiom.") == {
+        "axiom.lookups": 21,
+        "axiom.coalesced": 18,
+        "axiom.cache_hits": 1,
+        "axiom.store_queries": 1,
+        "axiom.store_names": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_without_ttl_every_lookup_reaches_the_store():
+    service = BiasImplicationService(CountingStore(), ttl_seconds=0)
+    await service.lookup(["gender_bias"])
+    await service.lookup(["gender_bias"])
+    assert len(service.store.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_store_errors_reach_coalesced_callers_and_are_not_cached():
+    store = CountingStore(latency=0.02, error=ConnectionError("vector db down"))
+    service = BiasImplicationService(store)
+
+    results = await asyncio.gather(*(service.lookup(["gender_bias"]) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert len(store.queries) == 1
+
+    store.error = None
+    assert (await service.lookup(["gender_bias"]))["gender_bias"] != NO_AXIOM_INFORMATION
+    assert len(store.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_short_store_answers_fail_every_caller_instead_of_hanging():
+    class ShortStore(CountingStore):
+        async def search_many(self, bias_types):
+            return (await super().search_many(bias_types))[:-1]
+
+    service = BiasImplicationService(ShortStore(latency=0.02))
+    results = await asyncio.wait_for(asyncio.gather(
+        *(service.lookup(["gender_bias", "age_bias"]) for _ in range(3)), return_exceptions=True), timeout=2)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not service._inflight
+
+
+@pytest.mark.asyncio
+async def test_waiters_query_again_when_the_owner_is_cancelled():
+    service = BiasImplicationService(CountingStore(latency=0.05))
+    owner = asyncio.create_task(service.lookup(["gender_bias"]))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(service.lookup(["gender_bias"]))
+    await asyncio.sleep(0.01)
+    owner.cancel()
+
+    assert (await waiter)["gender_bias"] != NO_AXIOM_INFORMATION
+    assert len(service.store.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_several_biases_take_one_tool_round_trip():
+    biases = ["gender_bias", "ageism_bias", "weight_bias"]
+    final = {"biasAwareness": [{"bias": bias, "reason": "Dismissed.", "implication": "..."} for bias in biases]}
+    backend = stand_in_backend()
+    backend("gemini-2.5-flash-lite", "bias_analyzer_agent").responses = [
+        function_call_content("get_bias_implications_batch", bias_types=biases), final,
+    ]
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+
+    events = []
+    with use_model_backend(backend), use_implication_service(BiasImplicationService(CountingStore())) as service:
+        async for event in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(
+                text="My doctor said I'm just old, overweight and anxious."
+            )]),
+        ):
+            events.append(event)
+
+    responses = [response for event in events for response in event.get_function_responses()]
+    assert len(responses) == 1 and set(responses[0].response) == set(biases)
+    assert backend("gemini-2.5-flash-lite", "bias_analyzer_agent").calls == 2
+    assert len(service.store.queries) == 1
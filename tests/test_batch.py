@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the batch entry point (`main_agent.batch`), driven by the offline
+stand-in model.
+
+Usage:
+    $ python -m pytest tests/test_batch.py
+"""
+import json
+import time
+
+import pytest
+
+from main_agent.batch import Checkpoint, RateLimiter, run_batch
+from main_agent.models import stand_in_backend, use_model_backend
+
+NARRATIVES = [
+    {"id": "p-0", "text": "My joints are stiff and swollen every morning."},
+    {"id": "p-1", "messages": ["I'm exhausted all the time.", "My doctor said it's just stress."]},
+    {"text": "I get hot flashes and night sweats."},
+    {"id": "p-3", "messages": []},
+    {"id": "p-4", "text": "My GP told me my knee pain is just my weight."},
+]
+
+
+def _write_input(path, records, garbage_line=True):
+    lines = [json.dumps(record) for record in records]
+    if garbage_line:
+        lines.append("{not json")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def _read_output(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_one_result_per_record(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(source, NARRATIVES)
+
+    with use_model_backend(stand_in_backend()):
+        stats = await run_batch(str(source), str(output), concurrency=3)
+
+    results = {result["id"]: result for result in _read_output(output)}
+    assert stats == {"processed": 6, "errors": 2, "skipped": 0}
+    assert set(results) == {"p-0", "p-1", "line-2", "p-3", "p-4", "line-5"}
+    assert results["p-1"]["status"] == "ok" and results["p-1"]["turns"] == 2
+    assert results["p-1"]["report"].startswith("**Patient Advocacy & Consultation Aid**")
+    assert json.loads(results["p-4"]["bias_analysis"])["biasAwareness"]
+    assert results["p-3"]["status"] == "error" and results["line-5"]["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_interrupted_batch_resumes_without_repeating_records(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    records = [{"id": f"p-{i}", "text": f"My joints hurt, day {i}."} for i in range(12)]
+    _write_input(source, records, garbage_line=False)
+
+    with use_model_backend(stand_in_backend()):
+        first = await run_batch(str(source), str(output), concurrency=4, limit=5)
+        second = await run_batch(str(source), str(output), concurrency=4)
+
+    ids = [result["id"] for result in _read_output(output)]
+    assert first["processed"] == 5 and second == {"processed": 7, "errors": 0, "skipped": 5}
+    assert sorted(ids) == sorted(record["id"] for record in records)
+    assert Checkpoint(f"{output}.checkpoint").next_line == 12
+
+
+@pytest.mark.asyncio
+async def test_blank_lines_do_not_hold_the_checkpoint_back(tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    lines = [json.dumps({"id": f"p-{i}", "text": f"My joints hurt, day {i}."}) for i in range(30)]
+    lines[2:2] = ["", "   "]
+    source.write_text("\n".join(lines) + "\n\n")
+
+    with use_model_backend(stand_in_backend()):
+        stats = await run_batch(str(source), str(output), concurrency=4)
+        again = await run_batch(str(source), str(output), concurrency=4)
+
+    checkpoint = Checkpoint(f"{output}.checkpoint")
+    assert stats == {"processed": 30, "errors": 0, "skipped": 0}
+    assert again == {"processed": 0, "errors": 0, "skipped": 30}
+    assert checkpoint.next_line == 33 and checkpoint.done == set()
+
+
+def test_checkpoint_keeps_only_the_unfinished_window(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "ckpt"))
+    for line in (0, 2, 3, 1, 5):
+        checkpoint.mark_done(line)
+    assert checkpoint.next_line == 4 and checkpoint.done == {5}
+    checkpoint.save()
+    restored = Checkpoint(str(tmp_path / "ckpt"))
+    assert restored.is_done(3) and restored.is_done(5) and not restored.is_done(4)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_acquisitions():
+    limiter = RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        await limiter.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
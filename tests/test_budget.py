@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the per-turn time budget (`main_agent.budget`,
+``LUCIA_TURN_BUDGET``).
+
+Usage:
+    $ python -m pytest tests/test_budget.py
+"""
+import json
+import time
+from dataclasses import replace
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import build_root_agent
+from main_agent.budget import parse_budget_split, wait_for_background
+from main_agent.change_detection import FINGERPRINT_KEY
+from main_agent.config import LuciaSettings, settings
+from main_agent.models import _is_delta_request, _user_texts, default_script, stand_in_backend, use_model_backend
+from main_agent.report import BIASES_PENDING, QUESTIONS_PENDING, SYMPTOMS_PENDING, render_report
+
+SYMPTOMS = "I've been waking up with stiff, swollen joints in my hands and feet for three months."
+PROVIDER = "I saw a new doctor today. He told me that at 48, this is just classic perimenopause."
+
+AGEISM = {"bias": "ageism_bias", "reason": "Symptoms put down to perimenopause.", "implication": ""}
+
+
+def _analyst(agent_name, llm_request):
+    """Analyzes the patient messages in the request; deltas cover only those messages."""
+    text = " ".join(_user_texts(llm_request)).lower()
+    if agent_name == "symptom_mapper_agent":
+        clusters = {"musculoskeletal_cluster": ["swollen joints"]} if "swollen joints" in text else {}
+        return {"add": clusters, "remove": {}} if _is_delta_request(llm_request) else {"symptomMapping": clusters}
+    if agent_name == "bias_analyzer_agent":
+        biases = [AGEISM] if "perimenopause" in text else []
+        return {"add": biases, "remove": []} if _is_delta_request(llm_request) else {"biasAwareness": biases}
+    return default_script(agent_name, llm_request)
+
+
+def _budget(seconds):
+    return replace(settings, turn_budget=seconds)
+
+
+async def _session_service():
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session_service
+
+
+async def _turn(agent, session_service, query):
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    started = time.perf_counter()
+    events = [event async for event in runner.run_async(
+        user_id="test_user",
+        session_id="s1",
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+    )]
+    return events, time.perf_counter() - started
+
+
+async def _state(session_service):
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session.state
+
+
+def test_budget_split_is_normalized_and_validated():
+    assert parse_budget_split("analysis=3,advocacy=1") == {"analysis": 0.75, "advocacy": 0.25}
+    with pytest.raises(ValueError):
+        parse_budget_split("report=1")
+    with pytest.raises(ValueError):
+        parse_budget_split("analysis=0")
+    with pytest.raises(ValueError):
+        LuciaSettings(turn_budget=-1)
+
+
+@pytest.mark.asyncio
+async def test_turn_within_budget_matches_the_plain_workflow():
+    metrics.reset()
+    session_service = await _session_service()
+    with use_model_backend(stand_in_backend()):
+        await _turn(build_root_agent(), session_service, PROVIDER)
+    expected = await _state(session_service)
+
+    session_service = await _session_service()
+    with use_model_backend(stand_in_backend()):
+        await _turn(build_root_agent(_budget(5.0)), session_service, PROVIDER)
+
+    assert (await _state(session_service))["report"] == expected["report"]
+    assert metrics.counters("turn_budget.") == {"turn_budget.turns": 1}
+
+
+@pytest.mark.asyncio
+async def test_slow_advocacy_sends_a_partial_report_and_finishes_in_background():
+    metrics.reset()
+    backend = stand_in_backend()
+    advocacy = backend("gemini-2.5-flash-lite", "advocacy_generator_agent")
+    advocacy.latency = 0.6
+    agent = build_root_agent(_budget(0.3))
+    session_service = await _session_service()
+    with use_model_backend(backend):
+        events, elapsed = await _turn(agent, session_service, PROVIDER)
+
+        assert elapsed < 0.5
+        final = events[-1]
+        assert final.custom_metadata == {"partial_report": True, "overrun_stage": "advocacy"}
+        report = final.content.parts[0].text
+        assert SYMPTOMS_PENDING not in report and BIASES_PENDING not in report
+        assert "Observation:" in report and report.endswith(QUESTIONS_PENDING)
+        assert metrics.counters("turn_budget.degraded") == {"turn_budget.degraded.advocacy": 1}
+
+        assert await wait_for_background(timeout=5)
+        state = await _state(session_service)
+        assert state["report"] == render_report(
+            state["symptom_analysis"], state["bias_analysis"], state["advocacy_analysis"])
+        assert state[FINGERPRINT_KEY]
+        assert metrics.counters("turn_budget.background") == {"turn_budget.background_completed": 1}
+
+        # The next turn uses the questions finished in the background.
+        events, elapsed = await _turn(agent, session_service, "Thanks.")
+    assert advocacy.calls == 1
+    assert not events[-1].custom_metadata and events[-1].content.parts[0].text == state["report"]
+
+
+@pytest.mark.asyncio
+async def test_slow_analysis_is_completed_before_the_next_turn():
+    metrics.reset()
+    backend = stand_in_backend()
+    symptoms = backend("gemini-2.5-flash", "symptom_mapper_agent")
+    symptoms.latency = 0.4
+    session_service = await _session_service()
+    with use_model_backend(backend):
+        events, elapsed = await _turn(build_root_agent(_budget(0.3)), session_service, SYMPTOMS)
+        assert elapsed < 0.4
+        report = events[-1].content.parts[0].text
+        assert SYMPTOMS_PENDING in report and report.endswith(QUESTIONS_PENDING)
+
+        # The next turn waits for the background work instead of racing it.
+        symptoms.latency = 0.0
+        await _turn(build_root_agent(_budget(5.0)), session_service, PROVIDER)
+
+    state = await _state(session_service)
+    assert symptoms.calls == 2
+    assert state["report"] == render_report(
+        state["symptom_analysis"], state["bias_analysis"], state["advocacy_analysis"])
+    assert metrics.counters("turn_budget.") == {
+        "turn_budget.turns": 2,
+        "turn_budget.degraded.analysis": 1,
+        "turn_budget.background_waits": 1,
+        "turn_budget.background_completed": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_next_turn_overrunning_while_waiting_follows_in_background():
+    metrics.reset()
+    backend = stand_in_backend()
+    symptoms = backend("gemini-2.5-flash", "symptom_mapper_agent")
+    symptoms.latency = 0.5
+    agent = build_root_agent(_budget(0.2))
+    session_service = await _session_service()
+    with use_model_backend(backend):
+        await _turn(agent, session_service, SYMPTOMS)
+        symptoms.latency = 0.0
+        events, elapsed = await _turn(agent, session_service, PROVIDER)
+        assert elapsed < 0.3
+        assert events[-1].custom_metadata == {"partial_report": True, "overrun_stage": "analysis"}
+
+        assert await wait_for_background(timeout=5)
+    state = await _state(session_service)
+    # Both turns ran in order to completion; nothing was cancelled.
+    assert symptoms.calls == 2
+    assert [event.author for event in (await session_service.get_session(
+        app_name="agents", user_id="test_user", session_id="s1")).events].count("user") == 2
+    assert state["report"] == render_report(
+        state["symptom_analysis"], state["bias_analysis"], state["advocacy_analysis"])
+    assert "Observation:" in state["report"]
+    assert metrics.counters("turn_budget.background") == {
+        "turn_budget.background_waits": 1, "turn_budget.background_completed": 2}
+
+
+@pytest.mark.asyncio
+async def test_background_analysis_keeps_incremental_state():
+    incremental = replace(settings, analysis_mode="incremental")
+    session_service = await _session_service()
+    with use_model_backend(stand_in_backend(script=_analyst)):
+        for query in (SYMPTOMS, PROVIDER):
+            await _turn(build_root_agent(incremental), session_service, query)
+    expected = await _state(session_service)
+
+    backend = stand_in_backend(script=_analyst)
+    symptoms = backend("gemini-2.5-flash", "symptom_mapper_agent")
+    symptoms.latency = 0.5
+    agent = build_root_agent(replace(incremental, turn_budget=0.2))
+    session_service = await _session_service()
+    with use_model_backend(backend):
+        events, _ = await _turn(agent, session_service, SYMPTOMS)
+        assert events[-1].custom_metadata == {"partial_report": True, "overrun_stage": "analysis"}
+        symptoms.latency = 0.0
+        await _turn(agent, session_service, PROVIDER)
+        assert await wait_for_background(timeout=5)
+
+    # Each turn's delta was taken from its own message and merged into the
+    # state left by the previous turn's background work.
+    state = await _state(session_service)
+    assert json.loads(state["symptom_analysis"]) == {"symptomMapping": {"musculoskeletal_cluster": ["swollen joints"]}}
+    assert json.loads(state["bias_analysis"]) == {"biasAwareness": [AGEISM]}
+    for key in ("symptom_analysis", "bias_analysis", "report"):
+        assert state[key] == expected[key]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the worker response cache (`main_agent.cache`).
+
+Usage:
+    $ python -m pytest tests/test_cache.py
+"""
+import json
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.agent import make_symptom_mapper_agent, root_agent
+from main_agent.cache import ResponseCache, cache_key, instruction_version, use_response_cache
+from main_agent.models import model_for, stand_in_backend, use_model_backend
+
+QUERY = "I've been waking up with stiff, swollen joints in my hands and feet for three months."
+# The bias analyzer is answered by the provider pre-classifier for QUERY.
+CACHED_WORKERS = ("symptom_mapper_agent", "advocacy_generator_agent")
+
+
+def _request(text: str, system: str = "Map the symptoms.") -> LlmRequest:
+    return LlmRequest(
+        contents=[genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=text)])],
+        config=genai_types.GenerateContentConfig(system_instruction=system),
+    )
+
+
+def _response(text: str) -> LlmResponse:
+    return LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part.from_text(text=text)]))
+
+
+async def _run_session(agent, session_id: str, query: str = QUERY) -> dict:
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id=session_id)
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    async for _ in runner.run_async(
+        user_id="test_user",
+        session_id=session_id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+    ):
+        pass
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id=session_id)
+    return session.state
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_workers_and_writes_same_output_keys():
+    backend = stand_in_backend()
+    with use_model_backend(backend), use_response_cache(ResponseCache()) as cache:
+        first = await _run_session(root_agent, "s1")
+        calls_after_first = {agent: llm.calls for (_, agent), llm in backend.instances.items()}
+        second = await _run_session(root_agent, "s2", query="  i've been waking up with STIFF, swollen joints in my hands and feet for three months. ")
+
+    calls_after_second = {agent: llm.calls for (_, agent), llm in backend.instances.items()}
+    assert calls_after_second == calls_after_first
+    for key in ("symptom_analysis", "bias_analysis", "advocacy_analysis", "report"):
+        assert second[key] == first[key]
+    stats = cache.stats()
+    assert stats["hits"] == len(CACHED_WORKERS) and stats["misses"] == len(CACHED_WORKERS)
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_still_runs_incremental_merge():
+    agent = make_symptom_mapper_agent("incremental")
+    with use_model_backend(stand_in_backend()), use_response_cache(ResponseCache()) as cache:
+        first = await _run_session(agent, "s1")
+        second = await _run_session(agent, "s2")
+
+    assert cache.stats()["hits"] == 1
+    assert "symptomMapping" in json.loads(second["symptom_analysis"])
+    assert second["symptom_analysis"] == first["symptom_analysis"]
+
+
+@pytest.mark.asyncio
+async def test_uncached_agents_bypass_the_cache():
+    model = model_for("llm_report_formatter_agent", "gemini-2.5-flash-lite")
+    with use_model_backend(stand_in_backend()), use_response_cache(ResponseCache()) as cache:
+        [r async for r in model.generate_content_async(_request("hi"))]
+        [r async for r in model.generate_content_async(_request("hi"))]
+    assert cache.stats()["stores"] == 0
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl_seconds=10)
+    clock = [1000.0]
+    monkeypatch.setattr("main_agent.cache.time.time", lambda: clock[0])
+    for key in ("a", "b"):
+        cache.put(key, "symptom_mapper_agent", "v1", _response(key))
+    assert cache.get("a") is not None          # "a" is now most recently used
+    cache.put("c", "symptom_mapper_agent", "v1", _response("c"))
+    assert cache.get("b") is None and cache.stats()["evictions"] == 1
+
+    clock[0] += 11
+    assert cache.get("a") is None
+
+
+def test_instruction_change_invalidates_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old, new = instruction_version("Map the symptoms."), instruction_version("Map the symptoms, v2.")
+    cache = ResponseCache(sqlite_path=path)
+    cache.check_version("symptom_mapper_agent", old)
+    key = cache_key("symptom_mapper_agent", old, _request(QUERY))
+    cache.put(key, "symptom_mapper_agent", old, _response("{}"))
+
+    assert key != cache_key("symptom_mapper_agent", new, _request(QUERY))
+    cache.check_version("symptom_mapper_agent", new)
+    assert cache.get(key) is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_key_depends_on_the_routed_model():
+    lite, flash = _request(QUERY), _request(QUERY)
+    lite.model, flash.model = "gemini-2.5-flash-lite", "gemini-2.5-flash"
+    assert cache_key("symptom_mapper_agent", "v1", lite) != cache_key("symptom_mapper_agent", "v1", flash)
+    assert cache_key("symptom_mapper_agent", "v1", lite) == cache_key(
+        "symptom_mapper_agent", "v1", _request(QUERY), "gemini-2.5-flash-lite")
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    key = cache_key("bias_analyzer_agent", "v1", _request(QUERY))
+    writer = ResponseCache(sqlite_path=path)
+    writer.put(key, "bias_analyzer_agent", "v1", _response('{"biasAwareness": []}'))
+    writer.close()
+
+    reader = ResponseCache(sqlite_path=path)
+    hit = reader.get(key)
+    assert hit.content.parts[0].text == '{"biasAwareness": []}'
+    assert reader.stats()["disk_hits"] == 1
+    assert reader.get(key) is not None and reader.stats()["memory_hits"] == 1
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for skipping the downstream steps on unchanged analysis
+(`main_agent.change_detection`).
+
+Usage:
+    $ python -m pytest tests/test_change_detection.py
+"""
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import root_agent
+from main_agent.change_detection import analysis_fingerprint
+from main_agent.models import stand_in_backend, use_model_backend
+
+BIAS = {"bias": "ageism_bias", "reason": "Attributed swelling to age.", "implication": "Dismissal."}
+
+
+def test_fingerprint_ignores_order_case_and_whitespace():
+    symptoms = {"symptomMapping": {"pain_cluster": ["swollen joints", "stiff hands"], "fatigue_cluster": ["tired"]}}
+    reordered = {"symptomMapping": {"Fatigue_Cluster": ["Tired "], "pain_cluster": ["stiff  hands", "swollen joints"],
+                                    "empty_cluster": []}}
+    biases = {"biasAwareness": [BIAS]}
+
+    assert analysis_fingerprint(json.dumps(symptoms), json.dumps(biases)) == \
+        analysis_fingerprint("```json\n" + json.dumps(reordered) + "\n```", biases)
+    assert analysis_fingerprint(symptoms, biases) != analysis_fingerprint(symptoms, {"biasAwareness": []})
+
+
+def test_malformed_analysis_is_never_unchanged():
+    assert analysis_fingerprint("not json", {"biasAwareness": []}) is None
+
+
+@pytest.mark.asyncio
+async def test_acknowledgement_turn_skips_advocacy_and_reuses_report():
+    backend = stand_in_backend()
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    metrics.reset()
+
+    final_texts = []
+    with use_model_backend(backend):
+        for query in ["My joints are stiff and swollen and I'm exhausted.", "ok, thanks"]:
+            text = None
+            async for event in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    text = event.content.parts[0].text
+            final_texts.append(text)
+
+    calls = {agent: llm.calls for (_, agent), llm in backend.instances.items()}
+    assert calls["advocacy_generator_agent"] == 1
+    assert final_texts[0] == final_texts[1]
+    assert final_texts[1].startswith("**Patient Advocacy & Consultation Aid**")
+    assert metrics.counters("change_gate.") == {
+        "change_gate.turns": 2,
+        "change_gate.skipped_turns": 1,
+        "change_gate.skipped_model_calls": 1,
+    }
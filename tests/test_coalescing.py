@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for single-flight coalescing of duplicate turns
+(`main_agent.coalescing`).
+
+Usage:
+    $ python -m pytest tests/test_coalescing.py
+"""
+import asyncio
+import json
+
+import pytest
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import root_agent
+from main_agent.coalescing import CoalescingRunner, turn_key
+from main_agent.models import stand_in_backend, use_model_backend
+
+SYMPTOMS = "I've been waking up with stiff, swollen joints in my hands and feet for three months."
+PROVIDER = "I saw a new doctor today. He told me that at 48, this is just classic perimenopause."
+
+
+def _message(text):
+    return genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=text)])
+
+
+async def _runner():
+    session_service = InMemorySessionService()
+    for session_id in ("s1", "s2"):
+        await session_service.create_session(app_name="agents", user_id="test_user", session_id=session_id)
+    return CoalescingRunner(agent=root_agent, app_name="agents", session_service=session_service), session_service
+
+
+async def _submit(runner, text, session_id="s1"):
+    return [event async for event in runner.run_async(user_id="test_user", session_id=session_id, new_message=_message(text))]
+
+
+async def _session(session_service):
+    return await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+
+
+def test_turn_key_separates_sessions_and_messages():
+    key = turn_key("u", "s1", _message("hello"))
+    assert key == turn_key("u", "s1", _message("hello"))
+    assert key != turn_key("u", "s2", _message("hello"))
+    assert key != turn_key("u", "s1", _message("hello!"))
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submissions_run_each_stage_once():
+    single = stand_in_backend(latency=0.02)
+    runner, _ = await _runner()
+    with use_model_backend(single):
+        await _submit(runner, PROVIDER)
+    expected = {agent: llm.calls for (_, agent), llm in single.instances.items()}
+
+    metrics.reset()
+    backend = stand_in_backend(latency=0.02)
+    runner, session_service = await _runner()
+    with use_model_backend(backend):
+        streams = await asyncio.gather(*(_submit(runner, PROVIDER) for _ in range(3)))
+
+    assert {agent: llm.calls for (_, agent), llm in backend.instances.items()} == expected
+    assert expected["symptom_mapper_agent"] == expected["advocacy_generator_agent"] == 1
+    assert [event.id for event in streams[0]] == [event.id for event in streams[1]] == [event.id for event in streams[2]]
+    session = await _session(session_service)
+    assert [event.author for event in session.events].count("user") == 1
+    assert json.loads(session.state["bias_analysis"])["biasAwareness"]
+    assert metrics.counters("coalescing.") == {"coalescing.runs": 1, "coalescing.coalesced": 2}
+    assert runner.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_different_and_later_messages_are_separate_turns():
+    metrics.reset()
+    backend = stand_in_backend(latency=0.02)
+    runner, _ = await _runner()
+    with use_model_backend(backend):
+        await asyncio.gather(_submit(runner, SYMPTOMS), _submit(runner, SYMPTOMS, session_id="s2"))
+        await _submit(runner, SYMPTOMS)  # the first run has finished: a new turn
+
+    assert backend("gemini-2.5-flash", "symptom_mapper_agent").calls == 3
+    assert metrics.counters("coalescing.") == {"coalescing.runs": 3}
+
+
+@pytest.mark.asyncio
+async def test_run_completes_when_the_first_caller_goes_away():
+    backend = stand_in_backend(latency=0.05)
+    runner, session_service = await _runner()
+    with use_model_backend(backend):
+        first = asyncio.ensure_future(_submit(runner, SYMPTOMS))
+        await asyncio.sleep(0.01)
+        retry = asyncio.ensure_future(_submit(runner, SYMPTOMS))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        events = await retry
+
+    assert events and events[-1].is_final_response()
+    assert backend("gemini-2.5-flash", "symptom_mapper_agent").calls == 1
+    session = await _session(session_service)
+    assert session.state["report"].startswith("**Patient Advocacy & Consultation Aid**")
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_follower():
+    metrics.reset()
+    backend = stand_in_backend(latency=0.02)
+    backend("gemini-2.5-flash", "symptom_mapper_agent").responses = [ValueError("backend down")]
+    runner, _ = await _runner()
+    with use_model_backend(backend):
+        results = await asyncio.gather(*(_submit(runner, SYMPTOMS) for _ in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert backend("gemini-2.5-flash", "symptom_mapper_agent").calls == 1
+    assert metrics.counters("coalescing.failed") == {"coalescing.failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_counted_when_every_caller_has_gone(caplog):
+    metrics.reset()
+    backend = stand_in_backend(latency=0.05)
+    backend("gemini-2.5-flash", "symptom_mapper_agent").responses = [ValueError("backend down")]
+    runner, _ = await _runner()
+    with use_model_backend(backend):
+        caller = asyncio.ensure_future(_submit(runner, SYMPTOMS))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        while not metrics.counters("coalescing.failed"):
+            await asyncio.sleep(0.01)
+
+    assert "backend down" in caplog.text
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for session history compaction (`main_agent.compaction`).
+
+Usage:
+    $ python -m pytest tests/test_compaction.py
+"""
+import pytest
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import history_compactor, root_agent
+from main_agent.compaction import DIGEST_KEY, prune_compacted
+from main_agent.models import _user_texts, default_script, stand_in_backend, use_model_backend
+from main_agent.sessions import PersistentSessionService, SQLiteSessionStore
+
+# The `tests/test_agent.py` scenario.
+SCENARIO = [
+    "I've been waking up with stiff, swollen joints in my hands and feet for three months. The fatigue is so bad I have to nap in my car at lunch.",
+    "I saw a new doctor today. I tried to show him the swelling, but he barely looked. He told me that at 48, this is just classic perimenopause and 'empty nest syndrome' making me depressed.",
+    "He didn't order any blood work. He just told me to lose 10 pounds and try meditation to calm my 'nerves' because women get so anxious at this stage of life.",
+]
+FOLLOW_UPS = [
+    "My knees ache when I climb stairs.",
+    "I'm exhausted all the time.",
+    "My hands tingle in the evening.",
+    "I wake up at 3am most nights.",
+]
+
+# Phrase -> cluster and cue -> bias tables of `_analyst`.
+SYMPTOM_PHRASES = {
+    "swollen joints": "musculoskeletal_cluster",
+    "fatigue": "fatigue_cluster",
+    "depressed": "mood_cluster",
+    "knees ache": "pain_cluster",
+    "hands tingle": "neurological_cluster",
+    "wake up at 3am": "sleep_cluster",
+}
+BIAS_CUES = {
+    "perimenopause": {"bias": "ageism_bias", "reason": "Symptoms put down to perimenopause.", "implication": ""},
+    "nerves": {"bias": "gender_bias", "reason": "Symptoms put down to 'nerves'.", "implication": ""},
+}
+
+
+def _analyst(agent_name, llm_request):
+    """Derives the analysis from every patient message (and digest) it is sent."""
+    text = " ".join(_user_texts(llm_request)).lower()
+    if agent_name == "symptom_mapper_agent":
+        clusters = {}
+        for phrase, cluster in SYMPTOM_PHRASES.items():
+            if phrase in text:
+                clusters.setdefault(cluster, []).append(phrase)
+        return {"symptomMapping": clusters}
+    if agent_name == "bias_analyzer_agent":
+        return {"biasAwareness": [bias for cue, bias in BIAS_CUES.items() if cue in text]}
+    return default_script(agent_name, llm_request)
+
+
+async def _run(queries, session_service=None, backend=None) -> tuple:
+    """Final report and the symptom-mapper prompt tokens of every turn."""
+    session_service = session_service or InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    prompt_tokens = []
+    with use_model_backend(backend or stand_in_backend()):
+        for query in queries:
+            tokens = 0
+            async for event in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                if event.author == "symptom_mapper_agent" and event.usage_metadata and not event.partial:
+                    tokens += event.usage_metadata.prompt_token_count or 0
+            prompt_tokens.append(tokens)
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session.state["report"], prompt_tokens
+
+
+def _last_symptom_request(backend) -> list:
+    """Texts of the contents of the last request the symptom mapper sent."""
+    llm = backend.instances[("gemini-2.5-flash", "symptom_mapper_agent")]
+    return ["".join(part.text or "" for part in content.parts or []) for content in llm.requests[-1].contents]
+
+
+@pytest.mark.asyncio
+async def test_compaction_replaces_old_turns_in_the_model_prompt(monkeypatch):
+    baseline = stand_in_backend(record_requests=True)
+    await _run(SCENARIO, backend=baseline)
+
+    monkeypatch.setattr(history_compactor, "max_events", 1)
+    monkeypatch.setattr(history_compactor, "keep_turns", 1)
+    metrics.reset()
+    compacted = stand_in_backend(record_requests=True)
+    await _run(SCENARIO, backend=compacted)
+
+    assert metrics.counters("history.compactions") == {"history.compactions": 2}
+    full, short = _last_symptom_request(baseline), _last_symptom_request(compacted)
+    assert SCENARIO[0] in full and SCENARIO[1] in full
+    # Only the newest message is sent verbatim; the older ones are in the digest.
+    assert SCENARIO[0] not in short and SCENARIO[1] not in short and SCENARIO[2] in short
+    assert short[0].startswith("[Summary of the earlier conversation: 2 patient messages")
+    assert len(short) < len(full)
+
+
+@pytest.mark.asyncio
+async def test_compacted_session_produces_the_same_report(monkeypatch):
+    queries = SCENARIO + FOLLOW_UPS
+    report, _ = await _run(queries, backend=stand_in_backend(script=_analyst))
+
+    monkeypatch.setattr(history_compactor, "max_events", 1)
+    monkeypatch.setattr(history_compactor, "keep_turns", 1)
+    compacted, _ = await _run(queries, backend=stand_in_backend(script=_analyst))
+
+    # The digest carries what the dropped turns contributed to the analysis.
+    assert "Musculoskeletal Cluster: swollen joints" in report and "Sleep Cluster" in report
+    assert "Ageism Bias" in report and "Gender Bias" in report
+    assert compacted == report
+
+
+@pytest.mark.asyncio
+async def test_in_memory_storage_is_pruned_too(monkeypatch):
+    monkeypatch.setattr(history_compactor, "max_events", 20)
+    service = InMemorySessionService()
+    await _run(SCENARIO + FOLLOW_UPS * 4, service)
+
+    stored = service.sessions["agents"]["test_user"]["s1"].events
+    assert len(stored) <= 20 + 10
+    assert sum(1 for event in stored if (event.custom_metadata or {}).get(DIGEST_KEY)) == 1
+    assert (stored[0].custom_metadata or {}).get(DIGEST_KEY)
+
+
+@pytest.mark.asyncio
+async def test_prompt_size_stays_bounded_on_long_sessions(monkeypatch, tmp_path):
+    queries = SCENARIO + FOLLOW_UPS * 4
+    _, uncompacted = await _run(queries)
+
+    monkeypatch.setattr(history_compactor, "max_events", 20)
+    service = PersistentSessionService(SQLiteSessionStore(str(tmp_path / "sessions.db")))
+    _, compacted = await _run(queries, service)
+
+    # Never larger than an uncompacted session's 8th turn, however long the session gets.
+    assert max(compacted) < uncompacted[7] < uncompacted[-1]
+    assert uncompacted[-1] > 2 * max(compacted)
+    await service.flush()
+    stored = service.store.load(("agents", "test_user", "s1"))
+    assert len(stored.events) <= 20 + 10
+    assert sum(1 for event in stored.events if (event.custom_metadata or {}).get(DIGEST_KEY)) == 1
+    await service.close()
+
+
+def _message(text: str, timestamp: float, **custom_metadata) -> Event:
+    return Event(
+        invocation_id=text,
+        author="user",
+        timestamp=timestamp,
+        content=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=text)]),
+        custom_metadata=custom_metadata or None,
+    )
+
+
+def test_prune_moves_the_latest_digest_first():
+    old, kept = _message("old", 1.0), _message("kept", 3.0)
+    digest = _message("digest", 4.0, **{DIGEST_KEY: {"compacted_until": 2.0, "compacted_messages": 1,
+                                                     "messages": ["old"]}})
+    events = [old, _message("older digest", 1.5, **{DIGEST_KEY: {"compacted_until": 1.0}}), kept, digest]
+
+    assert prune_compacted(events) == 2
+    assert events == [digest, kept]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for compact context assembly and prompt-token instrumentation
+(`main_agent.context`).
+
+Usage:
+    $ python -m pytest tests/test_context.py
+"""
+import pytest
+from google.adk.agents import SequentialAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import make_advocacy_generator_agent, make_symptom_mapper_agent
+from main_agent.context import state_context
+from main_agent.models import stand_in_backend, use_model_backend
+
+QUERIES = [
+    "My joints are stiff and swollen every morning.",
+    "I'm exhausted all the time and I can't focus.",
+    "I get hot flashes and night sweats.",
+    "My knees ache when I climb stairs.",
+    "I've been waking up at 3am most nights.",
+    "My hands tingle in the evening.",
+]
+
+
+def test_state_context_templates_each_key():
+    block = state_context("symptom_analysis", "bias_analysis")
+    assert "symptom_analysis: {symptom_analysis?}" in block
+    assert "bias_analysis: {bias_analysis?}" in block
+
+
+async def _advocacy_prompts(compact: bool) -> list:
+    """Runs a long session and returns the advocacy generator's contents per turn."""
+    workflow = SequentialAgent(
+        name="context_workflow",
+        sub_agents=[make_symptom_mapper_agent(), make_advocacy_generator_agent(compact=compact)],
+    )
+    backend = stand_in_backend(record_requests=True)
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=workflow, app_name="agents", session_service=session_service)
+    with use_model_backend(backend):
+        for query in QUERIES:
+            async for _ in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                pass
+    return backend.instances[("gemini-2.5-flash-lite", "advocacy_generator_agent")].requests
+
+
+@pytest.mark.asyncio
+async def test_compact_advocacy_prompt_does_not_grow_with_the_session():
+    metrics.reset()
+    compact = await _advocacy_prompts(compact=True)
+    full = await _advocacy_prompts(compact=False)
+
+    assert [len(request.contents) for request in compact] == [1] * len(QUERIES)
+    assert "symptomMapping" in compact[-1].config.system_instruction
+    assert len(full[-1].contents) > len(full[0].contents) > 1
+    assert metrics.counters("model_calls.advocacy_generator_agent") == {
+        "model_calls.advocacy_generator_agent": 2 * len(QUERIES),
+    }
+    assert metrics.counters("prompt_tokens.advocacy_generator_agent")["prompt_tokens.advocacy_generator_agent"] > 0
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared agent factory (`main_agent.agent.build_root_agent`) and
+the Agent Engine entry point (``lucia_deploy/agent.py``).
+
+Usage:
+    $ python -m pytest tests/test_deployment.py
+"""
+import sys
+import types
+from dataclasses import replace
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import deployment, metrics, warmup
+from main_agent.agent import build_root_agent, root_agent
+from main_agent.config import settings
+from main_agent.models import stand_in_backend, use_model_backend
+
+
+def _tree(agent) -> tuple:
+    """(name, type, children) of an agent graph, looking through the streaming wrapper."""
+    children = [agent.workflow] if hasattr(agent, "workflow") else agent.sub_agents
+    return agent.name, type(agent).__name__, tuple(_tree(child) for child in children)
+
+
+def test_factory_builds_the_graph_for_the_given_settings():
+    assert _tree(build_root_agent()) == _tree(root_agent)
+
+    agent = build_root_agent(replace(
+        settings, stream_report=True, skip_unchanged=False, history_max_events=0,
+        history_token_budget=0, report_llm_fallback=True,
+    ))
+    name, kind, (workflow,) = _tree(agent)
+    assert (name, kind) == ("streaming_report_agent", "ReportStreamingAgent")
+    assert [step[0] for step in workflow[2]] == [
+        "parallel_analysis_step", "advocacy_generator_agent", "report_formatter_agent",
+    ]
+    assert workflow[2][-1][2] == (("llm_report_formatter_agent", "LlmAgent", ()),)
+
+
+@pytest.fixture
+def fake_vertexai(monkeypatch):
+    """Records ``vertexai.init`` calls instead of initializing the SDK."""
+    calls = []
+    monkeypatch.setitem(sys.modules, "vertexai", types.SimpleNamespace(init=lambda **kwargs: calls.append(kwargs)))
+    monkeypatch.setattr(deployment, "_vertex_initialized", False)
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "lucia-test")
+    monkeypatch.setenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    return calls
+
+
+async def _ask(agent, session_ids) -> None:
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    with use_model_backend(stand_in_backend()):
+        for session_id in session_ids:
+            await session_service.create_session(app_name="agents", user_id="test_user", session_id=session_id)
+            async for _ in runner.run_async(
+                user_id="test_user",
+                session_id=session_id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="My joints ache.")]),
+            ):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_without_warm_up_vertex_is_initialized_on_first_request(fake_vertexai):
+    deployed = deployment.build_deployment_agent(replace(settings, warmup=False))
+
+    assert fake_vertexai == []
+    assert _tree(deployed) == _tree(root_agent)
+    await _ask(deployed, ["s1", "s2"])
+    assert fake_vertexai == [{"project": "lucia-test", "location": "us-central1"}]
+
+
+def test_entry_point_warms_up_at_import_without_side_effects(fake_vertexai, monkeypatch):
+    monkeypatch.delitem(sys.modules, "lucia_deploy.agent", raising=False)
+    metrics.reset()
+    metrics.increment("test.marker")
+
+    from lucia_deploy.agent import root_agent as deployed
+
+    assert fake_vertexai == [{"project": "lucia-test", "location": "us-central1"}]
+    assert _tree(deployed) == _tree(root_agent)
+    assert warmup.last_warmup["turn_ms"] > 0
+    assert metrics.counters() == {"test.marker": 1}
+
+
+@pytest.mark.asyncio
+async def test_entry_point_imports_inside_a_running_event_loop(fake_vertexai, monkeypatch):
+    # ``adk run`` / ``adk web`` load the agent module from their event loop.
+    monkeypatch.delitem(sys.modules, "lucia_deploy.agent", raising=False)
+
+    from lucia_deploy.agent import root_agent as deployed
+
+    assert fake_vertexai == [{"project": "lucia-test", "location": "us-central1"}]
+    assert warmup.last_warmup["turn_ms"] > 0
+    await _ask(deployed, ["s1"])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for per-branch advocacy question generation (`main_agent.fanout`,
+``LUCIA_ADVOCACY_FANOUT``).
+
+Usage:
+    $ python -m pytest tests/test_fanout.py
+"""
+import json
+from dataclasses import replace
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import build_root_agent
+from main_agent.config import settings
+from main_agent.fanout import merge_questions
+from main_agent.models import stand_in_backend, use_model_backend
+
+SYMPTOMS = "My joints are stiff and swollen and I'm exhausted."
+PROVIDER = "My doctor said it's just my age and didn't run any tests."
+
+
+def test_merge_keeps_branch_order_and_drops_duplicates():
+    assert merge_questions(
+        ["What could explain my fatigue?", "Which tests could check my joints?"],
+        ["what could  explain my Fatigue? ", "Can we look beyond my age?"],
+    ) == ["What could explain my fatigue?", "Which tests could check my joints?", "Can we look beyond my age?"]
+
+
+async def _run(agent, backend, queries):
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    authors = []
+    with use_model_backend(backend):
+        for query in queries:
+            async for event in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                authors.append(event.author)
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session.state, authors
+
+
+@pytest.mark.asyncio
+async def test_fanout_merges_branch_questions_and_skips_idle_branches():
+    backend = stand_in_backend()
+    metrics.reset()
+    agent = build_root_agent(replace(settings, advocacy_fanout=True))
+
+    state, _ = await _run(agent, backend, [SYMPTOMS, PROVIDER, "ok, thanks"])
+
+    calls = {name: llm.calls for (_, name), llm in backend.instances.items()}
+    assert "advocacy_generator_agent" not in calls
+    # Symptom questions once (unchanged afterwards), bias questions once a bias exists.
+    assert calls["symptom_question_agent"] == 1
+    assert calls["bias_question_agent"] == 1
+    assert json.loads(state["advocacy_analysis"]) == {"structuredAdvocacy": [
+        "What further evaluations could help understand my stiff and swollen joints?",
+        "How can we ensure my symptoms are evaluated thoroughly?",
+    ]}
+    assert "How can we ensure my symptoms are evaluated thoroughly?" in state["report"]
+    assert metrics.counters("advocacy_fanout.") == {
+        "advocacy_fanout.no_input.bias_question_agent": 1,
+        "advocacy_fanout.unchanged.symptom_question_agent": 2,
+        "advocacy_fanout.unchanged.bias_question_agent": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_symptom_questions_do_not_wait_for_bias_analysis():
+    backend = stand_in_backend()
+    slow = stand_in_backend(latency=0.2)
+
+    def _backend(model_name, agent_name):
+        return (slow if agent_name == "bias_analyzer_agent" else backend)(model_name, agent_name)
+
+    agent = build_root_agent(replace(settings, advocacy_fanout=True, skip_unchanged=False))
+    _, authors = await _run(agent, _backend, [PROVIDER])
+
+    assert authors.index("symptom_question_agent") < authors.index("bias_analyzer_agent")
+    assert authors.index("advocacy_merge_agent") > authors.index("bias_question_agent")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the fused analysis layout (`main_agent.fused`,
+``LUCIA_ANALYSIS_LAYOUT=fused``).
+
+Usage:
+    $ python -m pytest tests/test_fused.py
+"""
+import json
+from dataclasses import replace
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import build_root_agent
+from main_agent.axiom_service import AxiomStore, BiasImplicationService, use_implication_service
+from main_agent.config import LuciaSettings, settings
+from main_agent.models import stand_in_backend, use_model_backend
+
+SYMPTOMS = "My joints are stiff and swollen and I'm exhausted."
+PROVIDER = "My doctor said it's just my age and didn't run any tests."
+FUSED = replace(settings, analysis_layout="fused")
+OUTPUT_KEYS = ("symptom_analysis", "bias_analysis", "advocacy_analysis", "report")
+
+
+async def _run(agent, backend, queries):
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    events = []
+    with use_model_backend(backend):
+        for query in queries:
+            async for event in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                events.append(event)
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session.state, events
+
+
+def test_fused_layout_requires_cumulative_mode():
+    with pytest.raises(ValueError):
+        LuciaSettings(analysis_layout="fused", analysis_mode="incremental")
+
+
+@pytest.mark.asyncio
+async def test_fused_layout_matches_the_two_workers_with_one_call_per_turn():
+    parallel_state, _ = await _run(build_root_agent(), stand_in_backend(), [SYMPTOMS, PROVIDER])
+    backend = stand_in_backend(record_requests=True)
+    fused_state, events = await _run(build_root_agent(FUSED), backend, [SYMPTOMS, PROVIDER])
+
+    assert {key: fused_state[key] for key in OUTPUT_KEYS} == {key: parallel_state[key] for key in OUTPUT_KEYS}
+    assert {name for (_, name) in backend.instances} == {"analysis_agent", "advocacy_generator_agent"}
+    (fused,) = [llm for (_, name), llm in backend.instances.items() if name == "analysis_agent"]
+    assert fused.calls == 2
+    # No tool round trip: the implication comes from the AXIOM service.
+    assert all(not request.tools_dict for request in fused.requests)
+    assert not [response for event in events for response in event.get_function_responses()]
+    deltas = [event.actions.state_delta for event in events if event.author == "analysis_agent"]
+    assert all({"symptom_analysis", "bias_analysis"} <= set(delta) for delta in deltas)
+
+
+@pytest.mark.asyncio
+async def test_malformed_fused_output_keeps_the_previous_analysis():
+    metrics.reset()
+    backend = stand_in_backend()
+    backend("gemini-2.5-flash", "analysis_agent").responses = [
+        {"symptomMapping": {"pain_cluster": ["stiff joints"]}, "biasAwareness": []},
+        "I could not analyze this.",
+        "Still no JSON.",
+    ]
+    state, _ = await _run(build_root_agent(FUSED), backend, [SYMPTOMS, PROVIDER])
+
+    assert json.loads(state["symptom_analysis"]) == {"symptomMapping": {"pain_cluster": ["stiff joints"]}}
+    assert json.loads(state["bias_analysis"]) == {"biasAwareness": []}
+    assert metrics.counters("fused_analysis.") == {"fused_analysis.malformed": 1}
+
+
+class _DownStore(AxiomStore):
+    async def search_many(self, bias_types):
+        raise ConnectionError("vector db down")
+
+
+@pytest.mark.asyncio
+async def test_store_failure_keeps_the_biases_without_implications():
+    metrics.reset()
+    with use_implication_service(BiasImplicationService(_DownStore())):
+        state, _ = await _run(build_root_agent(FUSED), stand_in_backend(), [PROVIDER])
+
+    assert json.loads(state["bias_analysis"]) == {"biasAwareness": [
+        {"bias": "gender_bias", "reason": "Provider dismissed reported symptoms.", "implication": ""},
+    ]}
+    assert metrics.counters("fused_analysis.") == {"fused_analysis.lookup_errors": 1}
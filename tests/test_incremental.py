@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the incremental (delta) analysis mode (`main_agent.incremental`).
+
+The scenario is the three-message "Perimenopause Dismissal" conversation from
+`tests/test_agent.py`. For parity, both modes run against the same stand-in
+analyst, which derives its findings from the messages it is sent: the whole
+history in cumulative mode, only the newest message in incremental mode. The
+merged deltas must equal the cumulative re-analysis after every turn.
+
+Usage:
+    $ python -m pytest tests/test_incremental.py
+"""
+import json
+from dataclasses import replace
+
+import pytest
+from google.adk.agents import ParallelAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.agent import build_root_agent, make_bias_analyzer_agent, make_symptom_mapper_agent
+from main_agent.config import settings
+from main_agent.incremental import merge_bias_delta, merge_symptom_delta
+from main_agent.models import (
+    StandInLlm,
+    _is_delta_request,
+    _user_texts,
+    default_script,
+    function_call_content,
+    stand_in_backend,
+    use_model_backend,
+)
+
+QUERIES = [
+    "I've been waking up with stiff, swollen joints in my hands and feet for three months. The fatigue is so bad I have to nap in my car at lunch.",
+    "I saw a new doctor today. I tried to show him the swelling, but he barely looked. He told me that at 48, this is just classic perimenopause and 'empty nest syndrome' making me depressed.",
+    "He didn't order any blood work. He just told me to lose 10 pounds and try meditation to calm my 'nerves' because women get so anxious at this stage of life.",
+]
+
+AGEISM = {
+    "bias": "ageism_bias",
+    "reason": "Doctor attributed joint swelling to perimenopause at age 48 without examining it.",
+    "implication": "Dismissing a patient's medical concerns as a normal or inevitable part of aging.",
+}
+GENDER = {
+    "bias": "gender_bias",
+    "reason": "Doctor attributed symptoms to 'nerves' because 'women get so anxious' and ordered no blood work.",
+    "implication": "Often results in women's pain being taken less seriously or misdiagnosed.",
+}
+
+SYMPTOM_DELTAS = [
+    {"add": {"musculoskeletal_cluster": ["stiff, swollen joints in my hands and feet"],
+             "fatigue_cluster": ["fatigue is so bad I have to nap in my car at lunch"]}, "remove": {}},
+    {"add": {}, "remove": {}},
+    {"add": {}, "remove": {}},
+]
+BIAS_DELTAS = [
+    {"add": [], "remove": []},
+    {"add": [AGEISM], "remove": []},
+    {"add": [GENDER], "remove": []},
+]
+
+# What a cumulative worker returns after re-reading all three messages.
+FULL_SYMPTOM_ANALYSIS = {
+    "symptomMapping": {
+        "musculoskeletal_cluster": ["stiff, swollen joints in my hands and feet"],
+        "fatigue_cluster": ["fatigue is so bad I have to nap in my car at lunch"],
+    }
+}
+FULL_BIAS_ANALYSIS = {"biasAwareness": [AGEISM, GENDER]}
+
+
+# Phrase -> cluster and cue -> bias tables of the stand-in analyst.
+SYMPTOM_PHRASES = {
+    "stiff, swollen joints": "musculoskeletal_cluster",
+    "swelling": "musculoskeletal_cluster",
+    "fatigue": "fatigue_cluster",
+    "depressed": "mood_cluster",
+}
+WEIGHT = {"bias": "weight_bias", "reason": "Told to lose weight instead of being examined.", "implication": ""}
+BIAS_CUES = {"perimenopause": AGEISM, "lose 10 pounds": WEIGHT, "anxious": GENDER}
+
+
+def _analyst(agent_name, llm_request):
+    """Analyzes the patient messages in the request; deltas cover only those messages."""
+    texts = [text.lower() for text in _user_texts(llm_request)]
+    if agent_name == "symptom_mapper_agent":
+        clusters = {}
+        for text in texts:
+            for phrase, cluster in SYMPTOM_PHRASES.items():
+                if phrase in text and phrase not in clusters.get(cluster, []):
+                    clusters.setdefault(cluster, []).append(phrase)
+        return {"add": clusters, "remove": {}} if _is_delta_request(llm_request) else {"symptomMapping": clusters}
+    if agent_name == "bias_analyzer_agent":
+        biases = []
+        for text in texts:
+            biases += [bias for cue, bias in BIAS_CUES.items() if cue in text and bias not in biases]
+        return {"add": biases, "remove": []} if _is_delta_request(llm_request) else {"biasAwareness": biases}
+    return default_script(agent_name, llm_request)
+
+
+async def _analyses(mode):
+    """(symptom_analysis, bias_analysis) after every turn of the scenario in ``mode``."""
+    agent = build_root_agent(replace(settings, analysis_mode=mode, analysis_layout="parallel"))
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    snapshots = []
+    with use_model_backend(stand_in_backend(script=_analyst)):
+        for query in QUERIES:
+            async for _event in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                pass
+            state = (await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")).state
+            snapshots.append((json.loads(state["symptom_analysis"]), json.loads(state["bias_analysis"])))
+    return snapshots
+
+
+@pytest.mark.asyncio
+async def test_incremental_mode_matches_cumulative_reanalysis():
+    cumulative = await _analyses("cumulative")
+    incremental = await _analyses("incremental")
+
+    assert incremental == cumulative
+    symptoms, biases = cumulative[-1]
+    assert set(symptoms["symptomMapping"]) == {"musculoskeletal_cluster", "fatigue_cluster", "mood_cluster"}
+    assert [bias["bias"] for bias in biases["biasAwareness"]] == ["ageism_bias", "weight_bias", "gender_bias"]
+
+
+def test_merge_handles_corrections_and_duplicates():
+    previous = {"symptomMapping": {"pain_cluster": ["back hurts", "knees ache"]}}
+    merged = merge_symptom_delta(previous, {"add": {"pain_cluster": ["Back hurts"]}, "remove": ["knees ache"]})
+    assert merged == {"symptomMapping": {"pain_cluster": ["back hurts"]}}
+
+    merged = merge_bias_delta({"biasAwareness": [AGEISM]}, {"add": [], "remove": ["ageism_bias"]})
+    assert merged == {"biasAwareness": []}
+
+
+def test_malformed_previous_state_starts_fresh():
+    merged = merge_symptom_delta("not json", {"add": {"pain_cluster": ["back hurts"]}})
+    assert merged == {"symptomMapping": {"pain_cluster": ["back hurts"]}}
+
+
+@pytest.mark.asyncio
+async def test_incremental_agents_see_only_new_message_and_merge_state():
+    symptom_agent = make_symptom_mapper_agent("incremental")
+    bias_agent = make_bias_analyzer_agent("incremental")
+    symptom_agent.model = StandInLlm(model="standin", responses=list(SYMPTOM_DELTAS), record_requests=True)
+    bias_agent.model = StandInLlm(
+        model="standin",
+        # The first message mentions no provider and is answered by the pre-classifier.
+        responses=[
+            function_call_content("get_bias_implications", bias_type="ageism_bias"), BIAS_DELTAS[1],
+            function_call_content("get_bias_implications", bias_type="gender_bias"), BIAS_DELTAS[2],
+        ],
+    )
+    root = ParallelAgent(name="parallel_analysis_step", sub_agents=[symptom_agent, bias_agent])
+
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root, app_name="agents", session_service=session_service)
+    for query in QUERIES:
+        async for _event in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+        ):
+            pass
+
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    assert json.loads(session.state["symptom_analysis"]) == FULL_SYMPTOM_ANALYSIS
+    assert json.loads(session.state["bias_analysis"]) == FULL_BIAS_ANALYSIS
+
+    # Every symptom request carries exactly one message: the newest one.
+    for query, request in zip(QUERIES, symptom_agent.model.requests):
+        assert [c.parts[0].text for c in request.contents] == [query]
+    # ...and the previous structured state is injected into the instruction.
+    assert "stiff, swollen joints" in symptom_agent.model.requests[-1].config.system_instruction
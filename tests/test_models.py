@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the model factory and offline stand-in (`main_agent.models`).
+
+Runs the full `root_agent` pipeline on the `tests/test_agent.py` scenario
+without a `GOOGLE_API_KEY`.
+
+Usage:
+    $ python -m pytest tests/test_models.py
+"""
+import json
+import time
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.agent import root_agent
+from main_agent.models import (
+    LuciaModel,
+    StandInLlm,
+    replay_script,
+    resolve_backend,
+    stand_in_backend,
+    use_model_backend,
+)
+
+QUERIES = [
+    "I've been waking up with stiff, swollen joints in my hands and feet for three months.",
+    "I saw a new doctor today. He told me that at 48, this is just classic perimenopause.",
+]
+
+
+async def _run_turns(queries):
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    events = []
+    for query in queries:
+        async for event in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+        ):
+            events.append(event)
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return events, session
+
+
+@pytest.mark.asyncio
+async def test_root_agent_runs_offline_with_stand_in():
+    backend = stand_in_backend()
+    with use_model_backend(backend):
+        events, session = await _run_turns(QUERIES)
+
+    tool_calls = [call.name for event in events for call in event.get_function_calls()]
+    assert tool_calls == ["get_bias_implications_batch"]  # only the turn that mentions a doctor
+    bias = json.loads(session.state["bias_analysis"])["biasAwareness"][0]
+    assert bias["implication"].startswith("Often results in women's pain")
+    assert session.state["report"].startswith("**Patient Advocacy & Consultation Aid**")
+
+    calls = {agent: llm.calls for (_, agent), llm in backend.instances.items()}
+    # Turn 1 mentions no provider, so the bias analyzer is answered by the pre-classifier.
+    assert calls == {"symptom_mapper_agent": 2, "bias_analyzer_agent": 2, "advocacy_generator_agent": 2}
+
+
+def test_backend_override_is_scoped():
+    default = resolve_backend()
+    with use_model_backend(stand_in_backend()):
+        model = LuciaModel(model="gemini-2.5-flash", agent_name="symptom_mapper_agent").resolve()
+        assert isinstance(model, StandInLlm)
+    assert resolve_backend() is default
+
+
+@pytest.mark.asyncio
+async def test_stand_in_latency_tokens_and_streaming():
+    llm = StandInLlm(model="standin", responses=["one two three"], latency=0.03, prompt_tokens=120, completion_tokens=7)
+    request = LlmRequest(contents=[genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="hi")])])
+
+    start = time.perf_counter()
+    responses = [r async for r in llm.generate_content_async(request, stream=True)]
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.03
+    assert [r.content.parts[0].text for r in responses if r.partial] == ["one ", "two ", "three"]
+    final = responses[-1]
+    assert not final.partial and final.content.parts[0].text == "one two three"
+    assert final.usage_metadata.prompt_token_count == 120
+    assert final.usage_metadata.total_token_count == 127
+
+
+def test_replay_script_cycles_recorded_responses(tmp_path):
+    recording = tmp_path / "replay.jsonl"
+    recording.write_text("\n".join([
+        json.dumps({"agent": "bias_analyzer_agent", "function_call": {"name": "get_bias_implications", "args": {"bias_type": "ageism"}}}),
+        json.dumps({"agent": "bias_analyzer_agent", "text": '{"biasAwareness": []}'}),
+    ]))
+    script = replay_script(str(recording))
+    request = LlmRequest()
+
+    first = script("bias_analyzer_agent", request)
+    assert first.parts[0].function_call.args == {"bias_type": "ageism"}
+    assert script("bias_analyzer_agent", request) == '{"biasAwareness": []}'
+    assert script("bias_analyzer_agent", request).parts[0].function_call.name == "get_bias_implications"
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the provider-mention pre-classifier (`main_agent.preclassifier`).
+
+The labeled fixture ``tests/fixtures/provider_mentions.jsonl`` holds patient
+messages marked with whether they reference a clinician interaction.
+
+Usage:
+    $ python -m pytest tests/test_preclassifier.py
+"""
+import json
+import os
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import make_bias_analyzer_agent
+from main_agent.models import StandInLlm
+from main_agent.preclassifier import PROVIDER_MENTIONED_KEY, evaluate, mentions_provider
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "provider_mentions.jsonl")
+
+
+def _load_fixture() -> list:
+    with open(FIXTURE, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def test_precision_and_recall_on_labeled_fixture():
+    scores = evaluate(_load_fixture())
+    assert scores["recall"] == 1.0, scores["false_negatives"]
+    assert scores["precision"] >= 0.9, scores["false_positives"]
+
+
+def test_acronyms_are_case_sensitive():
+    assert mentions_provider("I went to the ER last night.")
+    assert not mentions_provider("I told her about my knees.")
+
+
+@pytest.mark.asyncio
+async def test_bias_model_is_called_only_after_a_provider_is_mentioned():
+    agent = make_bias_analyzer_agent("cumulative", preclassify=True)
+    agent.model = StandInLlm(model="standin", responses=['{"biasAwareness": []}'])
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+    metrics.reset()
+
+    states = []
+    for query in ["My joints ache every morning.", "My GP said it's just my age.", "I'm also very tired."]:
+        async for _event in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+        ):
+            pass
+        session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+        states.append(dict(session.state))
+
+    assert agent.model.calls == 2  # turns 2 and 3; the mention sticks to the session
+    assert states[0]["bias_analysis"] == '{"biasAwareness": []}'
+    assert [state[PROVIDER_MENTIONED_KEY] for state in states] == [False, True, True]
+    assert metrics.counters("bias_preclassifier.") == {"bias_preclassifier.short_circuits": 1}
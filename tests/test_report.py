@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the deterministic report formatter (`main_agent.report`).
+
+The expected report mirrors the "Perimenopause Dismissal" demo output in the
+project README.
+
+Usage:
+    $ python -m pytest tests/test_report.py
+"""
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.report import (
+    NO_BIASES,
+    NO_QUESTIONS,
+    NO_SYMPTOMS,
+    ReportFormatterAgent,
+    ReportInputError,
+    parse_agent_json,
+    render_report,
+    title_case,
+)
+
+SYMPTOMS = {
+    "symptomMapping": {
+        "pain_cluster": ["stiff joints in my hands and feet"],
+        "fatigue_cluster": ["fatigue"],
+    }
+}
+BIASES = {
+    "biasAwareness": [
+        {
+            "bias": "ageism_bias",
+            "reason": "Doctor attributed joint swelling to perimenopause at age 48.",
+            "implication": "Dismissing a patient's medical concerns as a normal part of aging.",
+        }
+    ]
+}
+QUESTIONS = {"structuredAdvocacy": ["Are there additional causes for my fatigue we should consider?"]}
+
+EXPECTED_REPORT = """**Patient Advocacy & Consultation Aid**
+
+**Disclaimer:** This report is generated to assist in patient–doctor communication and is not medical advice. Always consult a qualified healthcare professional for diagnosis and treatment.
+
+**1. Summary of Reported Symptoms:**
+* Pain Cluster: stiff joints in my hands and feet
+* Fatigue Cluster: fatigue
+
+**2. Communication & Bias Insights:**
+* Ageism Bias
+    * Observation: Doctor attributed joint swelling to perimenopause at age 48.
+    * Potential Risk: Dismissing a patient's medical concerns as a normal part of aging.
+
+**3. Suggested Questions for Your Doctor:**
+* Are there additional causes for my fatigue we should consider?"""
+
+
+def test_render_report_matches_template():
+    report = render_report(json.dumps(SYMPTOMS), json.dumps(BIASES), json.dumps(QUESTIONS))
+    assert report == EXPECTED_REPORT
+
+
+def test_render_report_states_empty_sections():
+    report = render_report('{"symptomMapping": {}}', '{"biasAwareness": []}', None)
+    assert NO_SYMPTOMS in report
+    assert NO_BIASES in report
+    assert NO_QUESTIONS in report
+
+
+def test_parse_agent_json_tolerates_fences_and_missing_wrapper():
+    fenced = '```json\n{ "pain_cluster": ["back hurts"] }\n```'
+    report = render_report(fenced, None, None)
+    assert "* Pain Cluster: back hurts" in report
+    assert parse_agent_json('Here you go: {"biasAwareness": []}') == {"biasAwareness": []}
+
+
+def test_parse_agent_json_rejects_garbage():
+    with pytest.raises(ReportInputError):
+        parse_agent_json("I could not find any symptoms.")
+
+
+def test_title_case():
+    assert title_case("racial_or_ethnic_bias") == "Racial Or Ethnic Bias"
+
+
+@pytest.mark.asyncio
+async def test_report_formatter_agent_writes_report_without_model():
+    agent = ReportFormatterAgent(name="report_formatter_agent")
+    session_service = InMemorySessionService()
+    await session_service.create_session(
+        app_name="agents",
+        user_id="test_user",
+        session_id="s1",
+        state={
+            "symptom_analysis": json.dumps(SYMPTOMS),
+            "bias_analysis": json.dumps(BIASES),
+            "advocacy_analysis": json.dumps(QUESTIONS),
+        },
+    )
+    runner = Runner(agent=agent, app_name="agents", session_service=session_service)
+
+    final = None
+    async for event in runner.run_async(
+        user_id="test_user",
+        session_id="s1",
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="ok")]),
+    ):
+        if event.is_final_response():
+            final = event.content.parts[0].text
+
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    assert final == EXPECTED_REPORT
+    assert session.state["report"] == EXPECTED_REPORT
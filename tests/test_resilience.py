@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for deadlines, retries, hedging and the concurrency budget of model
+calls (`main_agent.resilience`).
+
+Usage:
+    $ python -m pytest tests/test_resilience.py
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import root_agent
+from main_agent.models import stand_in_backend, stand_in_error, use_model_backend
+from main_agent.resilience import (
+    ModelDeadlineExceeded,
+    ModelResilience,
+    ResiliencePolicy,
+    is_retryable,
+    retry_after,
+    use_resilience,
+)
+
+FAST = dict(backoff_base=0.001)
+
+
+class FakeRequests:
+    """``call`` for `ModelResilience.stream`: request i sleeps ``delays[i]`` (an exception is raised instead)."""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.started = self.cancelled = self.in_flight = self.max_in_flight = 0
+
+    def __call__(self, hedge: bool):
+        index = self.started
+        self.started += 1
+        return self._respond(index, self.delays[min(index, len(self.delays) - 1)])
+
+    async def _respond(self, index, delay):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if isinstance(delay, BaseException):
+                raise delay
+            await asyncio.sleep(delay)
+            yield f"response {index}"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+async def _collect(resilience, call, agent="symptom_mapper_agent"):
+    return [response async for response in resilience.stream(agent, call)]
+
+
+def test_gemini_errors_are_classified_and_hints_read():
+    assert is_retryable(stand_in_error(429)) and is_retryable(stand_in_error(503))
+    assert not is_retryable(stand_in_error(400)) and not is_retryable(ValueError("bad"))
+    assert retry_after(stand_in_error(429, retry_after=1.5)) == 1.5
+    assert retry_after(stand_in_error(503)) is None
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_honoring_retry_after():
+    metrics.reset()
+    requests = FakeRequests(stand_in_error(503), stand_in_error(429, retry_after=0.05), 0)
+    started = time.perf_counter()
+    assert await _collect(ModelResilience(ResiliencePolicy(**FAST)), requests) == ["response 2"]
+
+    assert time.perf_counter() - started >= 0.05
+    assert metrics.counters("resilience.") == {"resilience.retries.symptom_mapper_agent": 2}
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_and_exhausted_retries_are_raised():
+    requests = FakeRequests(stand_in_error(400))
+    with pytest.raises(Exception, match="400"):
+        await _collect(ModelResilience(ResiliencePolicy(**FAST)), requests)
+    assert requests.started == 1
+
+    requests = FakeRequests(stand_in_error(503))
+    with pytest.raises(Exception, match="503"):
+        await _collect(ModelResilience(ResiliencePolicy(max_retries=2, **FAST)), requests)
+    assert requests.started == 3
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_slow_calls_and_long_retry_hints():
+    requests = FakeRequests(5.0)
+    started = time.perf_counter()
+    with pytest.raises(ModelDeadlineExceeded):
+        await _collect(ModelResilience(ResiliencePolicy(deadline=0.05)), requests)
+    assert time.perf_counter() - started < 1.0
+    assert requests.cancelled == 1
+
+    # A retry-after hint past the deadline fails at once instead of sleeping.
+    requests = FakeRequests(stand_in_error(429, retry_after=30), 0)
+    with pytest.raises(ModelDeadlineExceeded):
+        await _collect(ModelResilience(ResiliencePolicy(deadline=1.0)), requests)
+    assert requests.started == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_after_the_observed_p95():
+    metrics.reset()
+    resilience = ModelResilience(ResiliencePolicy(hedge=True, hedge_min_samples=5, hedge_min_delay=0.01))
+    for _ in range(5):
+        await _collect(resilience, FakeRequests(0.005))
+    assert resilience.hedge_delay("symptom_mapper_agent") == pytest.approx(0.01, abs=0.01)
+
+    requests = FakeRequests(2.0, 0.005)
+    started = time.perf_counter()
+    assert await _collect(resilience, requests) == ["response 1"]
+
+    assert time.perf_counter() - started < 0.5
+    assert requests.started == 2 and requests.cancelled == 1
+    assert metrics.counters("resilience.") == {
+        "resilience.hedges.symptom_mapper_agent": 1,
+        "resilience.hedge_wins.symptom_mapper_agent": 1,
+    }
+    assert resilience.budget.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_budget_caps_requests_and_hedges():
+    resilience = ModelResilience(ResiliencePolicy(concurrency=2))
+    requests = FakeRequests(0.02)
+    await asyncio.gather(*(_collect(resilience, requests) for _ in range(6)))
+    assert requests.started == 6 and requests.max_in_flight == 2
+    assert resilience.budget.in_flight == 0
+
+    metrics.reset()
+    resilience = ModelResilience(ResiliencePolicy(concurrency=1, hedge=True, hedge_min_samples=1, hedge_min_delay=0.01))
+    await _collect(resilience, FakeRequests(0))
+    requests = FakeRequests(0.1, 0)
+    assert await _collect(resilience, requests) == ["response 0"]
+    assert metrics.counters("resilience.") == {"resilience.hedges_skipped.symptom_mapper_agent": 1}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_recovers_from_rate_limited_worker():
+    backend = stand_in_backend()
+    backend("gemini-2.5-flash", "symptom_mapper_agent").responses = [
+        stand_in_error(429, retry_after=0.01), {"symptomMapping": {"pain_cluster": ["aching joints"]}},
+    ]
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+
+    with use_model_backend(backend), use_resilience(ModelResilience(ResiliencePolicy(**FAST))):
+        async for _ in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="My joints ache.")]),
+        ):
+            pass
+
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    assert json.loads(session.state["symptom_analysis"]) == {"symptomMapping": {"pain_cluster": ["aching joints"]}}
+    assert backend("gemini-2.5-flash", "symptom_mapper_agent").calls == 2
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for per-call model routing (`main_agent.routing`).
+
+Usage:
+    $ python -m pytest tests/test_routing.py
+"""
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import metrics, routing
+from main_agent.agent import root_agent
+from main_agent.models import stand_in_backend, use_model_backend
+from main_agent.routing import Route, Signals, load_router, tier_summary
+
+LITE, STANDARD = routing.TIERS["lite"].model, routing.TIERS["standard"].model
+LONG_NARRATIVE = (
+    "I've been waking up with stiff, swollen joints in my hands and feet for three months. "
+    "The fatigue is so bad I have to nap in my car at lunch, and by the evening my fingers "
+    "tingle and my knees ache when I climb the stairs to my apartment. I also wake up at 3am "
+    "most nights, drenched in sweat, and can't get back to sleep."
+)
+QUERIES = [
+    "My joints ache every morning.",
+    LONG_NARRATIVE,
+    "My doctor said it's just my age and didn't order any tests.",
+    "I'm also very tired.",
+]
+
+
+async def _run(queries) -> tuple:
+    """Final report and the (model, agent) pairs called for every turn."""
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    backend = stand_in_backend()
+    turns = []
+    with use_model_backend(backend):
+        for query in queries:
+            before = {key: llm.calls for key, llm in backend.instances.items()}
+            async for _ in runner.run_async(
+                user_id="test_user",
+                session_id="s1",
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            ):
+                pass
+            turns.append({key for key, llm in backend.instances.items() if llm.calls > before.get(key, 0)})
+    session = await session_service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    return session.state["report"], turns
+
+
+def test_route_escalates_on_any_enabled_trigger():
+    route = Route("lite", escalate_to="standard", min_chars=100, min_clusters=3)
+    assert route.choose(Signals(message_chars=20, provider_mentioned=True, clusters=2)) == "lite"
+    assert route.choose(Signals(message_chars=100)) == "standard"
+    assert route.choose(Signals(clusters=3)) == "standard"
+    assert Route("lite", min_chars=1).choose(Signals(message_chars=500)) == "lite"
+
+
+def test_policies_from_config_file(tmp_path):
+    path = tmp_path / "routing.json"
+    path.write_text(json.dumps({
+        "tiers": {"pro": {"model": "gemini-2.5-pro", "input_usd_per_mtok": 1.25, "output_usd_per_mtok": 10.0}},
+        "policies": {"careful": {"bias_analyzer_agent": {"tier": "standard", "escalate_to": "pro", "on_provider": True}}},
+    }))
+    router = load_router("careful", str(path))
+
+    assert router.route("bias_analyzer_agent", Signals(provider_mentioned=True)).model == "gemini-2.5-pro"
+    assert router.route("symptom_mapper_agent", Signals()) is None
+    assert router.default_model("symptom_mapper_agent") == STANDARD
+    assert router.tier_of("gemini-2.5-pro").cost_usd(1_000_000, 0) == 1.25
+    with pytest.raises(ValueError, match="unknown tier"):
+        routing.ModelRouter("broken", routes={"bias_analyzer_agent": Route("missing")})
+    with pytest.raises(ValueError, match="Unknown routing policy"):
+        load_router("nonexistent", str(path))
+
+
+@pytest.mark.asyncio
+async def test_complexity_policy_routes_per_call_and_keeps_the_report(monkeypatch):
+    baseline, fixed_turns = await _run(QUERIES)
+    assert all(model == (STANDARD if agent == "symptom_mapper_agent" else LITE)
+               for turn in fixed_turns for model, agent in turn)
+
+    monkeypatch.setattr(routing, "router", load_router("complexity"))
+    metrics.reset()
+    report, turns = await _run(QUERIES)
+
+    assert report == baseline
+    # Short symptom turn: everything on flash-lite (the bias stage is answered locally).
+    assert turns[0] == {(LITE, "symptom_mapper_agent"), (LITE, "advocacy_generator_agent")}
+    # Long narrative: the symptom mapper escalates.
+    assert (STANDARD, "symptom_mapper_agent") in turns[1]
+    # Clinician interaction: the bias analyzer escalates, the short message does not.
+    assert {(LITE, "symptom_mapper_agent"), (STANDARD, "bias_analyzer_agent")} <= turns[2]
+    # Follow-up without a clinician: back to flash-lite.
+    assert (LITE, "bias_analyzer_agent") in turns[3]
+
+    assert metrics.counters("routing.escalations.") == {
+        "routing.escalations.symptom_mapper_agent": 1,
+        "routing.escalations.bias_analyzer_agent": 2,
+    }
+    summary = tier_summary()
+    assert set(summary) == {"lite", "standard"}
+    calls = sum(len(turn) for turn in turns)
+    assert summary["lite"]["calls"] + summary["standard"]["calls"] >= calls
+    assert summary["standard"]["cost_usd"] > 0 and summary["lite"]["input_tokens"] > 0
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the structured-output schemas, repair parser and validated model
+calls (`main_agent.schemas`, `main_agent.models`).
+
+Usage:
+    $ python -m pytest tests/test_schemas.py
+"""
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.models import model_for, stand_in_backend, use_model_backend
+from main_agent.schemas import (
+    AdvocacyAnalysis,
+    BiasAnalysis,
+    OutputValidationError,
+    BiasDelta,
+    SymptomAnalysis,
+    SymptomDelta,
+    canonical_json,
+    parse_output,
+)
+
+
+@pytest.mark.parametrize("raw, schema, expected", [
+    ('```json\n{"symptomMapping": {"pain_cluster": ["knees"]}}\n```', SymptomAnalysis,
+     '{"symptomMapping":{"pain_cluster":["knees"]}}'),
+    # The prompt's own example omits the wrapper.
+    ('{"pain_cluster": ["knees", "hips"], "fatigue_cluster": "tired",}', SymptomAnalysis,
+     '{"symptomMapping":{"pain_cluster":["knees","hips"],"fatigue_cluster":["tired"]}}'),
+    ("Sure! {'biasAwareness': [{'bias': 'ageism_bias', 'reason': None}]}", BiasAnalysis,
+     '{"biasAwareness":[{"bias":"ageism_bias","reason":"","implication":""}]}'),
+    ('[“What tests could help?”]', AdvocacyAnalysis, '{"structuredAdvocacy":["What tests could help?"]}'),
+    ('{"add": {"pain_cluster": "knees"}, "remove": ["hips"]}', SymptomDelta,
+     '{"add":{"pain_cluster":["knees"]},"remove":["hips"]}'),
+])
+def test_repairs_common_defects_into_canonical_json(raw, schema, expected):
+    assert canonical_json(parse_output(raw, schema)) == expected
+
+
+@pytest.mark.parametrize("raw, schema", [
+    ("I could not find any symptoms.", SymptomAnalysis),
+    ('{"biasAwareness": [{"reason": "no bias name"}]}', BiasAnalysis),
+    ('{"structuredAdvocacy": {"q": 1}}', AdvocacyAnalysis),
+    # Cumulative answers are not deltas.
+    ('{"symptomMapping": {"pain_cluster": ["knees"]}}', SymptomDelta),
+    ('{"biasAwareness": [{"bias": "ageism_bias"}]}', BiasDelta),
+])
+def test_rejects_unrepairable_outputs(raw, schema):
+    with pytest.raises(OutputValidationError):
+        parse_output(raw, schema)
+
+
+def _request() -> LlmRequest:
+    return LlmRequest(contents=[genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="hi")])])
+
+
+async def _final_text(model) -> tuple:
+    responses = [r async for r in model.generate_content_async(_request())]
+    return responses[-1].content.parts[0].text, responses[-1].custom_metadata
+
+
+@pytest.mark.asyncio
+async def test_invalid_output_is_counted_and_re_requested():
+    model = model_for("advocacy_generator_agent", "gemini-2.5-flash-lite", output_schema=AdvocacyAnalysis)
+    backend = stand_in_backend(responses=["Here are some questions.", '{"structuredAdvocacy": ["Why?"]}'],
+                               record_requests=True)
+    metrics.reset()
+    with use_model_backend(backend):
+        text, _ = await _final_text(model)
+
+    assert text == '{"structuredAdvocacy":["Why?"]}'
+    llm = backend.instances[("gemini-2.5-flash-lite", "advocacy_generator_agent")]
+    retry = llm.requests[-1].contents
+    assert retry[-2].parts[0].text == "Here are some questions."
+    assert "rejected" in retry[-1].parts[0].text
+    assert metrics.counters("schema.") == {
+        "schema.invalid.advocacy_generator_agent": 1,
+        "schema.retries.advocacy_generator_agent": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_retries_are_bounded_and_invalid_output_is_marked():
+    # LUCIA_OUTPUT_RETRIES defaults to 1.
+    model = model_for("advocacy_generator_agent", "gemini-2.5-flash-lite", output_schema=AdvocacyAnalysis)
+    backend = stand_in_backend(responses=["nope", "still nope", "never reached"])
+    metrics.reset()
+    with use_model_backend(backend):
+        text, custom_metadata = await _final_text(model)
+
+    assert text == "still nope"
+    assert custom_metadata == {"schema": "invalid"}
+    assert backend.instances[("gemini-2.5-flash-lite", "advocacy_generator_agent")].calls == 2
+    assert metrics.counters("schema.exhausted.") == {"schema.exhausted.advocacy_generator_agent": 1}
+
+
+@pytest.mark.asyncio
+async def test_cumulative_answer_in_incremental_mode_is_re_requested():
+    model = model_for("symptom_mapper_agent", "gemini-2.5-flash", output_schema=SymptomDelta)
+    backend = stand_in_backend(responses=['{"symptomMapping": {"pain_cluster": ["knees"]}}',
+                                          '{"add": {"pain_cluster": ["knees"]}, "remove": {}}'])
+    metrics.reset()
+    with use_model_backend(backend):
+        text, _ = await _final_text(model)
+
+    assert text == '{"add":{"pain_cluster":["knees"]},"remove":{}}'
+    assert metrics.counters("schema.") == {
+        "schema.invalid.symptom_mapper_agent": 1,
+        "schema.retries.symptom_mapper_agent": 1,
+    }
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the HTTP service (`main_agent.server`): sessions, JSON and SSE
+turns, load shedding, drain and sticky routing across workers.
+
+Usage:
+    $ python -m pytest tests/test_server.py
+"""
+import asyncio
+import contextlib
+import json
+import signal
+import threading
+import time
+from dataclasses import replace
+
+import httpx
+import pytest
+import uvicorn
+
+from main_agent import metrics
+from main_agent.config import settings
+from main_agent.models import stand_in_backend, use_model_backend
+from main_agent.server import DrainingServer, Shed, TurnAdmission, create_app, create_router_app, worker_for
+
+PROVIDER = "I saw a new doctor today. He told me that at 48, this is just classic perimenopause."
+
+
+def _config(**overrides):
+    return replace(settings, warmup=False, **overrides)
+
+
+@contextlib.asynccontextmanager
+async def _client(app):
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+def _sse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_session_and_json_turn():
+    metrics.reset()
+    with use_model_backend(stand_in_backend()):
+        async with _client(create_app(_config())) as client:
+            created = await client.post("/sessions", json={"session_id": "s1"})
+            assert created.status_code == 201 and created.json() == {"user_id": "user", "session_id": "s1"}
+            assert (await client.post("/sessions", json={"session_id": "s1"})).status_code == 409
+
+            response = await client.post("/sessions/s1/messages", json={"text": PROVIDER})
+            assert response.status_code == 200
+            body = response.json()
+            assert body["partial"] is False and "Observation:" in body["report"]
+
+            session = (await client.get("/sessions/s1")).json()
+            assert session["state"]["report"] == body["report"]
+            assert (await client.post("/sessions/missing/messages", json={"text": PROVIDER})).status_code == 404
+            assert (await client.post("/sessions/s1/messages", json={})).status_code == 400
+    assert metrics.counters("server.") == {"server.turns": 1}
+
+
+@pytest.mark.asyncio
+async def test_sse_turn_streams_every_event_then_done():
+    with use_model_backend(stand_in_backend()):
+        async with _client(create_app(_config())) as client:
+            await client.post("/sessions", json={"session_id": "s1"})
+            response = await client.post("/sessions/s1/messages", json={"text": PROVIDER},
+                                         headers={"Accept": "text/event-stream"})
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = _sse_events(response.text)
+            session = (await client.get("/sessions/s1")).json()
+
+    assert events[-1] == ("done", {})
+    agent_events = [data for kind, data in events if kind == "agent"]
+    assert {data["author"] for data in agent_events} >= {"symptom_mapper_agent", "advocacy_generator_agent"}
+    texts = [data["content"]["parts"][0].get("text") for data in agent_events if data.get("content")]
+    assert texts[-1] == session["state"]["report"]
+
+
+@pytest.mark.asyncio
+async def test_turns_beyond_concurrency_and_queue_are_shed():
+    metrics.reset()
+    backend = stand_in_backend(latency=0.2)
+    with use_model_backend(backend):
+        async with _client(create_app(_config(server_concurrency=1, server_queue=1))) as client:
+            for index in range(3):
+                await client.post("/sessions", json={"session_id": f"s{index}"})
+            responses = await asyncio.gather(*(
+                client.post(f"/sessions/s{index}/messages", json={"text": PROVIDER}) for index in range(3)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 429]
+    shed = next(response for response in responses if response.status_code == 429)
+    assert int(shed.headers["Retry-After"]) >= 1
+    assert metrics.counters("server.") == {"server.turns": 2, "server.shed": 1}
+
+
+@pytest.mark.asyncio
+async def test_drain_finishes_admitted_turns_and_rejects_new_ones():
+    admission = TurnAdmission(concurrency=1, queue_size=4)
+    first = await admission.enter()
+    queued = asyncio.ensure_future(admission.enter())
+    await asyncio.sleep(0)
+    drain = asyncio.ensure_future(admission.drain(timeout=5))
+    await asyncio.sleep(0)
+
+    with pytest.raises(Shed) as shed:
+        await admission.enter()
+    assert shed.value.status == 503
+    assert not drain.done()
+
+    first.release()
+    first.release()  # idempotent
+    (await queued).release()
+    assert await drain
+    assert admission.running == admission.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_a_running_turn():
+    app = create_app(_config())
+    with use_model_backend(stand_in_backend(latency=0.1)):
+        async with _client(app) as client:
+            await client.post("/sessions", json={"session_id": "s1"})
+            turn = asyncio.ensure_future(client.post("/sessions/s1/messages", json={"text": PROVIDER}))
+            while not app.state.admission.running:
+                await asyncio.sleep(0.01)
+        # The lifespan has exited: the admitted turn completed first.
+        assert turn.done() and (await turn).status_code == 200
+    assert app.state.admission.draining
+
+
+@pytest.mark.asyncio
+async def test_sigterm_drains_while_uvicorn_keeps_listening():
+    app = create_app(_config(server_drain_seconds=10))
+    server = DrainingServer(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    # Off the main thread uvicorn installs no signal handlers; the signal is delivered by hand.
+    thread = threading.Thread(target=server.run, daemon=True)
+    with use_model_backend(stand_in_backend(latency=0.2)):
+        thread.start()
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            await client.post("/sessions", json={"session_id": "s1"})
+            await client.post("/sessions", json={"session_id": "s2"})
+            turn = asyncio.ensure_future(client.post("/sessions/s1/messages", json={"text": PROVIDER}))
+            while not (await client.get("/healthz")).json()["running"]:
+                await asyncio.sleep(0.01)
+
+            server.handle_exit(signal.SIGTERM, None)
+            health = await client.get("/healthz")
+            while health.status_code == 200:
+                await asyncio.sleep(0.05)
+                health = await client.get("/healthz")
+            assert health.status_code == 503 and health.json()["status"] == "draining"
+            rejected = await client.post("/sessions/s2/messages", json={"text": PROVIDER})
+            assert rejected.status_code == 503 and rejected.json() == {"error": "draining"}
+
+            assert (await turn).status_code == 200
+            stopping = time.monotonic()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+    assert not thread.is_alive() and time.monotonic() - stopping < 3
+
+
+@pytest.mark.asyncio
+async def test_router_keeps_each_session_on_its_worker():
+    assert worker_for("s1", 4) == worker_for("s1", 4)
+    assert len({worker_for(f"session-{index}", 4) for index in range(50)}) == 4
+
+    workers = [create_app(_config()) for _ in range(2)]
+    router = create_router_app(["http://w0", "http://w1"],
+                               transports=[httpx.ASGITransport(app=app) for app in workers])
+    with use_model_backend(stand_in_backend()):
+        async with contextlib.AsyncExitStack() as stack:
+            for app in workers:
+                await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(_client(router))
+
+            session_ids = [(await client.post("/sessions", json={})).json()["session_id"] for _ in range(6)]
+            for session_id in session_ids:
+                response = await client.post(f"/sessions/{session_id}/messages", json={"text": PROVIDER},
+                                             headers={"Accept": "text/event-stream"})
+                assert _sse_events(response.text)[-1] == ("done", {})
+                assert "Observation:" in (await client.get(f"/sessions/{session_id}")).json()["state"]["report"]
+
+            for session_id in session_ids:
+                owner = workers[worker_for(session_id, 2)]
+                other = workers[1 - worker_for(session_id, 2)]
+                assert await owner.state.session_service.get_session(
+                    app_name="agents", user_id="user", session_id=session_id)
+                assert await other.state.session_service.get_session(
+                    app_name="agents", user_id="user", session_id=session_id) is None
+            assert (await client.get("/healthz")).json()["status"] == "ok"
+            router.state.draining = True
+            assert (await client.get("/healthz")).json()["status"] == "draining"
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent session service (`main_agent.sessions`).
+
+Usage:
+    $ python -m pytest tests/test_sessions.py
+"""
+import time
+
+import pytest
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.runners import Runner
+from google.genai import types as genai_types
+
+from main_agent import metrics
+from main_agent.agent import root_agent
+from main_agent.models import stand_in_backend, use_model_backend
+from main_agent.sessions import PersistentSessionService, SQLiteSessionStore
+
+KEY = ("agents", "test_user", "s1")
+
+
+def _event(text: str, **state) -> Event:
+    return Event(
+        invocation_id="inv",
+        author="user",
+        content=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=text)]),
+        actions=EventActions(state_delta=state),
+    )
+
+
+async def _ask(runner, session_id: str, query: str) -> None:
+    async for _ in runner.run_async(
+        user_id="test_user",
+        session_id=session_id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+    ):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sessions_survive_eviction_and_restart(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    service = PersistentSessionService(SQLiteSessionStore(path), hot_sessions=1)
+    runner = Runner(agent=root_agent, app_name="agents", session_service=service)
+    for session_id in ("s1", "s2"):
+        await service.create_session(app_name="agents", user_id="test_user", session_id=session_id)
+
+    with use_model_backend(stand_in_backend()):
+        # Alternating sessions evicts the other one from the single hot slot every turn.
+        for query in ["My joints are stiff and swollen.", "My doctor said it's just my age."]:
+            await _ask(runner, "s1", query)
+            await _ask(runner, "s2", query)
+    before = await service.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    await service.close()
+
+    restarted = PersistentSessionService(SQLiteSessionStore(path))
+    after = await restarted.get_session(app_name="agents", user_id="test_user", session_id="s1")
+    assert [event.id for event in after.events] == [event.id for event in before.events]
+    assert after.state["report"] == before.state["report"]
+    assert after.state["report"].startswith("**Patient Advocacy & Consultation Aid**")
+    listed = await restarted.list_sessions(app_name="agents", user_id="test_user")
+    assert sorted(session.id for session in listed.sessions) == ["s1", "s2"]
+    with pytest.raises(AlreadyExistsError):
+        await restarted.create_session(app_name="agents", user_id="test_user", session_id="s2")
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_events_are_written_behind_in_batches(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    service = PersistentSessionService(store, batch_size=3, flush_interval=60.0)
+    session = await service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    metrics.reset()
+
+    for index in range(2):
+        await service.append_event(session, _event(f"message {index}", turn=index))
+    assert store.load(KEY).events == []
+    assert session.state["turn"] == 1
+
+    await service.append_event(session, _event("message 2", turn=2))
+    stored = store.load(KEY)
+    assert [event.content.parts[0].text for event in stored.events] == ["message 0", "message 1", "message 2"]
+    assert stored.state == {"turn": 2}
+    assert metrics.counters("sessions.") == {"sessions.flushes": 1, "sessions.events_written": 3}
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_retention_and_compaction(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    service = PersistentSessionService(store, retention_seconds=3600, max_events=2)
+    active = await service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    for index in range(5):
+        await service.append_event(active, _event(f"message {index}", turn=index))
+    two_hours_ago = time.time() - 7200
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "time", lambda: two_hours_ago)
+        idle = await service.create_session(app_name="agents", user_id="test_user", session_id="old")
+    stale = _event("long ago")
+    stale.timestamp = two_hours_ago
+    await service.append_event(idle, stale)
+
+    removed = await service.compact()
+
+    assert removed == {"sessions": 1, "events": 4}
+    assert await service.get_session(app_name="agents", user_id="test_user", session_id="old") is None
+    stored = store.load(KEY)
+    assert [event.content.parts[0].text for event in stored.events] == ["message 3", "message 4"]
+    assert stored.state == {"turn": 4}
+    await service.close()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the section-by-section report stream (`main_agent.streaming`).
+
+Usage:
+    $ python -m pytest tests/test_streaming.py
+"""
+import json
+
+import pytest
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.agent import streaming_root_agent
+from main_agent.models import stand_in_backend, use_model_backend
+from main_agent.report import QUESTIONS_HEADING, render_question_section
+from main_agent.streaming import QuestionStreamer
+
+QUERY = "I saw a new doctor today. He told me my swollen joints are just perimenopause."
+
+
+def test_question_streamer_handles_split_tokens_and_escapes():
+    questions = ['Could we test my "swollen" joints?', "What about café fatigue?"]
+    text = json.dumps({"structuredAdvocacy": questions})
+    streamer = QuestionStreamer()
+    pieces = [streamer.feed(text[i:i + 3]) for i in range(0, len(text), 3)]
+
+    assert pieces[0] == ""  # nothing useful before the array starts
+    assert "".join(pieces) == render_question_section(questions)
+    assert streamer.finish(questions) == ""
+
+
+def test_question_streamer_finish_fills_in_unstreamed_questions():
+    streamer = QuestionStreamer()
+    assert streamer.finish([]) == f"{QUESTIONS_HEADING}\nNo questions generated."
+
+
+@pytest.mark.asyncio
+async def test_streaming_agent_emits_sections_before_the_final_report():
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id="s1")
+    runner = Runner(agent=streaming_root_agent, app_name="agents", session_service=session_service)
+
+    partials, final_report = [], None
+    with use_model_backend(stand_in_backend()):
+        async for event in runner.run_async(
+            user_id="test_user",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=QUERY)]),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        ):
+            if event.partial:
+                assert final_report is None
+                partials.append((event.custom_metadata["section"], event.content.parts[0].text))
+            elif event.author == "report_formatter_agent":
+                final_report = event.content.parts[0].text
+
+    sections = [section for section, _ in partials]
+    assert set(sections[:2]) == {"symptoms", "biases"}
+    assert sections.count("questions") > 2  # questions arrive token by token
+    assert set(sections[2:]) == {"questions"}
+    assert partials[0][1].startswith("**Patient Advocacy & Consultation Aid**")
+    streamed = {section: "".join(text for s, text in partials if s == section) for section in set(sections)}
+    for text in streamed.values():
+        assert text.strip() in final_report
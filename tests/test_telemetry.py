@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for local span export and LUCIA span attributes (`main_agent.telemetry`).
+
+Usage:
+    $ python -m pytest tests/test_telemetry.py
+"""
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent.agent import root_agent
+from main_agent.cache import ResponseCache, use_response_cache
+from main_agent.models import stand_in_backend, use_model_backend
+from main_agent.telemetry import configure_tracing
+
+QUERIES = [
+    "My joints are stiff and swollen every morning.",
+    "My doctor said it's just my age.",
+]
+
+
+@pytest.fixture(scope="module")
+def span_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("traces") / "spans.jsonl"
+    processor = configure_tracing("json", str(path))
+
+    def _read() -> list:
+        processor.force_flush()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    return _read
+
+
+async def _run_session(session_id: str) -> None:
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="agents", user_id="test_user", session_id=session_id)
+    runner = Runner(agent=root_agent, app_name="agents", session_service=session_service)
+    for query in QUERIES:
+        async for _ in runner.run_async(
+            user_id="test_user",
+            session_id=session_id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+        ):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_stage_spans_carry_tokens_cache_and_retry_attributes(span_file):
+    with use_model_backend(stand_in_backend()), use_response_cache(ResponseCache()):
+        await _run_session("traced-1")
+        await _run_session("traced-2")  # identical conversation: served from the cache
+
+    spans = span_file()
+    names = {span["name"] for span in spans}
+    for stage in ("parallel_analysis_step", "symptom_mapper_agent", "bias_analyzer_agent", "advocacy_generator_agent"):
+        assert f"invoke_agent {stage}" in names
+
+    tools = [span for span in spans if span["name"] == "execute_tool get_bias_implications_batch"]
+    assert tools and all(span["attributes"]["lucia.axiom.unmatched"] == 0 for span in tools)
+
+    model_calls = [span for span in spans if span["attributes"].get("lucia.agent")]
+    caches = {span["attributes"]["lucia.cache"] for span in model_calls}
+    assert caches == {"miss", "hit"}
+    served = [span["attributes"] for span in model_calls if span["attributes"]["lucia.cache"] == "miss"]
+    assert all(attributes["gen_ai.usage.input_tokens"] > 0 for attributes in served)
+    assert all(attributes["lucia.schema.retries"] == 0 for attributes in served if "lucia.schema.valid" in attributes)
+    assert all(span["duration_ms"] >= 0 for span in spans)